@@ -0,0 +1,110 @@
+"""Check the records and the part files written by --corpus-format."""
+import argparse
+import gzip
+import json
+import os
+import pytest
+from tokenizer_for_indian_languages import Tokenizer
+from tokenizer_for_indian_languages.cli import add_arguments, run
+from tokenizer_for_indian_languages.corpus import CorpusWriter, write_corpus
+
+
+tokenizer = Tokenizer(bullets=True, delimited_urls=True)
+input_texts = {
+    'news/first.txt': ['भारत एक विशाल देश है। इसकी राजधानी दिल्ली है।', 'वह 2014-15 में आया, (और) चला गया।'],
+    'second.txt': ['हम यहाँ हैं। "वह" वहाँ है।', 'www.example.com/a?b=1 देखें।'],
+}
+
+
+def write_inputs(input_folder):
+    """Write the input files of a folder and return them as (input file, lang type, lang)."""
+    input_files = []
+    for input_name, lines in input_texts.items():
+        input_file = input_folder / input_name
+        input_file.parent.mkdir(parents=True, exist_ok=True)
+        input_file.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+        input_files.append((str(input_file), 0, 'hi'))
+    return input_files
+
+
+def find_expected_records():
+    """Make the records of the input files from the sentences of the tokenizer."""
+    records = []
+    for input_name, lines in input_texts.items():
+        for sentence_id, tokens in enumerate(tokenizer.tokenize_lines(lines), 1):
+            records.append({'source': input_name, 'lang': 'hi', 'lang_type': 0, 'sentence_id': sentence_id, 'tokens': [token for token in tokens if token]})
+    return records
+
+
+def read_parts(output_folder, part_opener=open):
+    """Read the records of the jsonl parts of a folder in the order of the parts."""
+    records = []
+    for file_name in sorted(os.listdir(output_folder)):
+        with part_opener(os.path.join(output_folder, file_name), 'rt', encoding='utf-8') as file_read:
+            records.extend(json.loads(line) for line in file_read)
+    return records
+
+
+def write_parts(tmp_path, output_name, **writer_options):
+    """Write the records of the input files into the parts of a corpus writer and return the output folder."""
+    input_files = write_inputs(tmp_path / 'input')
+    writer = CorpusWriter(str(tmp_path / output_name), **writer_options)
+    write_corpus(writer, tokenizer, input_files, str(tmp_path / 'input'))
+    writer.close()
+    return tmp_path / output_name
+
+
+def test_jsonl_records(tmp_path):
+    output_folder = write_parts(tmp_path, 'output')
+    assert os.listdir(output_folder) == ['part-00000.jsonl']
+    records = read_parts(output_folder)
+    assert records == find_expected_records()
+    assert list(records[0]) == ['source', 'lang', 'lang_type', 'sentence_id', 'tokens']
+
+
+def test_parts_roll_over_at_part_size(tmp_path):
+    part_size = 300
+    output_folder = write_parts(tmp_path, 'output', part_size=part_size)
+    part_names = sorted(os.listdir(output_folder))
+    assert len(part_names) > 1
+    assert part_names == ['part-%05d.jsonl' % index for index in range(len(part_names))]
+    # a part is closed by the record which makes it reach part_size, so a record is never split
+    for part_name in part_names[: -1]:
+        part_bytes = os.path.getsize(output_folder / part_name)
+        with open(output_folder / part_name, 'rb') as file_read:
+            last_record_bytes = len(file_read.read().splitlines(True)[-1])
+        assert part_bytes - last_record_bytes < part_size <= part_bytes
+    assert read_parts(output_folder) == find_expected_records()
+    # a rerun with larger parts removes the parts it does not write again
+    writer = CorpusWriter(str(output_folder))
+    write_corpus(writer, tokenizer, write_inputs(tmp_path / 'input'), str(tmp_path / 'input'))
+    writer.close()
+    assert os.listdir(output_folder) == ['part-00000.jsonl']
+
+
+def test_gzip_parts(tmp_path):
+    output_folder = write_parts(tmp_path, 'output', part_size=300, compression='gzip')
+    assert all(file_name.endswith('.jsonl.gz') for file_name in os.listdir(output_folder))
+    assert read_parts(output_folder, gzip.open) == find_expected_records()
+
+
+def test_parquet_parts(tmp_path):
+    pytest.importorskip('pyarrow')
+    import pyarrow.parquet
+    output_folder = write_parts(tmp_path, 'output', corpus_format='parquet')
+    assert os.listdir(output_folder) == ['part-00000.parquet']
+    assert pyarrow.parquet.read_table(str(output_folder / 'part-00000.parquet')).to_pylist() == find_expected_records()
+
+
+def test_shard_part_prefix(tmp_path):
+    write_inputs(tmp_path / 'input')
+    for shard_index in [1, 2]:
+        parser = argparse.ArgumentParser()
+        add_arguments(parser)
+        args = parser.parse_args(['--input', str(tmp_path / 'input'), '--output', str(tmp_path / 'output'), '--corpus-format', 'jsonl', '--shard', '%d/2' % shard_index])
+        run(args, tokenizer, 'raw', 0)
+    part_names = sorted(os.listdir(tmp_path / 'output'))
+    assert all(part_name.startswith(('part-1-of-2-', 'part-2-of-2-')) for part_name in part_names)
+    # the records of the shards are the records of the whole folder
+    records = read_parts(tmp_path / 'output')
+    assert sorted(records, key=lambda record: (record['source'], record['sentence_id'])) == sorted(find_expected_records(), key=lambda record: (record['source'], record['sentence_id']))
@@ -0,0 +1,107 @@
+"""Check that --extra-output writes the outputs of separate runs in one pass and leaves nothing behind on an error."""
+import argparse
+import json
+import os
+import pytest
+from tokenizer_for_indian_languages import Tokenizer, files
+from tokenizer_for_indian_languages.cli import add_arguments, run
+from tokenizer_for_indian_languages.files import write_sentences_into_file
+
+
+repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+tokenizer = Tokenizer(bullets=True, delimited_urls=True)
+
+
+def read_sample_lines():
+    """Read the lines of the untokenized samples."""
+    lines = []
+    for file_name in ['hindi_sample_raw_with_no_sentence_tokenization.txt', 'hindi_sample_with_sentence_tokenization.txt']:
+        with open(os.path.join(repo_root, file_name), 'r', encoding='utf-8') as file_read:
+            lines.extend(file_read.read().split('\n'))
+    return lines
+
+
+def write_inputs(input_folder):
+    """Write a folder of files of the sample lines and an empty file."""
+    lines = read_sample_lines()
+    for index in range(3):
+        input_file = input_folder / ('part%d' % index) / 'input.txt'
+        input_file.parent.mkdir(parents=True)
+        input_file.write_text('\n'.join(lines[index:]), encoding='utf-8')
+    (input_folder / 'empty.txt').write_text('', encoding='utf-8')
+
+
+def run_script(input_path, output_path, output_format='raw', *options):
+    """Tokenize a file or folder with the arguments of the scripts."""
+    parser = argparse.ArgumentParser()
+    add_arguments(parser)
+    run(parser.parse_args(['--input', str(input_path), '--output', str(output_path)] + list(options)), tokenizer, output_format, 0)
+
+
+def read_tree(folder):
+    """Read the files of a folder tree keyed by their path in the folder."""
+    tree = {}
+    for root, _, file_names in os.walk(folder):
+        for file_name in file_names:
+            with open(os.path.join(root, file_name), 'rb') as file_read:
+                tree[os.path.relpath(os.path.join(root, file_name), folder)] = file_read.read()
+    return tree
+
+
+def find_jsonl_output(input_file):
+    """Make the jsonl output of an input file from the sentences of the tokenizer."""
+    with open(input_file, 'r', encoding='utf-8') as file_read:
+        lines = [line.strip() for line in file_read if line.strip()]
+    records = [{'sentence_id': sentence_id, 'tokens': [token for token in tokens if token]} for sentence_id, tokens in enumerate(tokenizer.tokenize_lines(lines), 1)]
+    return ''.join(json.dumps(record, ensure_ascii=False) + '\n' for record in records).encode('utf-8')
+
+
+@pytest.mark.parametrize('options', [[], ['--workers', '2'], ['--workers', '2', '--parallel', 'chunk', '--chunk-size', '2']])
+def test_extra_outputs_match_single_format_runs(tmp_path, monkeypatch, options):
+    # small batches make the sentences of a file reach the outputs in several writes
+    monkeypatch.setattr(files, 'fan_out_batch_size', 3)
+    write_inputs(tmp_path / 'input')
+    run_script(tmp_path / 'input', tmp_path / 'raw', 'raw', *options)
+    run_script(tmp_path / 'input', tmp_path / 'ssf', 'ssf', *options)
+    run_script(tmp_path / 'input', tmp_path / 'output', 'raw', '--extra-output', 'ssf:%s' % (tmp_path / 'extra_ssf'), '--extra-output', 'jsonl:%s' % (tmp_path / 'extra_jsonl'), *options)
+    assert read_tree(tmp_path / 'output') == read_tree(tmp_path / 'raw')
+    assert read_tree(tmp_path / 'extra_ssf') == read_tree(tmp_path / 'ssf')
+    jsonl_tree = read_tree(tmp_path / 'extra_jsonl')
+    assert sorted(jsonl_tree) == sorted(read_tree(tmp_path / 'raw'))
+    for output_name, output in jsonl_tree.items():
+        assert output == find_jsonl_output(tmp_path / 'input' / output_name)
+    assert jsonl_tree['empty.txt'] == b''
+
+
+def test_extra_outputs_of_a_single_file(tmp_path):
+    write_inputs(tmp_path / 'input')
+    input_file = tmp_path / 'input' / 'part0' / 'input.txt'
+    run_script(input_file, tmp_path / 'raw.txt', 'raw')
+    run_script(input_file, tmp_path / 'ssf.txt', 'ssf')
+    run_script(input_file, tmp_path / 'output.txt', 'ssf', '--extra-output', 'raw:%s' % (tmp_path / 'extra' / 'raw.txt'))
+    assert (tmp_path / 'output.txt').read_bytes() == (tmp_path / 'ssf.txt').read_bytes()
+    assert (tmp_path / 'extra' / 'raw.txt').read_bytes() == (tmp_path / 'raw.txt').read_bytes()
+
+
+def test_error_mid_file_leaves_no_outputs(tmp_path, monkeypatch):
+    monkeypatch.setattr(files, 'fan_out_batch_size', 2)
+
+    def iter_failing_sentences():
+        """Yield a few sentences and fail after they are written."""
+        yield from tokenizer.tokenize_lines(read_sample_lines())[: 5]
+        raise RuntimeError('reading failed')
+
+    outputs = [(str(tmp_path / 'extra' / 'output.ssf'), 'ssf'), (str(tmp_path / 'output.jsonl'), 'jsonl')]
+    with pytest.raises(RuntimeError):
+        write_sentences_into_file(iter_failing_sentences(), str(tmp_path / 'output.txt'), 'raw', extra_outputs=outputs)
+    assert read_tree(tmp_path) == {}
+
+
+def test_undecodable_input_leaves_no_outputs(tmp_path, monkeypatch):
+    monkeypatch.setattr(files, 'fan_out_batch_size', 2)
+    # the bytes which are not utf-8 come after many lines, so several batches are written before the error
+    lines = read_sample_lines() * 20
+    (tmp_path / 'input.txt').write_bytes('\n'.join(lines).encode('utf-8') + b'\n\xff\xfe\n' + lines[0].encode('utf-8'))
+    with pytest.raises(UnicodeDecodeError):
+        run_script(tmp_path / 'input.txt', tmp_path / 'output' / 'output.txt', 'raw', '--extra-output', 'ssf:%s' % (tmp_path / 'output' / 'output.ssf'), '--extra-output', 'jsonl:%s' % (tmp_path / 'output' / 'output.jsonl'))
+    assert os.listdir(tmp_path / 'output') == []
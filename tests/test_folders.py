@@ -0,0 +1,132 @@
+"""Check the mirrored and flat layouts of the outputs of a folder, that the shards of a folder add up to the whole folder and that the files given to the workers are bounded."""
+import argparse
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from tokenizer_for_indian_languages import Tokenizer
+from tokenizer_for_indian_languages.cli import add_arguments, run
+from tokenizer_for_indian_languages.files import find_folder_files, tokenize_files
+
+
+tokenizer = Tokenizer(bullets=True, delimited_urls=True)
+sample_sentences = ['भारत एक विशाल देश है।', 'वह 2014-15 में आया, (और) चला गया।', 'हम यहाँ हैं। "वह" वहाँ है।', 'www.example.com/a?b=1 देखें।']
+
+
+def write_folder(input_folder, file_count):
+    """Write a folder tree of file_count files, the files of each sub folder have different texts."""
+    for index in range(file_count):
+        input_file = input_folder / ('part%d' % (index % 3)) / ('file%d.txt' % index)
+        input_file.parent.mkdir(parents=True, exist_ok=True)
+        input_file.write_text('\n'.join(sample_sentences[(index + offset) % len(sample_sentences)] for offset in range(index % 4 + 1)) + '\n', encoding='utf-8')
+
+
+def run_script(input_folder, output_folder, *options):
+    """Tokenize a folder with the arguments of the scripts."""
+    parser = argparse.ArgumentParser()
+    add_arguments(parser)
+    run(parser.parse_args(['--input', str(input_folder), '--output', str(output_folder)] + list(options)), tokenizer, 'raw', 0)
+
+
+def read_tree(folder):
+    """Read the files of a folder tree keyed by their path in the folder."""
+    tree = {}
+    for root, _, file_names in os.walk(folder):
+        for file_name in file_names:
+            with open(os.path.join(root, file_name), 'rb') as file_read:
+                tree[os.path.relpath(os.path.join(root, file_name), folder)] = file_read.read()
+    return tree
+
+
+def test_shards_add_up_to_the_folder(tmp_path):
+    write_folder(tmp_path / 'input', 20)
+    run_script(tmp_path / 'input', tmp_path / 'output')
+    folder_tree = read_tree(tmp_path / 'output')
+    assert len(folder_tree) == 20
+    shard_trees = []
+    for shard_index in range(1, 4):
+        run_script(tmp_path / 'input', tmp_path / ('shard%d' % shard_index), '--shard', '%d/3' % shard_index)
+        shard_trees.append(read_tree(tmp_path / ('shard%d' % shard_index)))
+    # every file is in exactly one shard
+    assert sum(len(shard_tree) for shard_tree in shard_trees) == len(folder_tree)
+    assert {path: output for shard_tree in shard_trees for path, output in shard_tree.items()} == folder_tree
+    # the shards can write into the same output folder
+    for shard_index in range(1, 4):
+        run_script(tmp_path / 'input', tmp_path / 'shared', '--shard', '%d/3' % shard_index, '--workers', '2')
+    assert read_tree(tmp_path / 'shared') == folder_tree
+
+
+def test_flat_writes_files_with_the_same_name_in_serial_order(tmp_path):
+    for folder_name in ['first', 'second', 'third']:
+        (tmp_path / 'input' / folder_name).mkdir(parents=True)
+        (tmp_path / 'input' / folder_name / 'same.txt').write_text('%s फ़ोल्डर की फ़ाइल है।\n' % folder_name, encoding='utf-8')
+    (tmp_path / 'input' / 'first' / 'other.txt').write_text('यह दूसरी फ़ाइल है।\n', encoding='utf-8')
+    # the file found last by the walk of the folder is the one left in the output
+    last_file = [input_file for input_file, _ in find_folder_files(str(tmp_path / 'input'), str(tmp_path / 'output'), True) if input_file.endswith('same.txt')][-1]
+    with open(last_file, 'r', encoding='utf-8') as file_read:
+        expected = ''.join(sentence + '\n' for sentence in tokenizer.iter_sentences([file_read.read().strip()])).encode('utf-8')
+    run_script(tmp_path / 'input', tmp_path / 'serial', '--flat')
+    serial_tree = read_tree(tmp_path / 'serial')
+    assert sorted(serial_tree) == ['other.txt', 'same.txt']
+    assert serial_tree['same.txt'] == expected
+    for options in [['--workers', '3'], ['--workers', '3', '--parallel', 'chunk']]:
+        output_folder = tmp_path / ('parallel-' + '-'.join(options).strip('-'))
+        run_script(tmp_path / 'input', output_folder, '--flat', *options)
+        assert read_tree(output_folder) == serial_tree
+
+
+class CountingExecutor(ThreadPoolExecutor):
+    """Run the tasks in threads and record the most tasks submitted and not finished at a time."""
+
+    def __init__(self, max_workers):
+        """Start counting the tasks."""
+        super().__init__(max_workers)
+        self.lock = threading.Lock()
+        self.pending_tasks = 0
+        self.max_pending_tasks = 0
+
+    def submit(self, *args):
+        """Submit a task and count it until it is finished."""
+        with self.lock:
+            self.pending_tasks += 1
+            self.max_pending_tasks = max(self.max_pending_tasks, self.pending_tasks)
+        task = super().submit(*args)
+        task.add_done_callback(self.finish_task)
+        return task
+
+    def finish_task(self, task):
+        """Stop counting a finished task."""
+        with self.lock:
+            self.pending_tasks -= 1
+
+
+def test_pending_files_are_bounded(tmp_path):
+    write_folder(tmp_path / 'input', 30)
+    run_script(tmp_path / 'input', tmp_path / 'serial')
+    file_paths = find_folder_files(str(tmp_path / 'input'), str(tmp_path / 'output'))
+    with CountingExecutor(2) as executor:
+        tokenize_files(tokenizer, file_paths, [0] * len(file_paths), 'raw', executor, max_pending_files=3)
+    assert executor.max_pending_tasks <= 3
+    assert read_tree(tmp_path / 'output') == read_tree(tmp_path / 'serial')
+
+
+def test_failed_file_stops_the_submission(tmp_path):
+    write_folder(tmp_path / 'input', 30)
+    file_paths = find_folder_files(str(tmp_path / 'input'), str(tmp_path / 'output'))
+    file_paths[0] = (str(tmp_path / 'input' / 'missing.txt'), str(tmp_path / 'output' / 'missing.txt'))
+    taken_files = []
+
+    def iter_lang_types():
+        """Yield the language type of each file, the failure of the first file is over before the fifth one is taken."""
+        for index in range(len(file_paths)):
+            if index == 4:
+                time.sleep(0.5)
+            taken_files.append(index)
+            yield 0
+
+    with pytest.raises(FileNotFoundError):
+        with CountingExecutor(2) as executor:
+            tokenize_files(tokenizer, file_paths, iter_lang_types(), 'raw', executor, max_pending_files=4)
+    # the failure is raised as soon as it is found instead of after every file is tokenized
+    assert len(taken_files) < 8
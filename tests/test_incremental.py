@@ -0,0 +1,104 @@
+"""Check that --incremental tokenizes only the files which changed and removes the outputs of removed files."""
+import argparse
+import os
+from tokenizer_for_indian_languages import Tokenizer
+from tokenizer_for_indian_languages.cli import add_arguments, run
+from tokenizer_for_indian_languages.manifest import manifest_name, shard_manifest_name
+
+
+tokenizer = Tokenizer(bullets=True, delimited_urls=True)
+input_texts = {
+    'news/first.txt': 'भारत एक विशाल देश है। इसकी राजधानी दिल्ली है।\n',
+    'news/second.txt': 'वह 2014-15 में आया, (और) चला गया।\n',
+    'third.txt': 'हम यहाँ हैं। "वह" वहाँ है।\n',
+}
+# an output which is not written again keeps this mtime
+old_mtime_ns = 10 ** 18
+
+
+def write_inputs(input_folder, texts):
+    """Write the input files of a folder."""
+    for input_name, text in texts.items():
+        input_file = input_folder / input_name
+        input_file.parent.mkdir(parents=True, exist_ok=True)
+        input_file.write_text(text, encoding='utf-8')
+
+
+def run_script(input_folder, output_folder, output_format='raw', *options):
+    """Tokenize a folder with the arguments of the scripts."""
+    parser = argparse.ArgumentParser()
+    add_arguments(parser)
+    args = parser.parse_args(['--input', str(input_folder), '--output', str(output_folder), '--incremental'] + list(options))
+    run(args, tokenizer, output_format, 0)
+
+
+def age_outputs(output_folder):
+    """Set the mtime of every output file to old_mtime_ns, a rerun which tokenizes a file again changes it."""
+    for input_name in input_texts:
+        output_file = output_folder / input_name
+        if output_file.exists():
+            os.utime(output_file, ns=(old_mtime_ns, old_mtime_ns))
+
+
+def find_written_outputs(output_folder):
+    """Find the outputs written since age_outputs."""
+    return sorted(input_name for input_name in input_texts if (output_folder / input_name).exists() and os.stat(output_folder / input_name).st_mtime_ns != old_mtime_ns)
+
+
+def test_unchanged_files_are_skipped(tmp_path):
+    write_inputs(tmp_path / 'input', input_texts)
+    run_script(tmp_path / 'input', tmp_path / 'output')
+    assert find_written_outputs(tmp_path / 'output') == sorted(input_texts)
+    assert (tmp_path / 'output' / manifest_name).exists()
+    age_outputs(tmp_path / 'output')
+    run_script(tmp_path / 'input', tmp_path / 'output')
+    assert find_written_outputs(tmp_path / 'output') == []
+
+
+def test_changed_file_is_tokenized_again(tmp_path):
+    write_inputs(tmp_path / 'input', input_texts)
+    run_script(tmp_path / 'input', tmp_path / 'output')
+    age_outputs(tmp_path / 'output')
+    write_inputs(tmp_path / 'input', {'news/second.txt': 'यह नया वाक्य है।\n'})
+    run_script(tmp_path / 'input', tmp_path / 'output')
+    assert find_written_outputs(tmp_path / 'output') == ['news/second.txt']
+    assert (tmp_path / 'output' / 'news' / 'second.txt').read_text(encoding='utf-8') == ''.join(sentence + '\n' for sentence in tokenizer.iter_sentences(['यह नया वाक्य है।']))
+
+
+def test_output_of_removed_input_is_removed(tmp_path):
+    write_inputs(tmp_path / 'input', input_texts)
+    run_script(tmp_path / 'input', tmp_path / 'output')
+    os.remove(tmp_path / 'input' / 'news' / 'first.txt')
+    os.remove(tmp_path / 'input' / 'news' / 'second.txt')
+    run_script(tmp_path / 'input', tmp_path / 'output')
+    assert not (tmp_path / 'output' / 'news').exists()
+    assert (tmp_path / 'output' / 'third.txt').exists()
+
+
+def test_changed_settings_tokenize_every_file_again(tmp_path):
+    write_inputs(tmp_path / 'input', input_texts)
+    run_script(tmp_path / 'input', tmp_path / 'output')
+    age_outputs(tmp_path / 'output')
+    run_script(tmp_path / 'input', tmp_path / 'output', 'ssf')
+    assert find_written_outputs(tmp_path / 'output') == sorted(input_texts)
+    age_outputs(tmp_path / 'output')
+    run_script(tmp_path / 'input', tmp_path / 'output', 'ssf', '--offsets')
+    assert find_written_outputs(tmp_path / 'output') == sorted(input_texts)
+    age_outputs(tmp_path / 'output')
+    run_script(tmp_path / 'input', tmp_path / 'output', 'ssf', '--offsets')
+    assert find_written_outputs(tmp_path / 'output') == []
+
+
+def test_shard_keeps_a_manifest_of_its_own(tmp_path):
+    write_inputs(tmp_path / 'input', input_texts)
+    for shard_index in [1, 2]:
+        run_script(tmp_path / 'input', tmp_path / 'output', 'raw', '--shard', '%d/2' % shard_index)
+    assert not (tmp_path / 'output' / manifest_name).exists()
+    assert (tmp_path / 'output' / (shard_manifest_name % (1, 2))).exists()
+    assert (tmp_path / 'output' / (shard_manifest_name % (2, 2))).exists()
+    assert find_written_outputs(tmp_path / 'output') == sorted(input_texts)
+    # a rerun of a shard only looks at its own manifest, so the outputs of the other shard are kept as they are
+    age_outputs(tmp_path / 'output')
+    run_script(tmp_path / 'input', tmp_path / 'output', 'raw', '--shard', '1/2')
+    assert find_written_outputs(tmp_path / 'output') == []
+    assert all((tmp_path / 'output' / input_name).exists() for input_name in input_texts)
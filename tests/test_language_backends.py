@@ -0,0 +1,69 @@
+"""Check the texts read for a backend check and that an int8 quantized onnx model identifies texts like its fp32 model, with a small stub model in place of MuRIL."""
+import json
+import pytest
+from tokenizer_for_indian_languages.language_backends import OnnxLanguageIdentifier, onnx_model_name, quantized_onnx_model_name, read_check_texts
+
+
+hindi_texts = ['भारत एक विशाल देश है', 'यह देश बहुत विशाल है', 'हम भारत में रहते हैं']
+english_texts = ['india is a large country', 'we live in this country', 'this is a large house']
+special_tokens = ['[PAD]', '[UNK]', '[CLS]', '[SEP]', '[MASK]']
+
+
+def write_corpus(corpus_path, name, lines):
+    """Write a corpus whose lines are numbered after its name."""
+    with open(corpus_path, 'w', encoding='utf-8') as file_write:
+        file_write.write(''.join('%s %d\n' % (name, index) for index in range(lines)))
+
+
+def write_stub_model(model_folder):
+    """Write an onnx model which averages two dimensional word embeddings, one dimension for the hindi words and one for the english words, with its word level tokenizer and config."""
+    import numpy as np
+    import onnx
+    from onnx import TensorProto, helper, numpy_helper
+    words = sorted(set(' '.join(hindi_texts + english_texts).split()))
+    vocab = special_tokens + words
+    embeddings = np.zeros((len(vocab), 2), dtype=np.float32)
+    for index, word in enumerate(words, len(special_tokens)):
+        embeddings[index, 0 if ' '.join(hindi_texts).count(word) else 1] = 1.0
+    weights = np.array([[3.0, -1.0], [-1.0, 3.0]], dtype=np.float32)
+    bias = np.array([0.1, -0.1], dtype=np.float32)
+    nodes = [
+        helper.make_node('Gather', ['embeddings', 'input_ids'], ['token_embeddings']),
+        helper.make_node('ReduceMean', ['token_embeddings'], ['text_embeddings'], axes=[1], keepdims=0),
+        helper.make_node('MatMul', ['text_embeddings', 'weights'], ['scores']),
+        helper.make_node('Add', ['scores', 'bias'], ['logits']),
+    ]
+    graph = helper.make_graph(
+        nodes, 'stub_language_identifier',
+        [helper.make_tensor_value_info('input_ids', TensorProto.INT64, ['batch', 'sequence'])],
+        [helper.make_tensor_value_info('logits', TensorProto.FLOAT, ['batch', 2])],
+        [numpy_helper.from_array(embeddings, 'embeddings'), numpy_helper.from_array(weights, 'weights'), numpy_helper.from_array(bias, 'bias')])
+    # an ir version old enough for the onnxruntime releases which run opset 13
+    onnx.save(helper.make_model(graph, opset_imports=[helper.make_opsetid('', 13)], ir_version=8), str(model_folder / onnx_model_name))
+    with open(model_folder / 'vocab.txt', 'w', encoding='utf-8') as file_write:
+        file_write.write(''.join(token + '\n' for token in vocab))
+    with open(model_folder / 'tokenizer_config.json', 'w', encoding='utf-8') as file_write:
+        json.dump({'tokenizer_class': 'BertTokenizer', 'do_lower_case': False}, file_write)
+    with open(model_folder / 'config.json', 'w', encoding='utf-8') as file_write:
+        json.dump({'model_type': 'bert', 'id2label': {'0': 'LABEL_0', '1': 'LABEL_1'}}, file_write)
+
+
+def test_read_check_texts_gives_each_corpus_its_share(tmp_path):
+    write_corpus(tmp_path / 'hindi.txt', 'hindi', 200)
+    write_corpus(tmp_path / 'urdu.txt', 'urdu', 200)
+    texts = read_check_texts([str(tmp_path / 'hindi.txt'), str(tmp_path / 'urdu.txt')], max_texts=5)
+    assert [text.split()[0] for text in texts] == ['hindi'] * 3 + ['urdu'] * 2
+
+
+def test_quantized_onnx_model_agrees_with_fp32(tmp_path):
+    pytest.importorskip('onnx')
+    pytest.importorskip('onnxruntime')
+    pytest.importorskip('transformers')
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    write_stub_model(tmp_path)
+    quantize_dynamic(str(tmp_path / onnx_model_name), str(tmp_path / quantized_onnx_model_name), weight_type=QuantType.QInt8)
+    texts = hindi_texts + english_texts
+    fp32_labels = [prediction['label'] for prediction in OnnxLanguageIdentifier(str(tmp_path))(texts, batch_size=4)]
+    int8_labels = [prediction['label'] for prediction in OnnxLanguageIdentifier(str(tmp_path / quantized_onnx_model_name))(texts, batch_size=4)]
+    assert fp32_labels == ['LABEL_0'] * len(hindi_texts) + ['LABEL_1'] * len(english_texts)
+    assert int8_labels == fp32_labels
@@ -0,0 +1,44 @@
+"""Check that the language cache sends every text through the model once and hashes every text once, with a stub of the model."""
+import pytest
+from tokenizer_for_indian_languages import language_identification
+from tokenizer_for_indian_languages.language_identification import close_language_cache, find_languages, open_language_cache
+
+
+# the texts of every call of the stub of the model
+model_calls = []
+
+
+def identify_with_stub(texts, batch_size=32):
+    """Stand in for the model, a text with the word मराठी is Marathi and any other text is Hindi."""
+    model_calls.append(list(texts))
+    return [{'label': 'LABEL_12' if 'मराठी' in text else 'LABEL_7'} for text in texts]
+
+
+@pytest.fixture(autouse=True)
+def stub_model(tmp_path, monkeypatch):
+    """Use the stub of the model with a cache of its own, counting the texts which are hashed."""
+    monkeypatch.setattr(language_identification, 'pipe', identify_with_stub)
+    hashed_texts = []
+    hash_language_text = language_identification.hash_language_text
+
+    def count_hash(text):
+        """Hash a text and record it."""
+        hashed_texts.append(text)
+        return hash_language_text(text)
+
+    monkeypatch.setattr(language_identification, 'hash_language_text', count_hash)
+    model_calls.clear()
+    open_language_cache(str(tmp_path / 'language_cache.sqlite'))
+    yield hashed_texts
+    close_language_cache()
+
+
+def test_texts_are_identified_and_hashed_once(stub_model):
+    texts = ['यह हिंदी है', 'ही मराठी आहे', 'यह हिंदी है', 'दूसरा पाठ']
+    assert find_languages(texts, 2) == ['hin', 'mar', 'hin', 'hin']
+    assert model_calls == [['यह हिंदी है', 'ही मराठी आहे'], ['दूसरा पाठ']]
+    assert stub_model == texts
+    # the second time every text is found in the cache
+    assert find_languages(texts + ['ही मराठी भाषा']) == ['hin', 'mar', 'hin', 'hin', 'mar']
+    assert model_calls[2:] == [['ही मराठी भाषा']]
+    assert stub_model == texts * 2 + ['ही मराठी भाषा']
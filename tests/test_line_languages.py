@@ -0,0 +1,88 @@
+"""Check that the lines of a file are identified by their script, by the model or by the line before them, with a stub of the model."""
+import argparse
+import pytest
+from tokenizer_for_indian_languages import Tokenizer, language_identification
+from tokenizer_for_indian_languages.cli import add_arguments, run
+from tokenizer_for_indian_languages.language_identification import identify_segment_language_types, iter_typed_lines, language_type_counts
+
+
+# lines decided by their script, lines in Devanagari which the model decides between Hindi and Marathi and lines too
+# short or of punctuation only which take the type of the line before them
+english_line = 'This line is written in English with enough letters.'
+urdu_line = 'یہ اردو زبان میں لکھی گئی ایک لمبی سطر ہے۔'
+hindi_line = 'यह हिंदी भाषा में लिखी गई एक पंक्ति है। दूसरा वाक्य है।'
+marathi_line = 'ही मराठी भाषेत लिहिलेली एक ओळ आहे. दुसरे वाक्य आहे.'
+# the texts of every call of the stub of the model
+model_calls = []
+
+
+def identify_with_stub(texts, batch_size=32):
+    """Stand in for the model, a text with the word मराठी is Marathi and any other text is Hindi."""
+    model_calls.append(list(texts))
+    return [{'label': 'LABEL_12' if 'मराठी' in text else 'LABEL_7'} for text in texts]
+
+
+@pytest.fixture(autouse=True)
+def stub_model(monkeypatch):
+    """Use the stub of the model without the cache."""
+    monkeypatch.setattr(language_identification, 'pipe', identify_with_stub)
+    monkeypatch.setattr(language_identification, 'language_cache', None)
+    monkeypatch.setattr(language_identification, 'use_script_language_type', True)
+    model_calls.clear()
+
+
+def count_decisions(segments, previous_lang_type=None):
+    """Identify the segments and count how each of them was decided."""
+    counts_before = dict(language_type_counts)
+    lang_types = identify_segment_language_types(segments, 32, previous_lang_type)
+    counts = {key: language_type_counts[key] - counts_before.get(key, 0) for key in ['segment_script', 'segment_model', 'segment_neighbour']}
+    return lang_types, counts
+
+
+def test_lines_decided_by_script_model_and_line_before():
+    segments = ['"', english_line, '।', hindi_line, urdu_line, 'ok', marathi_line, '" ।', english_line, hindi_line, 'ok', hindi_line]
+    lang_types, counts = count_decisions(segments)
+    # the punctuation at the start takes the type of the first identified line, the two last Hindi lines are one run
+    # as the short line between them does not end it
+    assert lang_types == [2, 2, 2, 0, 1, 1, 2, 2, 2, 0, 0, 0]
+    assert counts == {'segment_script': 3, 'segment_model': 4, 'segment_neighbour': 5}
+    # the runs are identified in one model call and the same text only once
+    assert model_calls == [[hindi_line, marathi_line, hindi_line + '\n' + hindi_line]]
+
+
+def test_lines_follow_the_window_before():
+    lang_types, counts = count_decisions(['"', 'ok', '।'], previous_lang_type=1)
+    assert lang_types == [1, 1, 1]
+    assert counts == {'segment_script': 0, 'segment_model': 0, 'segment_neighbour': 3}
+    assert model_calls == []
+    # short lines alone are identified together by the model
+    lang_types, counts = count_decisions(['हम', 'गए', '।'])
+    assert lang_types == [0, 0, 0]
+    assert counts == {'segment_script': 0, 'segment_model': 3, 'segment_neighbour': 0}
+
+
+def test_windows_follow_the_window_before():
+    lines = [urdu_line, '"', 'ok', '।', 'ok']
+    assert list(iter_typed_lines(lines, 4, window_lines=2)) == [(1, line) for line in lines]
+    assert model_calls == []
+
+
+@pytest.mark.parametrize('options', [['--workers', '3'], ['--workers', '3', '--chunk-size', '2'], ['--workers', '2', '--parallel', 'chunk', '--chunk-size', '3']])
+def test_parallel_line_languages_match_serial_run(tmp_path, options):
+    lines = [english_line, '"', hindi_line, marathi_line, 'ok', urdu_line, '।', hindi_line, marathi_line + ' ' + english_line]
+    input_folder = tmp_path / 'input'
+    for index in range(3):
+        input_file = input_folder / ('input%d.txt' % index)
+        input_file.parent.mkdir(exist_ok=True)
+        input_file.write_text('\n'.join(lines[index:] * (index + 4)), encoding='utf-8')
+    tokenizer = Tokenizer(bullets=True, delimited_urls=True)
+    outputs = []
+    for run_options in [[], options]:
+        parser = argparse.ArgumentParser()
+        add_arguments(parser, lang=False)
+        output_folder = tmp_path / ('output%d' % len(outputs))
+        run(parser.parse_args(['--input', str(input_folder), '--output', str(output_folder)] + run_options), tokenizer, 'raw', identify_lines=lambda file_lines: iter_typed_lines(file_lines, 2, window_lines=5))
+        outputs.append({path.name: path.read_bytes() for path in output_folder.iterdir()})
+    assert outputs[1] == outputs[0]
+    # the Marathi and English lines end their sentences at the full stop and the Hindi lines only at the danda
+    assert 'आहे .\n' in outputs[0]['input0.txt'].decode('utf-8')
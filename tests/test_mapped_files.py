@@ -0,0 +1,62 @@
+"""Check that the byte ranges of --mmap with workers are tokenized into the same output as a serial run."""
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+import pytest
+from tokenizer_for_indian_languages import Tokenizer
+from tokenizer_for_indian_languages.cli import add_arguments, run
+from tokenizer_for_indian_languages.files import iter_line_ranges, iter_mapped_lines, iter_mapped_sentence_tokens_in_parallel, open_mapped_file, tokenize_file, write_sentences_into_file
+
+
+repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# lines of punctuation only are merged into the sentence of the line before them, so their sentences cross lines
+# and a range starting at one of them starts at the next line which can start a chunk
+edge_lines = ['वह आया', '"', '।', '', 'हम गए।\r', '" ।', '!', 'यह English text है. It ends here.', ')']
+
+
+def write_input(input_file):
+    """Write a file of copies of the lines of the untokenized samples mixed with edge lines whose last line has no newline."""
+    sample_lines = []
+    for file_name in ['hindi_sample_raw_with_no_sentence_tokenization.txt', 'hindi_sample_with_sentence_tokenization.txt']:
+        with open(os.path.join(repo_root, file_name), 'r', encoding='utf-8') as file_read:
+            sample_lines.extend(file_read.read().split('\n'))
+    lines = []
+    for copy_index in range(len(edge_lines)):
+        for index, line in enumerate(sample_lines):
+            lines.append(line)
+            lines.extend(edge_lines[: (copy_index + index) % len(edge_lines)])
+    with open(input_file, 'w', encoding='utf-8', newline='') as file_write:
+        file_write.write('\n'.join(lines + ['"']))
+
+
+@pytest.mark.parametrize('lang_type', [0, 2])
+@pytest.mark.parametrize('range_size', [16, 64])
+def test_mapped_ranges_match_serial_run(tmp_path, lang_type, range_size):
+    tokenizer = Tokenizer(bullets=True, delimited_urls=True)
+    input_file = str(tmp_path / 'input.txt')
+    write_input(input_file)
+    with open_mapped_file(input_file) as mapped_file:
+        line_ranges = list(iter_line_ranges(mapped_file, range_size))
+        # some ranges start at a line which is merged into the sentence of the range before them
+        assert sum(1 for start, end in line_ranges if start > 0 and not tokenizer.is_chunk_start(next(iter_mapped_lines(mapped_file, start, end), ''), lang_type)) > 0
+        with ProcessPoolExecutor(max_workers=3) as executor:
+            for output_format in ['raw', 'ssf']:
+                tokenize_file(tokenizer, input_file, str(tmp_path / 'serial.txt'), lang_type, output_format)
+                sentences = iter_mapped_sentence_tokens_in_parallel(executor, tokenizer, input_file, mapped_file, lang_type, range_size, max_pending_ranges=4)
+                write_sentences_into_file(sentences, str(tmp_path / 'mapped.txt'), output_format)
+                assert (tmp_path / 'mapped.txt').read_bytes() == (tmp_path / 'serial.txt').read_bytes()
+
+
+def test_mmap_option_matches_serial_run(tmp_path):
+    input_file = str(tmp_path / 'input.txt')
+    write_input(input_file)
+    tokenizer = Tokenizer(bullets=True, delimited_urls=True)
+    outputs = []
+    for options in [[], ['--mmap'], ['--mmap', '--workers', '3']]:
+        parser = argparse.ArgumentParser()
+        add_arguments(parser)
+        output_file = tmp_path / ('output%d.txt' % len(outputs))
+        run(parser.parse_args(['--input', input_file, '--output', str(output_file)] + options), tokenizer, 'raw', 0)
+        outputs.append(output_file.read_bytes())
+    assert outputs[1] == outputs[0]
+    assert outputs[2] == outputs[0]
@@ -0,0 +1,67 @@
+"""Check that the offsets of --offsets point at the tokens in the lines they were read from."""
+import os
+import re
+import subprocess
+import sys
+import pytest
+from tokenizer_for_indian_languages import Tokenizer
+from tokenizer_for_indian_languages.tokenizer import proper_bullet_creation
+
+
+repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# lines whose punctuation only sentences are merged into the sentence before them, whose punctuation is split from
+# the words it touches and whose bullets are joined across whitespace by proper_bullet_creation
+edge_lines = [
+    'वह आया। " ।',
+    'वह आया।"(और) गया, ।',
+    'सन् 2014-15 में ( "हम" ) आए।।',
+    'www.example.com/a?b=1 और a.b.c देखें।',
+    '1.  2.  3. दूसरा  काम।',
+    'सूची 1. पहला 2. दूसरा',
+    '" । !',
+]
+
+
+def read_sample_lines():
+    """Read the lines of the bundled samples with the edge lines."""
+    lines = []
+    for file_name in sorted(os.listdir(repo_root)):
+        if file_name.startswith('hindi_sample_'):
+            with open(os.path.join(repo_root, file_name), 'r', encoding='utf-8') as file_read:
+                lines.extend(line.rstrip('\n') for line in file_read)
+    return lines + edge_lines
+
+
+@pytest.mark.parametrize('options', [{}, {'delimited_urls': True}, {'split_lines': False}, {'bullets': True, 'delimited_urls': True}])
+def test_offsets_point_at_tokens(options):
+    tokenizer = Tokenizer(**options)
+    lines = [line.strip() for line in read_sample_lines() if line.strip()]
+    sentences = tokenizer.tokenize_lines_spans(lines)
+    # the spans give the tokens of the sentences without the empty ones
+    assert [sentence.tokens() for sentence in sentences] == [[token for token in tokens if token] for tokens in tokenizer.tokenize_lines(lines)]
+    for sentence in sentences:
+        offsets = sentence.offsets()
+        for index, token in enumerate(sentence.tokens()):
+            line_index, start, end = offsets[3 * index: 3 * index + 3]
+            line = lines[line_index]
+            if tokenizer.bullets and proper_bullet_creation(line) != line:
+                # the whitespace removed by proper_bullet_creation is inside the span of the token it joined
+                assert ''.join(line[start: end].split()) == token
+            else:
+                assert line[start: end] == token
+
+
+def test_ssf_offsets_point_at_tokens_in_the_file(tmp_path):
+    # the file has blank lines and lines with leading whitespace, the offsets are counted in the lines of the file
+    text = '\n'.join(['  ' + line if index % 2 else line + '\n' for index, line in enumerate(read_sample_lines())]) + '\n'
+    (tmp_path / 'input.txt').write_text(text, encoding='utf-8')
+    subprocess.run([sys.executable, os.path.join(repo_root, 'tokenize_in_SSF_format_with_sentence_tokenization.py'), '--input', str(tmp_path / 'input.txt'), '--output', str(tmp_path / 'output.txt'), '--offsets'], check=True)
+    file_lines = text.split('\n')
+    rows = 0
+    for row in (tmp_path / 'output.txt').read_text(encoding='utf-8').split('\n'):
+        match_out = re.match(r"\d+\t(.*)\tunk\t<fs line='(\d+)' start='(\d+)' end='(\d+)'>$", row)
+        if match_out is not None:
+            token, line_number, start, end = match_out.group(1), int(match_out.group(2)), int(match_out.group(3)), int(match_out.group(4))
+            assert file_lines[line_number - 1][start: end] == token
+            rows += 1
+    assert rows > 100
@@ -0,0 +1,99 @@
+"""Check that --pipeline writes the outputs of a serial run and that a read error keeps the files before it."""
+import argparse
+import os
+import threading
+import pytest
+from tokenizer_for_indian_languages import Tokenizer
+from tokenizer_for_indian_languages.cli import add_arguments, run
+from tokenizer_for_indian_languages.pipeline import tokenize_files_in_pipeline
+
+
+repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+tokenizer = Tokenizer(bullets=True, delimited_urls=True)
+
+
+def read_sample_lines():
+    """Read the lines of the untokenized samples."""
+    lines = []
+    for file_name in ['hindi_sample_raw_with_no_sentence_tokenization.txt', 'hindi_sample_with_sentence_tokenization.txt']:
+        with open(os.path.join(repo_root, file_name), 'r', encoding='utf-8') as file_read:
+            lines.extend(file_read.read().split('\n'))
+    return lines
+
+
+def write_inputs(input_folder, file_count=6):
+    """Write a folder of files of the sample lines with punctuation only lines which are merged across chunks."""
+    lines = read_sample_lines()
+    input_files = []
+    for index in range(file_count):
+        input_file = input_folder / ('part%d' % (index % 2)) / ('input%d.txt' % index)
+        input_file.parent.mkdir(parents=True, exist_ok=True)
+        file_lines = [line for line in lines * (index + 1)]
+        file_lines[index::3] = ['"'] * len(file_lines[index::3])
+        input_file.write_text('\n'.join(file_lines), encoding='utf-8')
+        input_files.append(input_file)
+    return input_files
+
+
+def run_script(input_path, output_path, output_format='raw', *options):
+    """Tokenize a file or folder with the arguments of the scripts."""
+    parser = argparse.ArgumentParser()
+    add_arguments(parser)
+    run(parser.parse_args(['--input', str(input_path), '--output', str(output_path)] + list(options)), tokenizer, output_format, 0)
+
+
+def read_tree(folder):
+    """Read the files of a folder tree keyed by their path in the folder."""
+    tree = {}
+    for root, _, file_names in os.walk(folder):
+        for file_name in file_names:
+            with open(os.path.join(root, file_name), 'rb') as file_read:
+                tree[os.path.relpath(os.path.join(root, file_name), folder)] = file_read.read()
+    return tree
+
+
+@pytest.mark.parametrize('output_format', ['raw', 'ssf'])
+@pytest.mark.parametrize('options', [['--workers', '1'], ['--workers', '3'], ['--workers', '3', '--stats', os.devnull]])
+def test_pipeline_matches_default_run(tmp_path, output_format, options):
+    write_inputs(tmp_path / 'input')
+    run_script(tmp_path / 'input', tmp_path / 'default', output_format)
+    run_script(tmp_path / 'input', tmp_path / 'pipeline', output_format, '--pipeline', '--queue-depth', '1', '--chunk-size', '3', *options)
+    assert read_tree(tmp_path / 'pipeline') == read_tree(tmp_path / 'default')
+    run_script(tmp_path / 'input' / 'part0' / 'input0.txt', tmp_path / 'default.txt', output_format)
+    run_script(tmp_path / 'input' / 'part0' / 'input0.txt', tmp_path / 'pipeline.txt', output_format, '--pipeline', '--queue-depth', '1', '--chunk-size', '3', *options)
+    assert (tmp_path / 'pipeline.txt').read_bytes() == (tmp_path / 'default.txt').read_bytes()
+
+
+@pytest.mark.parametrize('workers', [1, 3])
+def test_read_error_keeps_earlier_files(tmp_path, workers):
+    input_files = write_inputs(tmp_path / 'input', 4)
+    run_script(tmp_path / 'input', tmp_path / 'default')
+    # the third file can not be decoded after many lines, so some of its chunks are tokenized and written before the error
+    input_files[2].write_bytes(input_files[2].read_bytes() + b'\n\xff\xfe\n')
+    file_paths = [(str(input_file), str(tmp_path / 'output' / os.path.relpath(input_file, tmp_path / 'input'))) for input_file in input_files]
+    with pytest.raises(UnicodeDecodeError):
+        tokenize_files_in_pipeline(tokenizer, file_paths, [0] * len(file_paths), 'raw', workers, 2, 1)
+    default_tree = read_tree(tmp_path / 'default')
+    assert read_tree(tmp_path / 'output') == {os.path.join('part0', 'input0.txt'): default_tree[os.path.join('part0', 'input0.txt')], os.path.join('part1', 'input1.txt'): default_tree[os.path.join('part1', 'input1.txt')]}
+    # a missing file stops the run the same way
+    os.remove(input_files[2])
+    with pytest.raises(FileNotFoundError):
+        tokenize_files_in_pipeline(tokenizer, file_paths, [0] * len(file_paths), 'raw', workers, 2, 1)
+    assert sorted(read_tree(tmp_path / 'output')) == [os.path.join('part0', 'input0.txt'), os.path.join('part1', 'input1.txt')]
+
+
+def test_file_tasks_are_taken_as_the_files_are_reached(tmp_path):
+    input_files = write_inputs(tmp_path / 'input', 3)
+    file_paths = [(str(input_file), str(tmp_path / 'output' / input_file.name)) for input_file in input_files]
+    taken = []
+
+    def iter_lang_types():
+        """Yield the language type of each file recording whether the main thread takes it."""
+        for _ in file_paths:
+            taken.append(threading.current_thread() is threading.main_thread())
+            yield 0
+
+    tokenize_files_in_pipeline(tokenizer, iter(file_paths), iter_lang_types(), 'raw', 1, 2, 1)
+    # the tasks are taken in the reading thread of the pipeline, not all of them before it starts
+    assert taken == [False] * 3
+    assert sorted(os.listdir(tmp_path / 'output')) == sorted(input_file.name for input_file in input_files)
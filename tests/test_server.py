@@ -0,0 +1,86 @@
+"""Check the responses of the server over a unix socket to a good request and to bad ones."""
+import http.client
+import io
+import json
+import socket
+import threading
+import pytest
+from tokenizer_for_indian_languages.files import write_sentence_tokens
+from tokenizer_for_indian_languages.server import create_server, tokenizers
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """Connect to a server over a unix socket."""
+
+    def __init__(self, socket_path):
+        """Keep the path of the socket, the host only names the server in the headers."""
+        super().__init__('localhost', timeout=10)
+        self.socket_path = socket_path
+
+    def connect(self):
+        """Open the unix socket."""
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+@pytest.fixture
+def socket_path(tmp_path):
+    """Serve on a unix socket in a thread without language identification."""
+    socket_path = str(tmp_path / 'tokenizer.sock')
+    server = create_server(socket_path=socket_path)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield socket_path
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+def post(socket_path, body, headers=None):
+    """Post a body to /tokenize and return the status and the json response."""
+    connection = UnixHTTPConnection(socket_path)
+    connection.request('POST', '/tokenize', body, {'Content-Type': 'application/json'} if headers is None else headers)
+    response = connection.getresponse()
+    status, data = response.status, json.loads(response.read())
+    connection.close()
+    return status, data
+
+
+def send_raw_request(socket_path, request):
+    """Send the bytes of a request as they are and return the status and the json response."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        # a server which does not answer fails the test instead of hanging it
+        client.settimeout(10)
+        client.connect(socket_path)
+        client.sendall(request)
+        response = http.client.HTTPResponse(client)
+        response.begin()
+        return response.status, json.loads(response.read())
+
+
+@pytest.mark.parametrize('output_format', ['raw', 'ssf'])
+def test_good_request(socket_path, output_format):
+    text = 'वह आया। हम गए।\n"\nसन् 2014-15 में।'
+    status, data = post(socket_path, json.dumps({'text': text, 'format': output_format}).encode('utf-8'))
+    output = io.StringIO()
+    write_sentence_tokens(output, tokenizers[output_format, True].iter_sentence_tokens([line for line in text.split('\n')], 0), output_format)
+    assert status == 200
+    assert data == {'lang_type': 0, 'output': output.getvalue()}
+
+
+def test_bad_requests(socket_path):
+    assert post(socket_path, b'{"text": ')[0] == 400
+    assert post(socket_path, b'{"format": "raw"}')[0] == 400
+    assert post(socket_path, json.dumps({'text': 'x', 'format': 'xml'}).encode('utf-8'))[0] == 400
+    # language identification is not loaded in this server
+    assert post(socket_path, json.dumps({'text': 'x', 'lang': 'auto'}).encode('utf-8'))[0] == 400
+
+
+@pytest.mark.parametrize('content_length', [b'abc', b'-1'])
+def test_bad_content_length(socket_path, content_length):
+    status, data = send_raw_request(socket_path, b'POST /tokenize HTTP/1.1\r\nHost: localhost\r\nContent-Length: ' + content_length + b'\r\n\r\n{"text": "x"}')
+    assert status == 400
+    assert 'Content-Length' in data['error']
+    # the server is still serving after the bad request
+    assert post(socket_path, b'{"text": "x"}')[0] == 200
@@ -0,0 +1,63 @@
+"""Check that the ragged offsets of tokenize_batch give the sentences of tokenize_lines."""
+import os
+from array import array
+import pytest
+from tokenizer_for_indian_languages import Tokenizer
+
+
+repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def read_sample_texts():
+    """Read the bundled samples as texts, each sample, each of its lines and a few edge texts."""
+    texts = []
+    for file_name in sorted(os.listdir(repo_root)):
+        if file_name.startswith('hindi_sample_'):
+            with open(os.path.join(repo_root, file_name), 'r', encoding='utf-8') as file_read:
+                text = file_read.read()
+            texts.append(text)
+            texts.extend(text.split('\n'))
+    # texts of blank lines, of punctuation only lines which are merged into the line before them and of carriage returns
+    return texts + ['', '   ', '\n\n', 'वह आया\n"\n।', '" ।', 'हम गए।\r\nवह आया।\r']
+
+
+def find_sentences(tokenizer, text, lang_type=0):
+    """Tokenize the lines of a text with tokenize_lines without the empty tokens."""
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    return [[token for token in tokens if token] for tokens in tokenizer.tokenize_lines(lines, lang_type)]
+
+
+@pytest.mark.parametrize('lang_type', [0, 2])
+@pytest.mark.parametrize('options', [{}, {'bullets': True, 'delimited_urls': True}, {'split_lines': False}])
+def test_batch_offsets_rebuild_sentences(options, lang_type):
+    tokenizer = Tokenizer(**options)
+    texts = read_sample_texts()
+    batch = tokenizer.tokenize_batch(texts, lang_type)
+    assert len(batch) == len(texts)
+    assert batch.sentence_offsets[-1] == len(batch.tokens)
+    assert batch.document_offsets[-1] == len(batch.sentence_offsets) - 1
+    for index, text in enumerate(texts):
+        assert batch.sentences(index) == find_sentences(tokenizer, text, lang_type), text
+
+
+def test_empty_batch():
+    batch = Tokenizer().tokenize_batch([])
+    assert len(batch) == 0
+    assert batch.tokens == []
+    assert batch.sentence_offsets == array('i', [0])
+    assert batch.document_offsets == array('i', [0])
+
+
+def test_empty_and_missing_texts():
+    tokenizer = Tokenizer()
+    batch = tokenizer.tokenize_batch(['', None, 'वह आया।', '  \n ', None])
+    assert [batch.sentences(index) for index in range(len(batch))] == [[], [], [['वह', 'आया', '।']], [], []]
+    assert batch.document_offsets == array('i', [0, 0, 0, 1, 1, 1])
+
+
+def test_to_arrow():
+    pyarrow = pytest.importorskip('pyarrow')
+    tokenizer = Tokenizer()
+    texts = read_sample_texts()
+    batch = tokenizer.tokenize_batch(pyarrow.array(texts + [None]))
+    assert batch.to_arrow().to_pylist() == [find_sentences(tokenizer, text) for text in texts] + [[]]
@@ -0,0 +1,84 @@
+"""Check that scanning a line only with the token patterns its guards allow, and only in the words which can hold a match, gives the tokens of the per word loop with every pattern."""
+import random
+import pytest
+from tokenizer_for_indian_languages import Tokenizer
+from tokenizer_for_indian_languages.patterns import pattern_guards
+from tokenizer_for_indian_languages.tokenizer import find_absent_guards
+
+
+# words which hold a match of the patterns of each guard group, with words which come close to a match without one
+guarded_words = {
+    '@': ['a.b@example.com', 'user@site.org', 'x@y.co.in', 'a@b', '@handle', 'mail@site.com,'],
+    r'www\.|://': ['http://www.example.com/a?b=1', 'https://www.x.org', 'https:\\\\www.y.in', 'www.example.com/path/i', 'www.abc', '://x', 'wwwxcom', '(www.a.com)', 'http://abc.com'],
+    r'\d[-\/\.]': ['12/05/2019', '5-6-2020', '1.5.2020', '2019-05-12', '2019/13/45', '31.12.1999,', '12-2019', '1/2'],
+    r'\d': ['1,000.50', '3.14', '10%', '1.', '12.', '2014-15', '١٢', '1٫5', '1٬000', 'a1', '42kg', '(1)'],
+    '[ء۔،؛؟٪]': ['ء2014', 'ء201', 'بات۔', '،', 'کیا؟', '٪', 'ہے؛', 'ء'],
+    '।': ['है।', '।', 'क।ख', '।।', 'गया।"', '"है।'],
+}
+
+
+def find_lines(words):
+    """Make lines of the words alone, of all of them and of each next to a word without any guard."""
+    lines = list(words) + [' '.join(words)]
+    lines.extend('भारत %s देश' % word for word in words)
+    return lines
+
+
+def test_every_guard_has_words():
+    # a new guard needs words of its own here
+    assert sorted(guarded_words) == sorted(guard for guard, _ in pattern_guards)
+    for guard_index, (guard, _) in enumerate(pattern_guards):
+        assert any(not find_absent_guards(word) >> guard_index & 1 for word in guarded_words[guard]), guard
+
+
+@pytest.mark.parametrize('delimited_urls', [False, True])
+@pytest.mark.parametrize('guard', sorted(guarded_words))
+def test_guarded_lines_match_word_loop(delimited_urls, guard):
+    tokenizer = Tokenizer(delimited_urls=delimited_urls)
+    for line in find_lines(guarded_words[guard]):
+        assert tokenizer.tokenize_line(line) == tokenizer.tokenize_words(line.split()), line
+
+
+@pytest.mark.parametrize('delimited_urls', [False, True])
+def test_lines_mixing_guard_groups_match_word_loop(delimited_urls):
+    tokenizer = Tokenizer(delimited_urls=delimited_urls)
+    words = [word for guard in sorted(guarded_words) for word in guarded_words[guard]]
+    # every pair of groups is in one line, so each line is scanned with a different set of patterns
+    for first_guard in sorted(guarded_words):
+        for second_guard in sorted(guarded_words):
+            line = ' '.join(guarded_words[first_guard] + guarded_words[second_guard])
+            assert tokenizer.tokenize_line(line) == tokenizer.tokenize_words(line.split()), line
+    line = ' '.join(words)
+    assert tokenizer.tokenize_line(line) == tokenizer.tokenize_words(line.split())
+
+
+# words whose only characters a match can start with are at their start, inside or at their end, words with a stop
+# marker inside, bullets and plain words which the fast path passes through without scanning them
+fast_path_words = [
+    'क।ख', 'abc!def', 'x?y', 'a;b', 'a_b', 'है.', 'Mr.', 'a.b.c', '...', 'end...', 'wait..', 'a-b', 'a–b', '#tag', 'x#',
+    '1.', '12.', '1.2.', 'a1.', '(1', '1)', 'क्या?', 'वह!', '"quoted"', '‘single’', 'say:', '~x', 'a=b', 'a/b', 'a\\b',
+    'plain', 'भारत', 'देश', 'ÀÉÎ', 'wwwx', 'h', 'w',
+]
+# the pieces random words are made of, they hold the start characters of every pattern and the texts of the guards
+random_word_pieces = [
+    'www.', 'http://', 'https://www.', 'https:\\\\www.', '://', '@', '.com', '.org', 'co.in', 'ء', '۔', '،', '؛', '؟',
+    '٪', '।', '١', '12', '3', '2019', '1.', '-', '/', '.', ',', '٫', '٬', '%', '"', "'", '‘', '”', '?', '!', ';', '_',
+    ':', '~', '=', '+', '*', '\\', '|', '–', '#', '(', ')', '[', '}', 'a', 'x', 'h', 'w', 'भारत', 'क', 'ा', '..', '...',
+]
+
+
+@pytest.mark.parametrize('options', [{}, {'delimited_urls': True}, {'delimited_urls': True, 'word_cache_size': 100}])
+def test_fast_path_words_match_word_loop(options):
+    tokenizer = Tokenizer(**options)
+    for line in find_lines(fast_path_words) + [' '.join(fast_path_words[index:] + fast_path_words[: index]) for index in range(len(fast_path_words))]:
+        assert tokenizer.tokenize_line(line) == tokenizer.tokenize_words(line.split()), line
+
+
+@pytest.mark.parametrize('options', [{}, {'delimited_urls': True}, {'delimited_urls': True, 'word_cache_size': 100}])
+def test_random_lines_match_word_loop(options):
+    tokenizer = Tokenizer(**options)
+    random_state = random.Random(0)
+    for _ in range(5000):
+        words = [''.join(random_state.choice(random_word_pieces) for _ in range(random_state.randint(1, 5))) for _ in range(random_state.randint(1, 6))]
+        line = random_state.choice([' ', '  ', '\t']).join(words)
+        assert tokenizer.tokenize_line(line) == tokenizer.tokenize_words(line.split()), line
@@ -0,0 +1,67 @@
+"""Check that the single scan tokenizer gives the tokens of the per word loop and that the scripts reproduce the bundled samples."""
+import os
+import subprocess
+import sys
+import pytest
+from tokenizer_for_indian_languages import Tokenizer
+
+
+repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sample_files = sorted(file_name for file_name in os.listdir(repo_root) if file_name.startswith('hindi_sample_'))
+# the sample inputs, the scripts which tokenize them and the bundled output each script must reproduce
+script_samples = [
+    ('tokenize_in_raw_format_with_sentence_tokenization.py', 'hindi_sample_raw_with_no_sentence_tokenization.txt', 'hindi_sample_raw_sentence_tokenized.txt'),
+    ('tokenize_in_raw_format_with_sentence_tokenization_and_automatic_language_identification.py', 'hindi_sample_raw_with_no_sentence_tokenization.txt', 'hindi_sample_raw_sentence_tokenized.txt'),
+    ('tokenize_in_SSF_format_with_sentence_tokenization.py', 'hindi_sample_with_sentence_tokenization.txt', 'hindi_sample_tokenized_no_sentence_tokenization.txt'),
+    ('tokenize_in_SSF_format_without_sentence_tokenization.py', 'hindi_sample_with_sentence_tokenization.txt', 'hindi_sample_tokenized_no_sentence_tokenization.txt'),
+]
+
+
+def read_sample_lines():
+    """Read the stripped non empty lines of the bundled samples."""
+    lines = []
+    for file_name in sample_files:
+        with open(os.path.join(repo_root, file_name), 'r', encoding='utf-8') as file_read:
+            lines.extend(line.strip() for line in file_read if line.strip())
+    return lines
+
+
+def run_script(script, input_file, output_file):
+    """Run a tokenizer script on a sample and return its output."""
+    subprocess.run([sys.executable, os.path.join(repo_root, script), '--input', os.path.join(repo_root, input_file), '--output', str(output_file)], cwd=repo_root, check=True)
+    with open(output_file, 'rb') as file_read:
+        return file_read.read()
+
+
+def read_ssf_sentences(ssf_text):
+    """Read the tokens of the sentences of ssf output joined with spaces."""
+    sentences = []
+    for block in ssf_text.split('\n\n'):
+        rows = [row for row in block.strip().split('\n')[1: -1] if row]
+        if block.strip():
+            sentences.append(' '.join(row.split('\t')[1] for row in rows))
+    return sentences
+
+
+@pytest.mark.parametrize('options', [{}, {'delimited_urls': True}, {'bullets': True, 'delimited_urls': True, 'word_cache_size': 1000}])
+def test_tokenize_line_matches_word_loop(options):
+    tokenizer = Tokenizer(**options)
+    for line in read_sample_lines():
+        assert tokenizer.tokenize_line(line) == tokenizer.tokenize_words(line.split()), line
+
+
+@pytest.mark.parametrize('script, input_file, expected_file', script_samples)
+def test_script_reproduces_sample(tmp_path, script, input_file, expected_file):
+    if 'automatic_language_identification' in script:
+        pytest.importorskip('transformers')
+    with open(os.path.join(repo_root, expected_file), 'rb') as file_read:
+        expected = file_read.read()
+    assert run_script(script, input_file, tmp_path / 'output.txt') == expected
+
+
+def test_raw_script_without_sentence_tokenization_matches_ssf_sample(tmp_path):
+    # the raw script without sentence tokenization has no bundled output, its sentences are those of the ssf sample
+    output = run_script('tokenize_in_raw_format_without_sentence_tokenization.py', 'hindi_sample_with_sentence_tokenization.txt', tmp_path / 'output.txt')
+    with open(os.path.join(repo_root, 'hindi_sample_tokenized_no_sentence_tokenization.txt'), 'r', encoding='utf-8') as file_read:
+        ssf_sentences = read_ssf_sentences(file_read.read())
+    assert output.decode('utf-8').split('\n')[: -1] == ssf_sentences
@@ -0,0 +1,51 @@
+"""Check that the word cache never changes the tokens or the pattern counts of --stats and that its hits, misses and evictions are counted."""
+import os
+from tokenizer_for_indian_languages import Tokenizer
+from tokenizer_for_indian_languages.profiling import Profile, ProfilingTokenizer, use_profile
+from tokenizer_for_indian_languages.tokenizer import word_cache_stats
+
+
+repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# lines whose words repeat, so the cache is hit, next to the lines of the samples
+repeated_lines = ['हम, तुम, हम, "वह" 1,000 रुपये।', 'www.example.com/a?b=1 और www.example.com/a?b=1 (देखें) 1.5%', 'हम, तुम, हम, "वह" 1,000 रुपये।']
+
+
+def read_sample_lines():
+    """Read the stripped non empty lines of the raw sample with the repeated lines."""
+    with open(os.path.join(repo_root, 'hindi_sample_raw_with_no_sentence_tokenization.txt'), 'r', encoding='utf-8') as file_read:
+        return [line.strip() for line in file_read if line.strip()] + repeated_lines
+
+
+def test_word_cache_keeps_tokens():
+    lines = read_sample_lines()
+    for options in [{}, {'bullets': True, 'delimited_urls': True}]:
+        tokenizer = Tokenizer(**options)
+        cached_tokenizer = Tokenizer(word_cache_size=1000, **options)
+        for line in lines:
+            assert cached_tokenizer.tokenize_line(line) == tokenizer.tokenize_line(line), line
+        assert cached_tokenizer.tokenize_lines(lines) == tokenizer.tokenize_lines(lines)
+
+
+def test_word_cache_stats_count_hits_misses_and_evictions():
+    tokenizer = Tokenizer(delimited_urls=True, word_cache_size=2)
+    # the cache is shared by the tokenizers of the process with the same size, it starts empty here
+    tokenizer.word_cache.cache_clear()
+    start_stats = word_cache_stats()
+    for word in ['हम,', 'तुम,', 'हम,', 'वह,', 'तुम,']:
+        tokenizer.tokenize_line(word)
+    # a plain word needs no splitting and is never looked up
+    tokenizer.tokenize_line('हम')
+    stats = word_cache_stats()
+    assert {kind: stats[kind] - start_stats[kind] for kind in ['hits', 'misses', 'evictions', 'words']} == {'hits': 1, 'misses': 4, 'evictions': 2, 'words': 2}
+
+
+def test_word_cache_keeps_pattern_counts():
+    lines = read_sample_lines()
+    pattern_counts = []
+    for word_cache_size in [0, 1000]:
+        profile = Profile()
+        with use_profile(profile):
+            ProfilingTokenizer(word_cache_size=word_cache_size).tokenize_lines(lines)
+        pattern_counts.append(profile.as_dict()['patterns'])
+    assert pattern_counts[0]
+    assert pattern_counts[1] == pattern_counts[0]
@@ -9,210 +9,89 @@
 # Hindi: hi, Odia: or, Manipuri: mn, Assamese: as, Bengali: bn, Punjabi: pa
 # Urdu: ur, Kashmiri: ks
 # English: en, Gujarati: gu, Marathi: mr, Malayalam: ml, Kannada: kn, Telugu: te, Tamil: ta
-import re
 import argparse
-import os
-from string import punctuation
-from transformers import pipeline
+import sys
+from tokenizer_for_indian_languages import Tokenizer, files
+from tokenizer_for_indian_languages.cli import add_arguments, run
+from tokenizer_for_indian_languages.files import iter_lines_from_file, read_lines_from_file
+from tokenizer_for_indian_languages.language_identification import close_language_cache, configure_language_identifier, default_language_cache_path, identify_language_type, iter_languages_of_files, iter_typed_lines, language_backends, language_type_counts
 
 
-# The below model automatically identifies the language of the input text with ISO 639-1 codes and classifies it into one of the 25 Indian languages. The model is trained on the ILID dataset and is based on the MURIL architecture. The model can be used to identify the language of the input text and then the appropriate tokenization can be applied based on the identified language.
-pipe = pipeline("text-classification", model="pruthwik/ilid-muril-model", tokenizer="google/muril-base-cased")
-# The below mapping is used to convert the predicted language index from the model into the corresponding language code, which can then be used to determine the appropriate tokenization rules for that language.
-index_to_lang = {0: 'asm', 1: 'ben', 2: 'brx', 3: 'doi', 4: 'eng', 5: 'gom', 6: 'guj', 7: 'hin', 8: 'kan', 9: 'kas', 10: 'mai', 11: 'mal', 12: 'mar', 13: 'mni_Beng', 14: 'mni_Mtei', 15: 'npi', 16: 'ory', 17: 'pan', 18: 'san', 19: 'sat', 20: 'snd_Arab', 21: 'snd_Deva', 22: 'tam', 23: 'tel', 24: 'urd'}
+# the functions and patterns the scripts exposed before the package, read_lines_from_file is kept importable from here
+__all__ = ['token_specification', 'tokenize', 'read_lines_from_file', 'read_file_and_tokenize']
 
 
-# the below code defines different kinds of regular expressions
-token_specification = [
-    ('datemonth',
-     r'^(0?[1-9]|1[012])[-\/\.](0?[1-9]|[12][0-9]|3[01])[-\/\.](1|2)\d\d\d$'),
-    ('monthdate',
-     r'^(0?[1-9]|[12][0-9]|3[01])[-\/\.](0?[1-9]|1[012])[-\/\.](1|2)\d\d\d$'),
-    ('yearmonth',
-     r'^((1|2)\d\d\d)[-\/\.](0?[1-9]|1[012])[-\/\.](0?[1-9]|[12][0-9]|3[01])'),
-    ('EMAIL1', r'([\w\.])+@(\w)+\.(com|org|co\.in)$'),
-    ('url1', r'(www\.)([-a-z0-9]+\.)*([-a-z0-9]+.*)(\/[-a-z0-9]+)*/i'),
-    ('url', r'/((?:https?\:\/\/|www\.)(?:[-a-z0-9]+\.)*[-a-z0-9]+.*)/i'),
-    ('BRACKET', r'[\(\)\[\]\{\}]'),       # Brackets
-    ('urdu_year', r'^(ء)(\d{4,4})'),
-    ('bullets', r'(\d+\.)$'), # Bullets
-    ('NUMBER', r'^(\d+)([,\.٫٬]\d+)*(\S)*'),  # Integer or decimal number
-    ('ASSIGN', r'[~:]'),          # Assignment operator
-    ('END', r'[;!_]'),           # Statement terminator
-    ('EQUAL', r'='),   # Equals
-    ('OP', r'[+*\/\-]'),    # Arithmetic operators
-    ('QUOTES', r'[\"\'‘’“”]'),          # quotes
-    ('Fullstop', r'(\.+)$'),
-    ('ellips', r'\.(\.)+'),
-    ('HYPHEN', r'[-+\|+]'),
-    ('Slashes', r'[\\\/]'),
-    ('COMMA12', r'[,%]'),
-    ('hin_stop', r'।'),
-    ('urdu_stop', r'۔'),
-    ('urdu_comma', r'،'),
-    ('urdu_semicolon', r'؛'),
-    ('urdu_question_mark', r'؟'),
-    ('urdu_percent', r'٪'),
-    ('quotes_question', r'[”\?]'),
-    ('hashtag', r'#'),
-    ('join', r'–')
-]
-# the below code converts the above expression into a python regex
-tok_regex = '|'.join('(?P<%s>%s)' % pair for pair in token_specification)
-get_token = re.compile(tok_regex, re.U)
-punctuations = punctuation + '\"\'‘’“”'
+# bullets are joined to the text after them and the url patterns are written with / delimiters in this tokenizer
+tokenizer = Tokenizer(bullets=True, delimited_urls=True)
+token_specification = tokenizer.token_specification
+tok_regex = tokenizer.get_token.pattern
+get_token = tokenizer.get_token
+get_line_tokens = tokenizer.get_line_tokens
+tokenize = tokenizer.tokenize_words
+tokenize_line = tokenizer.tokenize_line
 
 
-def find_language(text):
-    """Identify the language of the input text using the pre-trained model."""
-    label = pipe(text[: 300])[0]['label'].split("_")[-1]
-    lang_name = index_to_lang[int(label)]
-    return lang_name
-
-
-def tokenize(list_s):
-    """Tokenize a list of tokens."""
-    tkns = []
-    for wrds in list_s:
-        wrds_len = len(wrds)
-        initial_pos = 0
-        end_pos = 0
-        while initial_pos <= (wrds_len - 1):
-            mo = get_token.match(wrds, initial_pos)
-            if mo is not None and len(mo.group(0)) == wrds_len:
-                if mo.lastgroup == 'urdu_year':
-                    tkns.append(wrds[: -4])
-                    tkns.append(wrds[-4:])
-                else:
-                    tkns.append(wrds)
-                initial_pos = wrds_len
-            else:
-                match_out = get_token.search(wrds, initial_pos)
-                if match_out is not None:
-                    end_pos = match_out.end()
-                    if match_out.lastgroup in ["NUMBER", "bullets"]:
-                        aa = wrds[initial_pos:(end_pos)]
-                    else:
-                        aa = wrds[initial_pos:(end_pos - 1)]
-                    if aa != '':
-                        tkns.append(aa)
-                    if match_out.lastgroup not in ["NUMBER", "bullets"]:
-                        tkns.append(match_out.group(0))
-                    initial_pos = end_pos
-                else:
-                    tkns.append(wrds[initial_pos:])
-                    initial_pos = wrds_len
-    return tkns
-
-
-def read_lines_from_file(file_path):
-    """Read lines from a file."""
-    with open(file_path, 'r', encoding='utf-8') as file_read:
-        return [line.strip() for line in file_read.readlines() if line.strip()]
-
-
-def proper_bullet_creation(text, pattern):
-    """Create proper bullet points after removing spaces between them."""
-    text = re.sub('\\s{2,}', ' ', text)
-    updated_text = ''
-    bullet_patterns = re.finditer(pattern, text)
-    bullet_patterns = list(bullet_patterns)
-    if not bullet_patterns:
-        updated_text = text
-    else:
-        prev_end = -100000
-        for bullet_pattern in bullet_patterns:
-            start, end = bullet_pattern.start(), bullet_pattern.end()
-            if start == prev_end:
-                updated_text = updated_text.strip()
-                updated_text += bullet_pattern.group(1)
-            else:
-                updated_text += text[prev_end: start]
-                updated_text += bullet_pattern.group(1)
-            prev_end = end
-        if end != len(text):
-            updated_text += text[end:]
-    return updated_text
+def iter_tokenized_sentences(file_read, lang_type=None):
+    """Yield the tokenized sentences of an open file keeping only one sentence of lookahead in memory."""
+    lines = iter_lines_from_file(file_read)
+    if lang_type is None:
+        lang_type, lines = identify_language_type(lines)
+    return tokenizer.iter_sentences(lines, lang_type)
 
 
 def read_file_and_tokenize(input_file):
     """Read a file and tokenize its content by specifying the input file path and language type."""
-    lines = read_lines_from_file(input_file)
-    pattern = '(\\d+\\.\\s?)'
-    lines = [proper_bullet_creation(line, pattern) for line in lines]
-    text = '\n'.join(lines)
-    lang_name = find_language(text)
-    if lang_name in ['hin', 'ory', 'mni_Beng', 'mni_Mtei', 'asm', 'ben', 'pan', 'snd_Deva', 'sat', 'san', 'doi', 'brx', 'gom', 'mai']:
-        lang_type = 0
-    elif lang_name in ['ur', 'ks', 'snd_Arab']:
-        lang_type = 1
-    elif lang_name in ['eng', 'guj', 'mar', 'mal', 'kan', 'tel', 'tam']:
-        lang_type = 2
-    if lang_type == 0:
-        sentences = re.findall('.*?।|.*?\n', text + '\n', re.UNICODE)
-        end_markers = ['?', '।', '!', '|']
-    elif lang_type == 1:
-        sentences = re.findall('.*?\n', text + '\n', re.UNICODE)
-        end_markers = ['؟', '!', '|', '۔']
-    else:
-        sentences = re.findall('.*?\n', text + '\n', re.UNICODE)
-        end_markers = ['?', '.', '!', '|']
-    proper_sentences = list()
-    for index, sentence in enumerate(sentences):
-        sentence = sentence.strip()
-        if sentence != '':
-            list_tokens = tokenize(sentence.split())
-            end_sentence_markers = [index + 1 for index, token in enumerate(list_tokens) if token in end_markers]
-            if len(end_sentence_markers) > 0:
-                if end_sentence_markers[-1] != len(list_tokens):
-                    end_sentence_markers += [len(list_tokens)]
-                end_sentence_markers_with_sentence_end_positions = [0] + end_sentence_markers
-                sentence_boundaries = list(zip(end_sentence_markers_with_sentence_end_positions, end_sentence_markers_with_sentence_end_positions[1:]))
-                for start, end in sentence_boundaries:
-                    individual_sentence = list_tokens[start: end]
-                    proper_sentences.append(' '.join(individual_sentence))
-            else:
-                proper_sentences.append(' '.join(list_tokens))
-            if index < len(sentences) - 1:
-                next_sentence = sentences[index + 1]
-                next_tokens = tokenize(next_sentence.split())
-                punct_flag = True
-                for token in next_tokens:
-                    punct_flag &= token in punctuations
-                if punct_flag:
-                    if proper_sentences:
-                        proper_sentences[-1] += ' ' + ' '.join(next_tokens)
-                        sentences[index + 1] = ''
-    return proper_sentences
+    with open(input_file, 'r', encoding='utf-8') as file_read:
+        return list(iter_tokenized_sentences(file_read))
 
 
-def write_list_to_file(output_file, data_list):
-    """Write a list to a file."""
-    with open(output_file, 'w', encoding='utf-8') as file_write:
-        file_write.write('\n'.join(data_list) + '\n')
+def tokenize_file(input_file, output_file, lang_type=None, executor=None, chunk_size=10000):
+    """Tokenize a file into an output file sentence by sentence, chunks are tokenized in parallel when an executor is given."""
+    with open(input_file, 'r', encoding='utf-8') as file_read:
+        lines = iter_lines_from_file(file_read)
+        if lang_type is None:
+            lang_type, lines = identify_language_type(lines)
+        files.tokenize_lines_into_file(tokenizer, lines, output_file, lang_type, 'raw', executor, chunk_size)
 
 
 def main():
     """Pass arguments and call functions here."""
     parser = argparse.ArgumentParser()
+    add_arguments(parser, lang=False)
+    parser.add_argument(
+        '--batch-size', dest='batch_size', help="enter the number of files or runs of lines whose languages are identified in one model call", type=int, default=32)
+    parser.add_argument(
+        '--lid-level', dest='lid_level', help="identify the language of every file from its beginning or of every line, the lines of different language types in a file are split into sentences with the end markers of their own type", choices=['file', 'line'], default='file')
+    parser.add_argument(
+        '--torch-threads', dest='torch_threads', help="enter the number of threads used by torch or onnxruntime for the model on cpu", type=int, default=None)
+    parser.add_argument(
+        '--lid-backend', dest='lid_backend', help="run the model with the fp32 pytorch pipeline, an exported onnx model or the model quantized to int8 when it is loaded", choices=language_backends, default='pytorch')
+    parser.add_argument(
+        '--lid-model', dest='lid_model', help="enter the local path of the model of the backend, the exported .onnx file or its folder for onnx", default=None)
+    parser.add_argument(
+        '--lid-max-length', dest='lid_max_length', help="enter the number of word pieces the texts are cut at, by default 128 for onnx and quantized and no limit for pytorch", type=int, default=None)
+    parser.add_argument(
+        '--lid-cache', dest='lid_cache', help="enter the path of the language identification cache, runs at the same time such as the shards of a corpus on one machine wait for each other on the same sqlite file, so give each of them a cache of its own", default=default_language_cache_path)
+    parser.add_argument(
+        '--lid-cache-size', dest='lid_cache_size', help="enter the maximum number of entries in the language identification cache", type=int, default=1000000)
+    parser.add_argument(
+        '--no-lid-cache', dest='no_lid_cache', help="do not use the language identification cache", action='store_true')
     parser.add_argument(
-        '--input', dest='inp', help="enter the input file path")
+        '--no-script-lid', dest='no_script_lid', help="always use the model instead of deciding the language type from the script when it is unambiguous", action='store_true')
     parser.add_argument(
-        '--output', dest='out', help="enter the output file path")
+        '--lid-stats', dest='lid_stats', help="print how often the language type was decided by the script and by the model", action='store_true')
     args = parser.parse_args()
-    if os.path.isdir(args.inp) and not os.path.isdir(args.out):
-        os.mkdir(args.out)
-    if not os.path.isdir(args.inp):
-        sentences = read_file_and_tokenize(args.inp)
-        write_list_to_file(args.out, sentences)
+    configure_language_identifier(args.torch_threads, None if args.no_lid_cache else args.lid_cache, args.lid_cache_size, not args.no_script_lid, args.lid_backend, args.lid_model, args.lid_max_length)
+    if args.lid_level == 'line':
+        run(args, tokenizer, 'raw', identify_lines=lambda lines: iter_typed_lines(lines, args.batch_size))
     else:
-        for root, dirs, files in os.walk(args.inp):
-            for fl in files:
-                input_file_path = os.path.join(root, fl)
-                lang = 0
-                sentences = read_file_and_tokenize(input_file_path)
-                output_file_path = os.path.join(args.out, fl)
-                write_list_to_file(output_file_path, sentences)
+        run(args, tokenizer, 'raw', find_languages=lambda input_files: iter_languages_of_files(input_files, args.batch_size))
+    close_language_cache()
+    if args.lid_stats:
+        if args.lid_level == 'line':
+            print('lines decided by script: %d, by model: %d, by the line before them: %d' % (language_type_counts['segment_script'], language_type_counts['segment_model'], language_type_counts['segment_neighbour']), file=sys.stderr)
+        else:
+            print('language type decided by script: %d, by model: %d' % (language_type_counts['script'], language_type_counts['model']), file=sys.stderr)
 
 
 if __name__ == '__main__':
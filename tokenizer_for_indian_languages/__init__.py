@@ -0,0 +1,6 @@
+"""Tokenizer for Indian languages, the output can be raw or in Shakti Standard Format.
+
+The language identification model is in tokenizer_for_indian_languages.language_identification,
+it is not imported here so that importing the tokenizer stays cheap.
+"""
+from .tokenizer import Tokenizer, find_lang_type, lang_codes, word_cache_stats
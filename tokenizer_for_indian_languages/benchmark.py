@@ -0,0 +1,412 @@
+"""Benchmark the stages of the tokenizer on generated or given corpora and compare the results of two versions."""
+# how to run the code
+# python3 -m tokenizer_for_indian_languages.benchmark --sizes 1M,10M --output results.json
+# python3 -m tokenizer_for_indian_languages.benchmark --sizes 1M --repeat 3 --baseline old_results.json
+# python3 -m tokenizer_for_indian_languages.benchmark --sizes 1M,10M --baseline old_results.json
+# python3 -m tokenizer_for_indian_languages.benchmark --compare old_results.json new_results.json
+# the results of two versions are compared by running the benchmark in both checkouts with --output and then --compare
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from .files import convert_raw_sentences_into_ssf_format, iter_lines_from_file, write_ssf_sentences
+from .language_identification import find_languages, find_script_language_type, load_language_identifier, read_language_prefix
+from .patterns import punctuations
+from .tokenizer import Tokenizer, compile_token_patterns, proper_bullet_creation
+
+
+# the words and sentence end markers of the generated corpus of each language type
+corpus_words = {
+    0: 'भारत एक विशाल देश है जहाँ अनेक भाषाएँ बोली जाती हैं सरकार ने किसानों के लिए नई योजना की घोषणा की और लोगों ने इसका स्वागत किया राज्य में बारिश से फसलों को नुकसान हुआ'.split(),
+    1: 'پاکستان اور بھارت کے درمیان بات چیت جاری ہے حکومت نے کسانوں کے لیے نئی پالیسی کا اعلان کیا اور لوگوں نے اس کا خیر مقدم کیا شہر میں بارش سے نقصان ہوا'.split(),
+    2: 'the government announced a new scheme for farmers in the state on monday and people across the country welcomed it after heavy rain damaged the crops'.split(),
+}
+corpus_end_markers = {
+    0: ['।', '।', '।', '?', '!'],
+    1: ['۔', '۔', '۔', '؟', '!'],
+    2: ['.', '.', '.', '?', '!'],
+}
+# the tokens which exercise the other patterns of the token specification
+corpus_special_tokens = ['12/05/2023', '2023-05-12', '1,234.56', '42', 'info@example.com', 'https://www.example.com/news', 'www.example.org', '(', ')', '"', '‘', '’', ',', ':', '-', '...', '#tag', '۲۳', 'ء1999', '50%']
+corpus_pool_size = 20000
+# the stages which are timed, each one runs in a process of its own so that its peak memory is measured alone
+stages = ['read', 'proper_bullet_creation', 'sentence_split', 'iter_line_matches', 'unguarded_line_matches', 'tokenize', 'cached_tokenize', 'sentences', 'lookahead_tokenize_calls', 'text_sentences', 'batch_sentences', 'convert_raw_sentences_into_ssf_format', 'write_ssf_sentences', 'find_script_language_type', 'find_language']
+# the size of the word cache of the cached_tokenize stage
+benchmark_word_cache_size = 100000
+# the lines of a corpus are read in batches of this size, only the work of the stage on a batch is timed
+batch_lines = 10000
+# a document for language identification is made of this many lines
+document_lines = 20
+
+
+class CountingTokenizer(Tokenizer):
+    """A tokenizer which counts its tokenize_line calls, for the lookahead_tokenize_calls stage."""
+
+    def __init__(self, *args, **kwargs):
+        """Create the tokenizer with no calls counted."""
+        super().__init__(*args, **kwargs)
+        self.tokenize_calls = 0
+
+    def tokenize_line(self, line):
+        """Tokenize a line counting the call."""
+        self.tokenize_calls += 1
+        return super().tokenize_line(line)
+
+
+def run_old_lookahead(tokenizer, raw_sentences):
+    """Make the tokenize calls of the sentence loop before the punctuation lookahead was rebuilt, the next sentence was tokenized for the check and again on its own turn."""
+    sentences = list(raw_sentences)
+    for index, sentence in enumerate(sentences):
+        if sentence.strip() != '':
+            tokenizer.tokenize_line(sentence.strip())
+            if index < len(sentences) - 1:
+                next_tokens = tokenizer.tokenize_line(sentences[index + 1].strip())
+                if all(token in punctuations for token in next_tokens):
+                    sentences[index + 1] = ''
+
+
+def parse_size(size):
+    """Convert a size like 512K, 10M or 2G into a number of bytes."""
+    units = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+    size = size.strip().upper()
+    if size[-1:] in units:
+        return int(float(size[: -1]) * units[size[-1]])
+    return int(size)
+
+
+def generate_line(rng, lang_type):
+    """Generate a line of one to four sentences with some numbers, dates, urls, quotes and bullets in it."""
+    words = corpus_words[lang_type]
+    line_kind = rng.random()
+    if line_kind < 0.02:
+        # a line of punctuation only is merged into the sentence before it
+        return rng.choice(['"', '...', '" )'])
+    sentences = []
+    for sentence_index in range(rng.randint(1, 4)):
+        tokens = [rng.choice(words) for _ in range(rng.randint(4, 20))]
+        for _ in range(rng.randint(0, 2)):
+            tokens.insert(rng.randrange(len(tokens) + 1), rng.choice(corpus_special_tokens))
+        if line_kind < 0.1:
+            tokens.insert(0, '%d.' % (sentence_index + 1))
+        sentences.append(' '.join(tokens) + ' ' + rng.choice(corpus_end_markers[lang_type]))
+    return ' '.join(sentences)
+
+
+def generate_corpus(corpus_path, lang_type, size, seed=0):
+    """Write a corpus of at least size bytes, the lines are drawn from a pool of generated lines."""
+    rng = random.Random('%d-%d' % (seed, lang_type))
+    pool = [generate_line(rng, lang_type) + '\n' for _ in range(corpus_pool_size)]
+    corpus_folder = os.path.dirname(corpus_path)
+    if corpus_folder and not os.path.isdir(corpus_folder):
+        os.makedirs(corpus_folder)
+    written = 0
+    # the corpus is renamed into place when it is complete so that an interrupted run does not leave a short corpus behind
+    with open(corpus_path + '.tmp', 'w', encoding='utf-8') as file_write:
+        while written < size:
+            block = ''.join(rng.choices(pool, k=1000))
+            file_write.write(block)
+            written += len(block.encode('utf-8'))
+    os.replace(corpus_path + '.tmp', corpus_path)
+
+
+def iter_line_batches(corpus_path):
+    """Yield the stripped non empty lines of a corpus in batches, the time to read each batch is given with it."""
+    with open(corpus_path, 'r', encoding='utf-8') as file_read:
+        lines = iter_lines_from_file(file_read)
+        while True:
+            start = time.perf_counter()
+            batch = [line for _, line in zip(range(batch_lines), lines)]
+            read_seconds = time.perf_counter() - start
+            if not batch:
+                break
+            yield batch, read_seconds
+
+
+def find_peak_rss():
+    """Return the peak resident memory of this process in MB."""
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # linux gives the peak in KB and macos in bytes
+    if sys.platform == 'darwin':
+        return peak_rss / 1024 ** 2
+    return peak_rss / 1024
+
+
+def run_stage(stage, corpus_path, lang_type, lid_documents=256, batch_size=32):
+    """Time one stage over a corpus, this runs in a fresh worker process."""
+    tokenizer = Tokenizer(bullets=True, delimited_urls=True)
+    # the sentence split stage times the splitting of lines only, without joining the bullets
+    split_tokenizer = Tokenizer(delimited_urls=True)
+    # the word cache starts empty in the process of the stage, so its misses are timed too
+    cached_tokenizer = Tokenizer(bullets=True, delimited_urls=True, word_cache_size=benchmark_word_cache_size)
+    result = {'seconds': 0.0, 'bytes': 0, 'lines': 0, 'tokens': 0, 'sentences': 0, 'texts': 0}
+    prefix_texts = []
+    for batch, read_seconds in iter_line_batches(corpus_path):
+        result['lines'] += len(batch)
+        if stage == 'read':
+            result['seconds'] += read_seconds
+            result['bytes'] += sum(len(line.encode('utf-8')) for line in batch)
+            continue
+        if stage in ['find_script_language_type', 'find_language']:
+            batch_prefix_texts = [read_language_prefix(batch[document_start: document_start + document_lines])[0] for document_start in range(0, len(batch), document_lines)]
+            if stage == 'find_script_language_type':
+                start = time.perf_counter()
+                for text in batch_prefix_texts:
+                    find_script_language_type(text)
+                result['seconds'] += time.perf_counter() - start
+                result['texts'] += len(batch_prefix_texts)
+                result['bytes'] += sum(len(text.encode('utf-8')) for text in batch_prefix_texts)
+                continue
+            # the model is slow so only the first lid_documents documents are identified
+            prefix_texts.extend(batch_prefix_texts[: lid_documents - len(prefix_texts)])
+            if len(prefix_texts) >= lid_documents:
+                break
+            continue
+        result['bytes'] += sum(len(line.encode('utf-8')) for line in batch)
+        if stage == 'proper_bullet_creation':
+            start = time.perf_counter()
+            for line in batch:
+                proper_bullet_creation(line)
+            result['seconds'] += time.perf_counter() - start
+        elif stage == 'sentence_split':
+            start = time.perf_counter()
+            result['sentences'] += sum(1 for _ in split_tokenizer.iter_raw_sentences(batch, lang_type))
+            result['seconds'] += time.perf_counter() - start
+        elif stage == 'iter_line_matches':
+            start = time.perf_counter()
+            for line in batch:
+                result['tokens'] += sum(1 for _ in tokenizer.iter_line_matches(line))
+            result['seconds'] += time.perf_counter() - start
+        elif stage == 'unguarded_line_matches':
+            # the single regex of every pattern which scanned all lines before the patterns were guarded
+            line_regex = compile_token_patterns(tokenizer.delimited_urls)[2]
+            start = time.perf_counter()
+            for line in batch:
+                result['tokens'] += sum(1 for _ in line_regex.finditer(line))
+            result['seconds'] += time.perf_counter() - start
+        elif stage == 'tokenize':
+            start = time.perf_counter()
+            for line in batch:
+                result['tokens'] += len(tokenizer.tokenize_line(line))
+            result['seconds'] += time.perf_counter() - start
+        elif stage == 'cached_tokenize':
+            start = time.perf_counter()
+            for line in batch:
+                result['tokens'] += len(cached_tokenizer.tokenize_line(line))
+            result['seconds'] += time.perf_counter() - start
+        elif stage == 'sentences':
+            start = time.perf_counter()
+            for tokens in tokenizer.iter_sentence_tokens(batch, lang_type):
+                result['sentences'] += 1
+                result['tokens'] += len(tokens)
+            result['seconds'] += time.perf_counter() - start
+        elif stage == 'lookahead_tokenize_calls':
+            # the tokenize calls of one sentence split pass with the lookahead of the tokenizer and with the old one
+            raw_sentences = list(tokenizer.iter_raw_sentences(batch, lang_type))
+            counting_tokenizer = CountingTokenizer(*tokenizer.options())
+            start = time.perf_counter()
+            for tokens in counting_tokenizer.iter_raw_sentence_tokens(raw_sentences, lang_type):
+                result['sentences'] += 1
+                result['tokens'] += len(tokens)
+            result['seconds'] += time.perf_counter() - start
+            result['tokenize_calls'] = result.get('tokenize_calls', 0) + counting_tokenizer.tokenize_calls
+            old_counting_tokenizer = CountingTokenizer(*tokenizer.options())
+            run_old_lookahead(old_counting_tokenizer, raw_sentences)
+            result['old_tokenize_calls'] = result.get('old_tokenize_calls', 0) + old_counting_tokenizer.tokenize_calls
+        elif stage == 'text_sentences':
+            # every line is a text of its own tokenized with a call of its own, like the short texts of an ingestion service
+            start = time.perf_counter()
+            text_sentences = [tokenizer.tokenize_text(line, lang_type) for line in batch]
+            result['seconds'] += time.perf_counter() - start
+            result['sentences'] += sum(len(sentences) for sentences in text_sentences)
+            result['tokens'] += sum(len(sentence.split()) for sentences in text_sentences for sentence in sentences)
+        elif stage == 'batch_sentences':
+            # the same texts tokenized with one call for the whole batch
+            start = time.perf_counter()
+            token_batch = tokenizer.tokenize_batch(batch, lang_type)
+            result['seconds'] += time.perf_counter() - start
+            result['sentences'] += len(token_batch.sentence_offsets) - 1
+            result['tokens'] += len(token_batch.tokens)
+        elif stage == 'convert_raw_sentences_into_ssf_format':
+            sentences = list(tokenizer.iter_sentences(batch, lang_type))
+            start = time.perf_counter()
+            convert_raw_sentences_into_ssf_format(sentences)
+            result['seconds'] += time.perf_counter() - start
+            result['sentences'] += len(sentences)
+        elif stage == 'write_ssf_sentences':
+            sentences = list(tokenizer.iter_sentence_tokens(batch, lang_type))
+            start = time.perf_counter()
+            write_ssf_sentences(io.StringIO(), sentences)
+            result['seconds'] += time.perf_counter() - start
+            result['sentences'] += len(sentences)
+            result['tokens'] += sum(len(tokens) for tokens in sentences)
+    if stage == 'find_language':
+        try:
+            start = time.perf_counter()
+            load_language_identifier()
+            result['load_seconds'] = time.perf_counter() - start
+        except ImportError as error:
+            return {'skipped': str(error)}
+        start = time.perf_counter()
+        find_languages(prefix_texts, batch_size)
+        result['seconds'] = time.perf_counter() - start
+        result['texts'] = len(prefix_texts)
+        result['bytes'] = sum(len(text.encode('utf-8')) for text in prefix_texts)
+    result['peak_rss_mb'] = find_peak_rss()
+    return result
+
+
+def add_rates(result):
+    """Add the throughput of a stage result."""
+    seconds = max(result['seconds'], 1e-9)
+    result['mb_per_sec'] = result['bytes'] / 1024 ** 2 / seconds
+    result['tokens_per_sec'] = result['tokens'] / seconds
+    result['sentences_per_sec'] = result['sentences'] / seconds
+    result['texts_per_sec'] = result['texts'] / seconds
+    return result
+
+
+def find_version():
+    """Find the git commit of the checkout which is benchmarked."""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(corpora, selected_stages, lid_documents=256, batch_size=32, repeat=1):
+    """Run the selected stages on corpora given as (name, lang_type, path) and return the results, the fastest of repeat runs of a stage is kept."""
+    results = {'version': find_version(), 'python': platform.python_version(), 'results': []}
+    for name, lang_type, corpus_path in corpora:
+        for stage in selected_stages:
+            result = None
+            for _ in range(repeat):
+                # a fresh spawned process for every run keeps the peak memory of the stages apart
+                with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn')) as executor:
+                    run_result = executor.submit(run_stage, stage, corpus_path, lang_type, lid_documents, batch_size).result()
+                if result is None or 'skipped' in run_result or run_result['seconds'] < result['seconds']:
+                    result = run_result
+            if 'skipped' not in result:
+                add_rates(result)
+            result.update({'corpus': name, 'lang_type': lang_type, 'stage': stage})
+            results['results'].append(result)
+            print_result(result)
+    return results
+
+
+def print_result(result):
+    """Print one stage result as a line of the report."""
+    if 'skipped' in result:
+        print('%-14s %-38s skipped: %s' % (result['corpus'], result['stage'], result['skipped']))
+        return
+    print('%-14s %-38s %9.2f MB %8.3f s %9.2f MB/s %12.0f tokens/s %10.0f sentences/s %8.1f MB rss' % (
+        result['corpus'], result['stage'], result['bytes'] / 1024 ** 2, result['seconds'], result['mb_per_sec'],
+        result['tokens_per_sec'], result['sentences_per_sec'], result['peak_rss_mb']))
+
+
+def print_guard_speedups(results):
+    """Print how much faster iter_line_matches scans each corpus than the regex of every pattern, the tokenize calls of the old and new punctuation lookahead and how much faster batch_sentences tokenizes its lines than text_sentences."""
+    stage_results = {(result['corpus'], result['stage']): result for result in results['results'] if 'skipped' not in result}
+    for (corpus, stage), result in stage_results.items():
+        unguarded_result = stage_results.get((corpus, 'unguarded_line_matches'))
+        if stage == 'iter_line_matches' and unguarded_result is not None:
+            print('%-14s lang_type %d guarded patterns scan %5.2fx faster' % (corpus, result['lang_type'], unguarded_result['seconds'] / max(result['seconds'], 1e-9)))
+        if stage == 'lookahead_tokenize_calls':
+            print('%-14s lang_type %d lookahead makes %d tokenize calls, the old lookahead %d (%.2fx)' % (corpus, result['lang_type'], result['tokenize_calls'], result['old_tokenize_calls'], result['old_tokenize_calls'] / max(result['tokenize_calls'], 1)))
+        text_result = stage_results.get((corpus, 'text_sentences'))
+        if stage == 'batch_sentences' and text_result is not None:
+            print('%-14s lang_type %d batch of texts tokenized %5.2fx faster' % (corpus, result['lang_type'], text_result['seconds'] / max(result['seconds'], 1e-9)))
+
+
+def compare_results(old_results, new_results, threshold=0.05):
+    """Print the change in throughput and memory of every stage, the number of regressions beyond threshold is returned."""
+    old_stages = {(result['corpus'], result['stage']): result for result in old_results['results'] if 'skipped' not in result}
+    regressions = 0
+    print('comparing %s with %s' % (old_results.get('version'), new_results.get('version')))
+    for result in new_results['results']:
+        old_result = old_stages.get((result['corpus'], result['stage']))
+        if old_result is None or 'skipped' in result:
+            continue
+        speedup = result['mb_per_sec'] / max(old_result['mb_per_sec'], 1e-9)
+        rss_change = result['peak_rss_mb'] / max(old_result['peak_rss_mb'], 1e-9)
+        # memory changes below 1 MB are noise of the interpreter
+        is_regression = speedup < 1 - threshold or (rss_change > 1 + threshold and result['peak_rss_mb'] - old_result['peak_rss_mb'] > 1)
+        regressions += is_regression
+        print('%-14s %-38s %9.2f -> %9.2f MB/s (%5.2fx) %8.1f -> %8.1f MB rss%s' % (
+            result['corpus'], result['stage'], old_result['mb_per_sec'], result['mb_per_sec'], speedup,
+            old_result['peak_rss_mb'], result['peak_rss_mb'], '  REGRESSION' if is_regression else ''))
+    return regressions
+
+
+def main():
+    """Pass arguments and call functions here."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--sizes', dest='sizes', help="enter the comma separated sizes of the generated corpora, like 1M,10M,1G", default='1M,10M')
+    parser.add_argument(
+        '--lang-types', dest='lang_types', help="enter the comma separated language types of the generated corpora", default='0,1,2')
+    parser.add_argument(
+        '--corpus', dest='corpus', help="enter a corpus file to benchmark as lang_type:path instead of generated corpora, can be repeated", action='append', default=[])
+    parser.add_argument(
+        '--corpus-dir', dest='corpus_dir', help="enter the folder where the generated corpora are kept", default=os.path.join(os.path.expanduser('~'), '.cache', 'tokenizer_for_indian_languages', 'benchmark'))
+    parser.add_argument(
+        '--stages', dest='stages', help="enter the comma separated stages to time, find_language needs the model", default=','.join(stage for stage in stages if stage != 'find_language'))
+    parser.add_argument(
+        '--lid', dest='lid', help="also time find_language with the model", action='store_true')
+    parser.add_argument(
+        '--lid-documents', dest='lid_documents', help="enter the number of documents whose language is identified by find_language", type=int, default=256)
+    parser.add_argument(
+        '--batch-size', dest='batch_size', help="enter the number of texts identified in one model call", type=int, default=32)
+    parser.add_argument(
+        '--repeat', dest='repeat', help="enter the number of runs of every stage, the fastest run is kept", type=int, default=1)
+    parser.add_argument(
+        '--output', dest='out', help="enter the path of the json file for the results", default=None)
+    parser.add_argument(
+        '--baseline', dest='baseline', help="enter the json results of another version to compare this run with", default=None)
+    parser.add_argument(
+        '--compare', dest='compare', help="enter two json result files to compare without running the benchmark", nargs=2, default=None)
+    parser.add_argument(
+        '--threshold', dest='threshold', help="enter the relative slowdown or memory growth that counts as a regression", type=float, default=0.05)
+    args = parser.parse_args()
+    if args.compare:
+        with open(args.compare[0], 'r', encoding='utf-8') as old_file, open(args.compare[1], 'r', encoding='utf-8') as new_file:
+            regressions = compare_results(json.load(old_file), json.load(new_file), args.threshold)
+        sys.exit(1 if regressions else 0)
+    selected_stages = args.stages.split(',')
+    if args.lid and 'find_language' not in selected_stages:
+        selected_stages.append('find_language')
+    unknown_stages = set(selected_stages) - set(stages)
+    if unknown_stages:
+        parser.error('unknown stages: %s' % ', '.join(sorted(unknown_stages)))
+    corpora = []
+    for corpus in args.corpus:
+        lang_type, corpus_path = corpus.split(':', 1)
+        corpora.append((os.path.basename(corpus_path), int(lang_type), corpus_path))
+    if not corpora:
+        for size in args.sizes.split(','):
+            for lang_type in map(int, args.lang_types.split(',')):
+                corpus_path = os.path.join(args.corpus_dir, 'lang%d_%s.txt' % (lang_type, size))
+                if not os.path.isfile(corpus_path):
+                    print('generating %s' % corpus_path, file=sys.stderr)
+                    generate_corpus(corpus_path, lang_type, parse_size(size))
+                corpora.append(('lang%d_%s' % (lang_type, size), lang_type, corpus_path))
+    results = run_benchmark(corpora, selected_stages, args.lid_documents, args.batch_size, args.repeat)
+    print_guard_speedups(results)
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as file_write:
+            json.dump(results, file_write, indent=2)
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as file_read:
+            regressions = compare_results(json.load(file_read), results, args.threshold)
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
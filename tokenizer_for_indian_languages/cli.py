@@ -0,0 +1,181 @@
+"""Command line arguments and the file and folder handling shared by the tokenizer scripts."""
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from .corpus import CorpusWriter, corpus_formats, jsonl_compressions, parquet_compressions, write_corpus
+from .files import extra_output_formats, find_folder_files, select_shard, tokenize_files
+from .manifest import find_settings, manifest_name, plan_incremental_run, remove_outputs, shard_manifest_name, write_manifest
+from .pipeline import default_queue_depth, tokenize_files_in_pipeline
+from .profiling import Profile, ProfilingExecutor, ProfilingTokenizer, record_word_cache, use_profile, write_stats
+from .tokenizer import word_cache_stats
+
+
+def parse_shard(shard):
+    """Parse a shard given as i/N into its index and the number of shards."""
+    try:
+        shard_index, shard_count = map(int, shard.split('/'))
+    except ValueError:
+        raise argparse.ArgumentTypeError('a shard is given as i/N, for example 1/4')
+    if not 1 <= shard_index <= shard_count:
+        raise argparse.ArgumentTypeError('the shard index must be between 1 and the number of shards')
+    return shard_index, shard_count
+
+
+def parse_extra_output(extra_output):
+    """Parse an extra output given as FORMAT:PATH into its format and path."""
+    output_format, _, output_path = extra_output.partition(':')
+    if output_format not in extra_output_formats or not output_path:
+        raise argparse.ArgumentTypeError('an extra output is given as FORMAT:PATH with FORMAT one of %s' % ', '.join(extra_output_formats))
+    return output_format, output_path
+
+
+def find_extra_outputs(file_paths, output_root, extra_outputs, is_folder):
+    """Find the (output file, output format) of every extra output of each pair of input and output files, an extra output root mirrors the output folder or is the output file of a single file."""
+    file_extra_outputs = []
+    for _, output_file_path in file_paths:
+        if is_folder:
+            output_name = os.path.relpath(output_file_path, output_root)
+            file_extra_outputs.append([(os.path.join(extra_root, output_name), output_format) for output_format, extra_root in extra_outputs])
+        else:
+            file_extra_outputs.append([(extra_root, output_format) for output_format, extra_root in extra_outputs])
+    return file_extra_outputs
+
+
+def add_arguments(parser, lang=True):
+    """Add the arguments of the tokenizer scripts to a parser, lang adds the language code argument."""
+    parser.add_argument(
+        '--input', dest='inp', help="enter the input file path")
+    parser.add_argument(
+        '--output', dest='out', help="enter the output file path")
+    if lang:
+        parser.add_argument(
+            '--lang', dest='lang', help="enter the language code, 2 lettered ISO 639-1 language codes", default='hi')
+    parser.add_argument(
+        '--workers', dest='workers', help="enter the number of worker processes", type=int, default=1)
+    parser.add_argument(
+        '--parallel', dest='parallel', help="share the work between the workers at file or chunk level in folder mode", choices=['file', 'chunk'], default='file')
+    parser.add_argument(
+        '--chunk-size', dest='chunk_size', help="enter the number of lines in a chunk for chunk level parallelism", type=int, default=10000)
+    parser.add_argument(
+        '--mmap', dest='mmap', help="read the input files through mmap, with --workers each worker reads and tokenizes byte ranges of a file itself, for very large files", action='store_true')
+    parser.add_argument(
+        '--pipeline', dest='pipeline', help="read, tokenize and write in an asyncio pipeline whose stages run at the same time, the chunks of the next files are read and tokenized while a file is written, for inputs and outputs on slow storage", action='store_true')
+    parser.add_argument(
+        '--queue-depth', dest='queue_depth', help="enter the number of chunks which can wait between two stages of --pipeline", type=int, default=default_queue_depth)
+    parser.add_argument(
+        '--word-cache', dest='word_cache', help="enter the number of words which need splitting whose tokens are kept in an lru cache in every process, 0 turns the cache off", type=int, default=0)
+    parser.add_argument(
+        '--flat', dest='flat', help="write the output files of a folder directly in the output folder under their file names instead of mirroring the input tree, files with the same name overwrite each other", action='store_true')
+    parser.add_argument(
+        '--shard', dest='shard', help="enter i/N to tokenize only the i-th of N shards of the input folder, the files are assigned to shards by a hash of their path", type=parse_shard, default=None)
+    parser.add_argument(
+        '--corpus-format', dest='corpus_format', help="write the sentences of all the input files as records of source path, language, language type, sentence id and tokens into part files of jsonl or parquet in the output folder instead of one output file per input file", choices=corpus_formats, default=None)
+    parser.add_argument(
+        '--part-size', dest='part_size', help="enter the maximum size in MB of a part file of --corpus-format before compression", type=int, default=256)
+    parser.add_argument(
+        '--compression', dest='compression', help="enter the compression of the part files, gzip, bz2 or xz for jsonl and snappy, gzip, zstd, brotli or lz4 for parquet", choices=sorted(set(jsonl_compressions) | set(parquet_compressions)), default=None)
+    parser.add_argument(
+        '--extra-output', dest='extra_outputs', help="enter FORMAT:PATH to also write the same sentences in raw, ssf or jsonl format to PATH in the same pass, PATH is an output file or an output folder like --output, can be repeated", type=parse_extra_output, action='append', default=[])
+    parser.add_argument(
+        '--offsets', dest='offsets', help="write the line number and the start and end offset in that line of every token, in the feature structures of ssf output or in the records of --corpus-format", action='store_true')
+    parser.add_argument(
+        '--incremental', dest='incremental', help="tokenize only the files which changed since the last run and remove the outputs of removed files, the files are tracked in a manifest", action='store_true')
+    parser.add_argument(
+        '--manifest', dest='manifest', help="enter the path of the manifest of --incremental, by default it is kept in the output folder", default=None)
+    parser.add_argument(
+        '--stats', '--profile', dest='stats', help="record the time, calls and bytes of every stage and the token patterns which fired, enter the path of the json file for them or - for stderr", nargs='?', const='-', default=None)
+
+
+def run(args, tokenizer, output_format='raw', lang_type=0, find_languages=None, identify_lines=None):
+    """Tokenize the input file or folder of the parsed arguments, find_languages gives the language type and language of each of a list of input files and identify_lines the language type of each line of a file as (lang_type, line) instead of lang_type."""
+    if args.corpus_format is not None and args.incremental:
+        sys.exit('--incremental can not be used with --corpus-format')
+    if args.offsets and args.corpus_format is None and output_format != 'ssf':
+        sys.exit('--offsets needs ssf output or --corpus-format')
+    if args.mmap and (args.offsets or args.corpus_format is not None):
+        sys.exit('--mmap can not be used with --offsets or --corpus-format')
+    if identify_lines is not None and (args.offsets or args.mmap or args.corpus_format is not None):
+        sys.exit('line level language identification can not be used with --offsets, --mmap or --corpus-format')
+    if args.extra_outputs and (args.offsets or args.corpus_format is not None or args.incremental):
+        sys.exit('--extra-output can not be used with --offsets, --corpus-format or --incremental')
+    if args.pipeline and (args.offsets or args.mmap or args.corpus_format is not None or identify_lines is not None):
+        sys.exit('--pipeline can not be used with --offsets, --mmap, --corpus-format or line level language identification')
+    if args.queue_depth < 1:
+        sys.exit('--queue-depth must be at least 1')
+    if args.word_cache < 0:
+        sys.exit('--word-cache can not be negative')
+    if args.stats is not None:
+        profile = Profile()
+        start_stats = word_cache_stats()
+        with use_profile(profile):
+            run_files(args, ProfilingTokenizer(*tokenizer.options(), word_cache_size=args.word_cache), output_format, lang_type, find_languages, profile, identify_lines)
+        record_word_cache(profile, start_stats)
+        write_stats(profile, args.stats)
+    else:
+        if args.word_cache != tokenizer.word_cache_size:
+            tokenizer = type(tokenizer)(*tokenizer.options(), word_cache_size=args.word_cache)
+        run_files(args, tokenizer, output_format, lang_type, find_languages, identify_lines=identify_lines)
+
+
+def run_files(args, tokenizer, output_format='raw', lang_type=0, find_languages=None, profile=None, identify_lines=None):
+    """Tokenize the input file or folder of the parsed arguments, the tasks of the workers are profiled when a profile is given."""
+    if os.path.isdir(args.inp):
+        # the shards of a folder can create the output folder at the same time
+        os.makedirs(args.out, exist_ok=True)
+    executor = None
+    if args.workers > 1 and not args.pipeline:
+        executor = ProcessPoolExecutor(max_workers=args.workers)
+        if profile is not None:
+            executor = ProfilingExecutor(executor, profile)
+    part_prefix = 'part'
+    if not os.path.isdir(args.inp):
+        # a single input file is always split into chunks
+        file_paths = [(args.inp, args.out)]
+        parallel = 'chunk'
+        input_root = os.path.dirname(os.path.abspath(args.inp))
+        manifest_path = os.path.join(os.path.dirname(args.out), '.' + os.path.basename(args.out) + manifest_name)
+    else:
+        file_paths = find_folder_files(args.inp, args.out, args.flat)
+        parallel = args.parallel
+        input_root = args.inp
+        manifest_path = os.path.join(args.out, manifest_name)
+        if args.shard is not None:
+            file_paths = select_shard(file_paths, args.inp, *args.shard)
+            manifest_path = os.path.join(args.out, shard_manifest_name % args.shard)
+            part_prefix += '-%d-of-%d' % args.shard
+    if args.incremental:
+        manifest_path = args.manifest or manifest_path
+        settings = find_settings(tokenizer, output_format, lang_type if find_languages is None and identify_lines is None else None, args.offsets, identify_lines is not None)
+        # a manifest of a single file can be shared with other files, their outputs are never removed
+        file_paths, entries, changed_entries, removed_outputs = plan_incremental_run(file_paths, input_root, manifest_path, settings, os.path.isdir(args.inp))
+        remove_outputs(removed_outputs, os.path.dirname(os.path.abspath(manifest_path)))
+    # the languages are found as the files are reached, find_languages identifies them a batch of files at a time
+    if identify_lines is not None:
+        languages = repeat((None, None))
+    elif find_languages is None:
+        languages = repeat((lang_type, getattr(args, 'lang', None)))
+    else:
+        languages = find_languages([input_file_path for input_file_path, _ in file_paths])
+    if args.corpus_format is not None:
+        # the records are written in order by this process, the workers tokenize chunks of the files
+        writer = CorpusWriter(args.out, args.corpus_format, args.part_size * 1024 * 1024, args.compression, part_prefix, args.offsets)
+        input_files = ((input_file_path, file_lang_type, lang) for (input_file_path, _), (file_lang_type, lang) in zip(file_paths, languages))
+        write_corpus(writer, tokenizer, input_files, input_root, executor, args.chunk_size)
+        writer.close()
+    else:
+        lang_types = (file_lang_type for file_lang_type, _ in languages)
+        extra_outputs = find_extra_outputs(file_paths, args.out, args.extra_outputs, os.path.isdir(args.inp))
+        if args.pipeline:
+            # the pipeline runs the workers itself
+            tokenize_files_in_pipeline(tokenizer, file_paths, lang_types, output_format, args.workers, args.chunk_size, args.queue_depth, extra_outputs, profile)
+        else:
+            # two files per worker keep the workers busy without submitting every file of the folder up front
+            tokenize_files(tokenizer, file_paths, lang_types, output_format, executor, parallel, args.chunk_size, args.offsets, args.mmap, identify_lines, extra_outputs, 2 * args.workers)
+    if executor is not None:
+        executor.shutdown()
+    if args.incremental:
+        # the manifest is written only after every output is complete, an interrupted run tokenizes its files again
+        entries.update(changed_entries)
+        write_manifest(manifest_path, entries)
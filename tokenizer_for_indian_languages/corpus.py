@@ -0,0 +1,199 @@
+"""Write the tokenized sentences of many files as records into size capped part files of jsonl or parquet."""
+import bz2
+import gzip
+import json
+import lzma
+import os
+import re
+from collections import deque
+from array import array
+from .files import find_file_offsets, iter_line_chunks, iter_profiled_lines, output_buffer_size
+from .profiling import ProfilingFile, active_profile, stage, text_size
+
+
+corpus_formats = ['jsonl', 'parquet']
+# the compressions of jsonl parts with the extension and the function which opens their files
+jsonl_compressions = {
+    'none': ('', lambda file_path: open(file_path, 'wb', buffering=output_buffer_size)),
+    'gzip': ('.gz', lambda file_path: gzip.open(file_path, 'wb', compresslevel=6)),
+    'bz2': ('.bz2', lambda file_path: bz2.open(file_path, 'wb')),
+    'xz': ('.xz', lambda file_path: lzma.open(file_path, 'wb')),
+}
+# the compressions of parquet parts are done by pyarrow
+parquet_compressions = ['none', 'snappy', 'gzip', 'zstd', 'brotli', 'lz4']
+# the fields of a record in order, offsets is only written by a writer with offsets
+record_fields = ['source', 'lang', 'lang_type', 'sentence_id', 'tokens', 'offsets']
+default_part_size = 256 * 1024 * 1024
+# the records of a parquet part are collected in memory and written in row groups of this many records
+parquet_row_group_size = 100000
+
+
+class CorpusWriter:
+    """Write records of source path, language, language type, sentence id and tokens into part files of an output folder.
+
+    With offsets every record also has the line number, start and end offset of each token in the source file as a
+    flat list of three numbers per token.
+
+    A part is closed when the uncompressed size of its records reaches part_size, a record is never split between parts.
+    Every part is written to a temporary file and renamed when it is closed, parts left by an earlier run with the same
+    prefix which are not written again are removed when the writer is closed.
+    Parquet needs pyarrow, it is imported when a parquet writer is created.
+    """
+
+    def __init__(self, output_folder, corpus_format='jsonl', part_size=default_part_size, compression=None, part_prefix='part', offsets=False):
+        """Create the output folder, compression None is no compression for jsonl and snappy for parquet."""
+        if corpus_format == 'jsonl':
+            compression = compression or 'none'
+            if compression not in jsonl_compressions:
+                raise ValueError('unknown compression for jsonl: %s' % compression)
+            self.extension = '.jsonl' + jsonl_compressions[compression][0]
+        elif corpus_format == 'parquet':
+            compression = compression or 'snappy'
+            if compression not in parquet_compressions:
+                raise ValueError('unknown compression for parquet: %s' % compression)
+            import pyarrow
+            import pyarrow.parquet
+            self.pyarrow = pyarrow
+            fields = [
+                ('source', pyarrow.string()),
+                ('lang', pyarrow.string()),
+                ('lang_type', pyarrow.int8()),
+                ('sentence_id', pyarrow.int64()),
+                ('tokens', pyarrow.list_(pyarrow.string())),
+            ]
+            if offsets:
+                fields.append(('offsets', pyarrow.list_(pyarrow.uint32())))
+            self.schema = pyarrow.schema(fields)
+            self.extension = '.parquet'
+        else:
+            raise ValueError('unknown corpus format: %s' % corpus_format)
+        self.output_folder = output_folder
+        self.corpus_format = corpus_format
+        self.part_size = part_size
+        self.compression = compression
+        self.part_prefix = part_prefix
+        self.offsets = offsets
+        self.part_files = []
+        self.part = None
+        self.part_bytes = 0
+        self.columns = None
+        self.records = 0
+        os.makedirs(output_folder, exist_ok=True)
+
+    def open_part(self):
+        """Open the temporary file of the next part."""
+        self.part_file = os.path.join(self.output_folder, '%s-%05d%s' % (self.part_prefix, len(self.part_files), self.extension))
+        temporary_file = self.part_file + '.tmp'
+        if self.corpus_format == 'jsonl':
+            self.part = jsonl_compressions[self.compression][1](temporary_file)
+            profile = active_profile()
+            if profile is not None:
+                self.part = ProfilingFile(self.part, profile, len)
+        else:
+            self.part = self.pyarrow.parquet.ParquetWriter(temporary_file, self.schema, compression=self.compression)
+            self.columns = {name: [] for name in self.schema.names}
+        self.part_bytes = 0
+
+    def write(self, source, lang, lang_type, sentence_id, tokens, offsets=None):
+        """Write the record of a sentence, the empty tokens which keep trailing spaces in raw output are left out, offsets are given by a writer with offsets."""
+        if self.part is None:
+            self.open_part()
+        tokens = [token for token in tokens if token]
+        values = [source, lang, lang_type, sentence_id, tokens]
+        if self.offsets:
+            values.append(offsets.tolist())
+        if self.corpus_format == 'jsonl':
+            record = json.dumps(dict(zip(record_fields, values)), ensure_ascii=False).encode('utf-8') + b'\n'
+            self.part.write(record)
+            self.part_bytes += len(record)
+        else:
+            for name, value in zip(self.schema.names, values):
+                self.columns[name].append(value)
+            self.part_bytes += text_size(source) + text_size(' '.join(tokens)) + 16
+            if self.offsets:
+                self.part_bytes += 4 * len(offsets)
+            if len(self.columns['tokens']) >= parquet_row_group_size:
+                self.write_row_group()
+        self.records += 1
+        if self.part_bytes >= self.part_size:
+            self.close_part()
+
+    def write_row_group(self):
+        """Write the collected records of a parquet part as a row group."""
+        if self.columns['tokens']:
+            with stage('write'):
+                self.part.write_table(self.pyarrow.table(self.columns, schema=self.schema))
+            self.columns = {name: [] for name in self.schema.names}
+
+    def close_part(self):
+        """Close the part and give it its final name."""
+        if self.corpus_format == 'parquet':
+            self.write_row_group()
+        self.part.close()
+        os.replace(self.part_file + '.tmp', self.part_file)
+        self.part_files.append(self.part_file)
+        self.part = None
+
+    def close(self):
+        """Close the last part and remove the parts of an earlier run which were not written again."""
+        if self.part is not None:
+            self.close_part()
+        part_pattern = re.compile(re.escape(self.part_prefix) + '-\\d{5}\\.(jsonl(\\.gz|\\.bz2|\\.xz)?|parquet)$')
+        part_names = {os.path.basename(part_file) for part_file in self.part_files}
+        for file_name in os.listdir(self.output_folder):
+            if part_pattern.match(file_name) and file_name not in part_names:
+                os.remove(os.path.join(self.output_folder, file_name))
+
+
+def iter_file_sentence_tokens(tokenizer, input_files, executor=None, chunk_size=10000, max_pending_chunks=64, offsets=False):
+    """Yield each input file given as (input file, lang type, lang) with the line positions and the token list of every sentence of it in order.
+
+    With an executor the chunks of all the files are tokenized by the workers, the chunks of the next files are
+    tokenized while the sentences of a file are written. With offsets the sentences are SentenceSpans and the line
+    positions of a file are collected as its lines are read, without offsets they are None.
+    """
+    if executor is None:
+        for input_file in input_files:
+            line_positions = array('I') if offsets else None
+            with open(input_file[0], 'r', encoding='utf-8') as file_read:
+                lines = iter_profiled_lines(file_read, line_positions)
+                sentences = tokenizer.iter_sentence_spans(lines, input_file[1]) if offsets else tokenizer.iter_sentence_tokens(lines, input_file[1])
+                for sentence in sentences:
+                    yield input_file, line_positions, sentence
+        return
+    pending_chunks = deque()
+    for input_file in input_files:
+        line_positions = array('I') if offsets else None
+        first_line_index = 0
+        with open(input_file[0], 'r', encoding='utf-8') as file_read:
+            for chunk in iter_line_chunks(tokenizer, iter_profiled_lines(file_read, line_positions), input_file[1], chunk_size):
+                if offsets:
+                    task = executor.submit(tokenizer.tokenize_lines_spans, chunk, input_file[1], first_line_index)
+                else:
+                    task = executor.submit(tokenizer.tokenize_lines, chunk, input_file[1])
+                first_line_index += len(chunk)
+                pending_chunks.append((input_file, line_positions, task))
+                while len(pending_chunks) >= max_pending_chunks:
+                    chunk_file, chunk_line_positions, task = pending_chunks.popleft()
+                    for sentence in task.result():
+                        yield chunk_file, chunk_line_positions, sentence
+    while pending_chunks:
+        chunk_file, chunk_line_positions, task = pending_chunks.popleft()
+        for sentence in task.result():
+            yield chunk_file, chunk_line_positions, sentence
+
+
+def write_corpus(writer, tokenizer, input_files, input_root, executor=None, chunk_size=10000):
+    """Tokenize files given as (input file, lang type, lang) into the records of a corpus writer, the source of a record is the path of its file in input_root."""
+    current_file = None
+    with stage(writer.corpus_format + '_format'):
+        for input_file, line_positions, sentence in iter_file_sentence_tokens(tokenizer, input_files, executor, chunk_size, offsets=writer.offsets):
+            if input_file is not current_file:
+                current_file = input_file
+                source = os.path.relpath(input_file[0], input_root).replace(os.sep, '/')
+                sentence_id = 0
+            sentence_id += 1
+            if writer.offsets:
+                writer.write(source, input_file[2], input_file[1], sentence_id, sentence.tokens(), find_file_offsets(sentence.offsets(), line_positions))
+            else:
+                writer.write(source, input_file[2], input_file[1], sentence_id, sentence)
@@ -0,0 +1,512 @@
+"""Read input files, write the tokenized sentences in raw or ssf format and share the work with worker processes."""
+import hashlib
+import io
+import json
+import mmap
+import os
+from array import array
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, wait
+from contextlib import contextmanager
+from itertools import islice
+from .profiling import ProfilingFile, active_profile, stage, text_size
+
+
+# the output files are written through a file buffer of this size instead of being collected in a list
+output_buffer_size = 1024 * 1024
+# a mapped file is decoded in pieces of about this many bytes which end after a newline
+mapped_piece_size = 1024 * 1024
+# with --mmap each worker reads and tokenizes a byte range of about this many bytes of a file
+mapped_range_size = 1024 * 1024
+# the formats of the outputs written from the same sentences as the output of a script, jsonl has a record of the id and tokens of each sentence per line
+extra_output_formats = ['raw', 'ssf', 'jsonl']
+# the sentences written to several outputs are given to every output in batches of this many sentences
+fan_out_batch_size = 1000
+
+
+def read_lines_from_file(file_path):
+    """Read lines from a file."""
+    with open(file_path, 'r', encoding='utf-8') as file_read:
+        return [line.strip() for line in file_read.readlines() if line.strip()]
+
+
+def iter_lines_from_file(file_read):
+    """Yield the stripped non empty lines of an open file one at a time."""
+    for line in file_read:
+        line = line.strip()
+        if line:
+            yield line
+
+
+def iter_numbered_lines(file_read, line_positions):
+    """Yield the stripped non empty lines of an open file, the number of the line in the file and the offset of the stripped line in it are appended to line_positions."""
+    for line_number, line in enumerate(file_read, 1):
+        stripped_line = line.strip()
+        if stripped_line:
+            line_positions.extend((line_number, len(line) - len(line.lstrip())))
+            yield stripped_line
+
+
+def iter_profiled_lines(file_read, line_positions=None):
+    """Yield the stripped non empty lines of an open file, the reading is recorded in the read stage when profiling is on."""
+    return record_reading(iter_lines_from_file(file_read) if line_positions is None else iter_numbered_lines(file_read, line_positions))
+
+
+def record_reading(lines):
+    """Record the lines of a reader in the read stage when profiling is on."""
+    profile = active_profile()
+    if profile is not None:
+        lines = profile.iter_stage('read', lines, text_size)
+    return lines
+
+
+@contextmanager
+def open_mapped_file(file_path):
+    """Map a file into memory for reading, an empty file which can not be mapped is given as empty bytes."""
+    with open(file_path, 'rb') as file_read:
+        if os.fstat(file_read.fileno()).st_size == 0:
+            yield b''
+            return
+        with mmap.mmap(file_read.fileno(), 0, access=mmap.ACCESS_READ) as mapped_file:
+            # the pages are read ahead and can be dropped once they are decoded
+            if hasattr(mmap, 'MADV_SEQUENTIAL'):
+                mapped_file.madvise(mmap.MADV_SEQUENTIAL)
+            yield mapped_file
+
+
+def find_line_end(mapped_file, position, end):
+    """Find the position after the first newline of a mapped file at or after position, end when there is none before end."""
+    if position >= end:
+        return end
+    newline = mapped_file.find(b'\n', position, end)
+    return end if newline == -1 else newline + 1
+
+
+def iter_mapped_lines(mapped_file, start=0, end=None, piece_size=mapped_piece_size):
+    """Yield the stripped non empty lines of the bytes of a mapped file from start to end the same way iter_lines_from_file reads them from a file opened in text mode.
+
+    The bytes are decoded one piece ending after a newline at a time, no utf-8 character contains a newline byte
+    and a carriage return before a newline always stays in the same piece, so the lines are the same.
+    """
+    if end is None:
+        end = len(mapped_file)
+    while start < end:
+        piece_end = find_line_end(mapped_file, start + piece_size, end)
+        yield from iter_lines_from_file(io.StringIO(str(mapped_file[start: piece_end], 'utf-8'), newline=None))
+        start = piece_end
+
+
+def iter_line_ranges(mapped_file, range_size=mapped_range_size):
+    """Split a mapped file into byte ranges of about range_size bytes which end after a newline."""
+    start = 0
+    while start < len(mapped_file):
+        end = find_line_end(mapped_file, start + range_size, len(mapped_file))
+        yield start, end
+        start = end
+
+
+def write_list_to_file(output_file, data_list):
+    """Write a list to a file."""
+    with open(output_file, 'w', encoding='utf-8') as file_write:
+        file_write.write('\n'.join(data_list) + '\n')
+
+
+def write_lines_to_file(output_file, lines):
+    """Write lines to a file as they are generated, the layout is the same as write_list_to_file."""
+    with open(output_file, 'w', encoding='utf-8') as file_write:
+        is_empty = True
+        for line in lines:
+            file_write.write(line + '\n')
+            is_empty = False
+        if is_empty:
+            file_write.write('\n')
+
+
+def write_ssf_sentences(file_write, sentences, sentence_id=1):
+    """Write the token lists of sentences as ssf blocks to an open file, the id of the next sentence is returned."""
+    for tokens in sentences:
+        file_write.write("<Sentence id='%d'>\n" % sentence_id)
+        token_index = 0
+        for token in tokens:
+            if token:
+                token_index += 1
+                file_write.write('%d\t%s\tunk\n' % (token_index, token))
+        if token_index == 0:
+            file_write.write('\n')
+        file_write.write('</Sentence>\n\n')
+        sentence_id += 1
+    return sentence_id
+
+
+def find_file_offsets(offsets, line_positions):
+    """Turn the offsets of the tokens of a sentence in the stripped lines into the line number in the file and the offsets in that line."""
+    file_offsets = array('I')
+    for index in range(0, len(offsets), 3):
+        line_index = offsets[index] * 2
+        line_start = line_positions[line_index + 1]
+        file_offsets.extend((line_positions[line_index], offsets[index + 1] + line_start, offsets[index + 2] + line_start))
+    return file_offsets
+
+
+def write_ssf_sentence_spans(file_write, sentences, line_positions, sentence_id=1):
+    """Write the SentenceSpans of sentences as ssf blocks whose feature structures give the line number and offsets of each token in the file, the id of the next sentence is returned."""
+    for sentence in sentences:
+        file_write.write("<Sentence id='%d'>\n" % sentence_id)
+        tokens = sentence.tokens()
+        offsets = find_file_offsets(sentence.offsets(), line_positions)
+        for token_index, token in enumerate(tokens):
+            line_number, start, end = offsets[3 * token_index: 3 * token_index + 3]
+            file_write.write("%d\t%s\tunk\t<fs line='%d' start='%d' end='%d'>\n" % (token_index + 1, token, line_number, start, end))
+        if not tokens:
+            file_write.write('\n')
+        file_write.write('</Sentence>\n\n')
+        sentence_id += 1
+    return sentence_id
+
+
+def write_raw_sentences(file_write, sentences):
+    """Write the token lists of sentences as lines to an open file, the number of sentences is returned."""
+    sentence_count = 0
+    for tokens in sentences:
+        file_write.write(' '.join(tokens) + '\n')
+        sentence_count += 1
+    return sentence_count
+
+
+def write_jsonl_sentences(file_write, sentences, sentence_id=1):
+    """Write the token lists of sentences as json records of the sentence id and the tokens to an open file, the empty tokens which keep trailing spaces in raw output are left out, the id of the next sentence is returned."""
+    for tokens in sentences:
+        file_write.write(json.dumps({'sentence_id': sentence_id, 'tokens': [token for token in tokens if token]}, ensure_ascii=False) + '\n')
+        sentence_id += 1
+    return sentence_id
+
+
+def write_raw_sentence_batch(file_write, sentences, sentence_id=1):
+    """Write the token lists of sentences as lines to an open file, the id of the next sentence is returned."""
+    return sentence_id + write_raw_sentences(file_write, sentences)
+
+
+# the writers of the formats of several outputs, each one continues the sentence ids of the batches before
+sentence_batch_writers = {'raw': write_raw_sentence_batch, 'ssf': write_ssf_sentences, 'jsonl': write_jsonl_sentences}
+
+
+class SentenceFileWriter:
+    """Write the token lists of the sentences of a file batch by batch into outputs given as (output file, output format).
+
+    Every output is written through a buffer of its own to a temporary file, close replaces the outputs with their
+    temporary files when all the sentences are written and discard removes the temporary files. A raw or ssf output
+    gets the layout write_sentence_tokens gives, a jsonl output without sentences is empty.
+    """
+
+    def __init__(self, outputs):
+        """Open the temporary files of the outputs."""
+        self.outputs = outputs
+        self.temporary_files = []
+        self.file_outputs = []
+        self.sentence_ids = [1] * len(outputs)
+        try:
+            for output_file, output_format in outputs:
+                output_folder = os.path.dirname(output_file)
+                if output_folder:
+                    os.makedirs(output_folder, exist_ok=True)
+                self.temporary_files.append('%s.%d.tmp' % (output_file, os.getpid()))
+                file_write = open(self.temporary_files[-1], 'w', encoding='utf-8', buffering=output_buffer_size)
+                profile = active_profile()
+                if profile is not None:
+                    file_write = ProfilingFile(file_write, profile)
+                self.file_outputs.append((file_write, output_format))
+        except BaseException:
+            self.discard()
+            raise
+
+    def write(self, sentences):
+        """Write a list of sentences to every output, the sentence ids continue from the sentences written before."""
+        for index, (file_write, output_format) in enumerate(self.file_outputs):
+            with stage(output_format + '_format'):
+                self.sentence_ids[index] = sentence_batch_writers[output_format](file_write, sentences, self.sentence_ids[index])
+
+    def close(self):
+        """Close the outputs and replace them with their temporary files."""
+        for (file_write, output_format), sentence_id in zip(self.file_outputs, self.sentence_ids):
+            if sentence_id == 1 and output_format != 'jsonl':
+                file_write.write('\n')
+            file_write.close()
+        for temporary_file, (output_file, _) in zip(self.temporary_files, self.outputs):
+            os.replace(temporary_file, output_file)
+
+    def discard(self):
+        """Close the outputs and remove their temporary files."""
+        for file_write, _ in self.file_outputs:
+            file_write.close()
+        for temporary_file in self.temporary_files:
+            if os.path.exists(temporary_file):
+                os.remove(temporary_file)
+
+
+def write_sentence_tokens(file_write, sentences, output_format='raw', line_positions=None):
+    """Write the token lists of sentences to an open file in raw or ssf format, the layout is the same as write_list_to_file gives.
+
+    With line_positions the sentences are SentenceSpans and the offsets of the tokens are written in the ssf feature
+    structures, raw format has no place for them.
+    """
+    if line_positions is not None:
+        if output_format != 'ssf':
+            raise ValueError('token offsets can only be written in ssf format')
+        is_empty = write_ssf_sentence_spans(file_write, sentences, line_positions) == 1
+    elif output_format == 'ssf':
+        is_empty = write_ssf_sentences(file_write, sentences) == 1
+    else:
+        is_empty = write_raw_sentences(file_write, sentences) == 0
+    if is_empty:
+        file_write.write('\n')
+
+
+def convert_raw_sentences_into_ssf_format(raw_sentences):
+    """Convert raw sentences into ssf format."""
+    ssf_sentences = []
+    sentence_footer = '</Sentence>'
+    for index, raw_sentence in enumerate(raw_sentences):
+        ssf_sentence = ''
+        sentence_header = '<Sentence id=\'' + \
+            str(index + 1) + '\'>'
+        tokens = raw_sentence.split()
+        mapped_tokens = list(map(lambda token_index: str(
+            token_index[0] + 1) + '\t' + token_index[1].strip() + '\tunk', list(enumerate(tokens))))
+        ssf_sentence = sentence_header + '\n' + '\n'.join(mapped_tokens) + \
+            '\n' + sentence_footer + '\n'
+        ssf_sentences.append(ssf_sentence)
+    return ssf_sentences
+
+
+def iter_line_chunks(tokenizer, lines, lang_type=0, chunk_size=10000):
+    """Group lines into chunks which can be tokenized independently of each other."""
+    chunk = []
+    for line in lines:
+        if len(chunk) >= chunk_size and tokenizer.is_chunk_start(line, lang_type):
+            yield chunk
+            chunk = []
+        chunk.append(line)
+    if chunk:
+        yield chunk
+
+
+def iter_sentence_tokens_in_parallel(executor, tokenizer, lines, lang_type=0, chunk_size=10000, max_pending_chunks=64, offsets=False):
+    """Yield the token lists of the sentences of the lines in order, chunks of lines are tokenized in the worker processes, with offsets the sentences are SentenceSpans."""
+    pending_chunks = deque()
+    first_line_index = 0
+    for chunk in iter_line_chunks(tokenizer, lines, lang_type, chunk_size):
+        if offsets:
+            pending_chunks.append(executor.submit(tokenizer.tokenize_lines_spans, chunk, lang_type, first_line_index))
+        else:
+            pending_chunks.append(executor.submit(tokenizer.tokenize_lines, chunk, lang_type))
+        first_line_index += len(chunk)
+        if len(pending_chunks) >= max_pending_chunks:
+            yield from pending_chunks.popleft().result()
+    while pending_chunks:
+        yield from pending_chunks.popleft().result()
+
+
+def iter_mixed_sentence_tokens_in_parallel(executor, tokenizer, typed_lines, chunk_size=10000, max_pending_chunks=64):
+    """Yield the token lists of the sentences of lines given as (lang_type, line) in order, chunks of lines are tokenized in the worker processes."""
+    pending_chunks = deque()
+    chunk = []
+    for lang_type, line in typed_lines:
+        if len(chunk) >= chunk_size and tokenizer.is_chunk_start(line, lang_type):
+            pending_chunks.append(executor.submit(tokenizer.tokenize_mixed_lines, chunk))
+            chunk = []
+            if len(pending_chunks) >= max_pending_chunks:
+                yield from pending_chunks.popleft().result()
+        chunk.append((lang_type, line))
+    if chunk:
+        pending_chunks.append(executor.submit(tokenizer.tokenize_mixed_lines, chunk))
+    while pending_chunks:
+        yield from pending_chunks.popleft().result()
+
+
+def iter_range_lines(tokenizer, mapped_file, start, end, lang_type=0):
+    """Yield the lines of a byte range of a mapped file which are tokenized together.
+
+    The lines of a range start at its first line which can start a chunk and run on past its end until the next
+    line which can start a chunk, a range without such a line has no lines, so every line of a file belongs to
+    exactly one range and the ranges are tokenized into the same sentences as the whole file.
+    """
+    lines = iter_mapped_lines(mapped_file, start, end)
+    if start > 0:
+        for line in lines:
+            if tokenizer.is_chunk_start(line, lang_type):
+                yield line
+                break
+        else:
+            return
+    yield from lines
+    # the lines after the range are read in small pieces, usually only the next line is needed
+    for line in iter_mapped_lines(mapped_file, end, piece_size=64 * 1024):
+        if tokenizer.is_chunk_start(line, lang_type):
+            return
+        yield line
+
+
+def tokenize_file_range(tokenizer, input_file, start, end, lang_type=0):
+    """Tokenize the lines of a byte range of a file into the token lists of their sentences, this runs in the worker processes."""
+    with open_mapped_file(input_file) as mapped_file:
+        return tokenizer.tokenize_lines(record_reading(iter_range_lines(tokenizer, mapped_file, start, end, lang_type)), lang_type)
+
+
+def iter_mapped_sentence_tokens_in_parallel(executor, tokenizer, input_file, mapped_file, lang_type=0, range_size=mapped_range_size, max_pending_ranges=64):
+    """Yield the token lists of the sentences of a mapped file in order, byte ranges of the file are read and tokenized by the worker processes."""
+    pending_ranges = deque()
+    for start, end in iter_line_ranges(mapped_file, range_size):
+        pending_ranges.append(executor.submit(tokenize_file_range, tokenizer, input_file, start, end, lang_type))
+        if len(pending_ranges) >= max_pending_ranges:
+            yield from pending_ranges.popleft().result()
+    while pending_ranges:
+        yield from pending_ranges.popleft().result()
+
+
+def tokenize_lines_into_file(tokenizer, lines, output_file, lang_type=0, output_format='raw', executor=None, chunk_size=10000, line_positions=None, extra_outputs=()):
+    """Tokenize lines into a raw or ssf file sentence by sentence, chunks are tokenized in parallel when an executor is given, the token offsets are written when line_positions of the lines are given and the same sentences are written to the extra outputs given as (output file, output format)."""
+    offsets = line_positions is not None
+    if executor is None:
+        sentences = tokenizer.iter_sentence_spans(lines, lang_type) if offsets else tokenizer.iter_sentence_tokens(lines, lang_type)
+    else:
+        sentences = iter_sentence_tokens_in_parallel(executor, tokenizer, lines, lang_type, chunk_size, offsets=offsets)
+    write_sentences_into_file(sentences, output_file, output_format, line_positions, extra_outputs)
+
+
+def tokenize_typed_lines_into_file(tokenizer, typed_lines, output_file, output_format='raw', executor=None, chunk_size=10000, extra_outputs=()):
+    """Tokenize lines given as (lang_type, line) into a raw or ssf file sentence by sentence, chunks are tokenized in parallel when an executor is given and the same sentences are written to the extra outputs."""
+    if executor is None:
+        sentences = tokenizer.iter_mixed_sentence_tokens(typed_lines)
+    else:
+        sentences = iter_mixed_sentence_tokens_in_parallel(executor, tokenizer, typed_lines, chunk_size)
+    write_sentences_into_file(sentences, output_file, output_format, extra_outputs=extra_outputs)
+
+
+def write_sentences_into_file(sentences, output_file, output_format='raw', line_positions=None, extra_outputs=()):
+    """Write sentences into a raw or ssf file which is replaced only when it is complete.
+
+    The same sentences are also written to the extra outputs given as (output file, output format) in one pass,
+    they are given to all the outputs in batches. Token offsets are not written with extra outputs.
+    """
+    if extra_outputs:
+        if line_positions is not None:
+            raise ValueError('token offsets can not be written with extra outputs')
+        writer = SentenceFileWriter([(output_file, output_format)] + list(extra_outputs))
+        try:
+            sentences = iter(sentences)
+            batch = list(islice(sentences, fan_out_batch_size))
+            while batch:
+                writer.write(batch)
+                batch = list(islice(sentences, fan_out_batch_size))
+            writer.close()
+        except BaseException:
+            writer.discard()
+            raise
+        return
+    output_folder = os.path.dirname(output_file)
+    if output_folder:
+        os.makedirs(output_folder, exist_ok=True)
+    # the output is written to a temporary file which replaces the output only when it is complete
+    temporary_file = '%s.%d.tmp' % (output_file, os.getpid())
+    try:
+        with open(temporary_file, 'w', encoding='utf-8', buffering=output_buffer_size) as file_write:
+            profile = active_profile()
+            if profile is not None:
+                file_write = ProfilingFile(file_write, profile)
+            with stage(output_format + '_format'):
+                write_sentence_tokens(file_write, sentences, output_format, line_positions)
+        os.replace(temporary_file, output_file)
+    except BaseException:
+        if os.path.exists(temporary_file):
+            os.remove(temporary_file)
+        raise
+
+
+def tokenize_file(tokenizer, input_file, output_file, lang_type=0, output_format='raw', executor=None, chunk_size=10000, offsets=False, mapped=False, identify_lines=None, extra_outputs=()):
+    """Tokenize a file into a raw or ssf file sentence by sentence, chunks are tokenized in parallel when an executor is given, with offsets the ssf output gives the position of every token in the file.
+
+    A mapped file is read through mmap, the workers then read byte ranges of the file themselves instead of getting
+    the lines from this process, offsets are not given for a mapped file.
+    identify_lines gives the language type of every line of the file as (lang_type, line) instead of lang_type, the
+    lines are then read normally and their offsets are not given.
+    The same sentences are written to the extra outputs given as (output file, output format) in the same pass.
+    """
+    if identify_lines is not None:
+        if offsets or mapped:
+            raise ValueError('token offsets and mapped files can not be used with the language types of lines')
+        with open(input_file, 'r', encoding='utf-8') as file_read:
+            tokenize_typed_lines_into_file(tokenizer, identify_lines(iter_profiled_lines(file_read)), output_file, output_format, executor, chunk_size, extra_outputs)
+        return
+    if mapped:
+        if offsets:
+            raise ValueError('token offsets can not be given for a mapped file')
+        with open_mapped_file(input_file) as mapped_file:
+            if executor is None:
+                sentences = tokenizer.iter_sentence_tokens(record_reading(iter_mapped_lines(mapped_file)), lang_type)
+            else:
+                sentences = iter_mapped_sentence_tokens_in_parallel(executor, tokenizer, input_file, mapped_file, lang_type)
+            write_sentences_into_file(sentences, output_file, output_format, extra_outputs=extra_outputs)
+        return
+    line_positions = array('I') if offsets else None
+    with open(input_file, 'r', encoding='utf-8') as file_read:
+        tokenize_lines_into_file(tokenizer, iter_profiled_lines(file_read, line_positions), output_file, lang_type, output_format, executor, chunk_size, line_positions, extra_outputs)
+
+
+def find_folder_files(input_folder, output_folder, flat=False):
+    """Find the files of a folder tree, each file is written at the same path in the output tree or with the same name in the output folder when flat."""
+    file_paths = []
+    for root, dirs, files in os.walk(input_folder):
+        output_root = output_folder if flat else os.path.join(output_folder, os.path.relpath(root, input_folder))
+        for fl in files:
+            file_paths.append((os.path.join(root, fl), os.path.normpath(os.path.join(output_root, fl))))
+    return file_paths
+
+
+def find_file_shard(input_file, input_folder, shard_count):
+    """Assign a file to one of shard_count shards by a hash of its path in the input folder, the shard is the same on every machine."""
+    file_name = os.path.relpath(input_file, input_folder).replace(os.sep, '/')
+    return int.from_bytes(hashlib.sha1(file_name.encode('utf-8')).digest()[: 8], 'big') % shard_count
+
+
+def select_shard(file_paths, input_folder, shard_index, shard_count):
+    """Keep the input and output files of the shard_index of shard_count shards, shards are counted from 1."""
+    return [(input_file_path, output_file_path) for input_file_path, output_file_path in file_paths if find_file_shard(input_file_path, input_folder, shard_count) == shard_index - 1]
+
+
+def finish_file_tasks(file_tasks, max_pending_files=1):
+    """Wait until fewer than max_pending_files file tasks are running and forget the finished ones, the first failure is raised once it is found and the files not started yet are cancelled."""
+    while True:
+        for output_file_path, file_task in list(file_tasks.items()):
+            if file_task.done():
+                del file_tasks[output_file_path]
+                if file_task.exception() is not None:
+                    for pending_task in file_tasks.values():
+                        pending_task.cancel()
+                file_task.result()
+        if len(file_tasks) < max_pending_files:
+            return
+        wait(list(file_tasks.values()), return_when=FIRST_COMPLETED)
+
+
+def tokenize_files(tokenizer, file_paths, lang_types, output_format='raw', executor=None, parallel='file', chunk_size=10000, offsets=False, mapped=False, identify_lines=None, extra_outputs=None, max_pending_files=64):
+    """Tokenize pairs of input and output files, with an executor whole files or chunks of files are shared by the worker processes.
+
+    With identify_lines the language types of the lines of every file are identified in this process, so only chunks
+    of the files are given to the workers.
+    extra_outputs gives a list of (output file, output format) for every pair, the same sentences are written to them.
+    At most max_pending_files files are given to the workers at a time, so the languages of the files are identified
+    and the files are submitted as the workers reach them.
+    """
+    file_tasks = {}
+    if extra_outputs is None:
+        extra_outputs = [()] * len(file_paths)
+    for (input_file_path, output_file_path), lang_type, file_extra_outputs in zip(file_paths, lang_types, extra_outputs):
+        if executor is not None and parallel == 'file' and identify_lines is None:
+            # files with the same name are written in the same order as in a serial run
+            if output_file_path in file_tasks:
+                file_tasks.pop(output_file_path).result()
+            finish_file_tasks(file_tasks, max_pending_files)
+            file_tasks[output_file_path] = executor.submit(tokenize_file, tokenizer, input_file_path, output_file_path, lang_type, output_format, None, chunk_size, offsets, mapped, None, file_extra_outputs)
+        else:
+            tokenize_file(tokenizer, input_file_path, output_file_path, lang_type, output_format, executor, chunk_size, offsets, mapped, identify_lines, file_extra_outputs)
+    finish_file_tasks(file_tasks)
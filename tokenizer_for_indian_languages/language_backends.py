@@ -0,0 +1,229 @@
+"""Load the language identification model with the fp32 pytorch pipeline, an exported onnx model or a dynamically int8 quantized model, export it to onnx and check a backend against the fp32 labels."""
+# how to run the code
+# python3 -m tokenizer_for_indian_languages.language_backends --export muril-onnx --quantize
+# python3 -m tokenizer_for_indian_languages.language_backends --check --backend onnx --model-path muril-onnx/model.int8.onnx --corpus hindi.txt --corpus urdu.txt
+# python3 -m tokenizer_for_indian_languages.language_backends --check --backend quantized --corpus hindi.txt --output check.json
+# the scripts and the server load a backend with --lid-backend and --lid-model
+import argparse
+import json
+import os
+import sys
+import time
+from collections import Counter
+from functools import partial
+from itertools import islice
+from .files import iter_lines_from_file
+from .language_identification import find_label_language, find_language_type, language_backends, language_model, language_tokenizer, read_language_prefix
+
+
+# an exported model is written under these names in its folder, next to the config and the files of the tokenizer
+onnx_model_name = 'model.onnx'
+quantized_onnx_model_name = 'model.int8.onnx'
+# the model looks at the first 300 characters of a text, which are about 100 word pieces of MuRIL in the Indian scripts
+default_max_length = 128
+# the check identifies a text for every this many lines of a corpus, like the beginning of a file
+check_document_lines = 20
+
+
+class OnnxLanguageIdentifier:
+    """Run an exported onnx model of the language identifier with onnxruntime, it is called like the transformers pipeline.
+
+    The model is given as its .onnx file or as the folder it was exported to, the tokenizer and the labels are read
+    from the folder of the model. A batch is padded to its longest text and the texts are cut at max_length word
+    pieces.
+    """
+
+    def __init__(self, model_path, max_length=default_max_length, threads=None):
+        """Load the model and its tokenizer, threads sets the number of threads of onnxruntime."""
+        import onnxruntime
+        from transformers import AutoTokenizer
+        model_file = model_path if model_path.endswith('.onnx') else os.path.join(model_path, onnx_model_name)
+        model_folder = os.path.dirname(os.path.abspath(model_file))
+        options = onnxruntime.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = onnxruntime.InferenceSession(model_file, options, providers=['CPUExecutionProvider'])
+        self.input_names = [model_input.name for model_input in self.session.get_inputs()]
+        self.tokenizer = AutoTokenizer.from_pretrained(model_folder)
+        self.labels = read_model_labels(model_folder)
+        self.max_length = max_length
+
+    def __call__(self, texts, batch_size=32):
+        """Identify a list of texts, a label is returned for each text as the pipeline returns it."""
+        predictions = []
+        for batch_start in range(0, len(texts), batch_size):
+            encoded = self.tokenizer(texts[batch_start: batch_start + batch_size], padding=True, truncation=True, max_length=self.max_length, return_tensors='np')
+            logits = self.session.run(None, {name: encoded[name].astype('int64') for name in self.input_names})[0]
+            for label_index in logits.argmax(axis=-1):
+                predictions.append({'label': self.labels.get(int(label_index), 'LABEL_%d' % label_index)})
+        return predictions
+
+
+def read_model_labels(model_folder):
+    """Read the labels of the classes of a model from the config in its folder, a model without them has the labels of the pipeline."""
+    try:
+        with open(os.path.join(model_folder, 'config.json'), 'r', encoding='utf-8') as file_read:
+            id2label = json.load(file_read).get('id2label') or {}
+    except OSError:
+        id2label = {}
+    return {int(label_index): label for label_index, label in id2label.items()}
+
+
+def load_pipeline(model, max_length=None):
+    """Load a transformers pipeline of a model, the texts are cut at max_length word pieces when it is given."""
+    from transformers import pipeline
+    pipe = pipeline("text-classification", model=model, tokenizer=language_tokenizer)
+    if max_length is None:
+        return pipe
+    return partial(pipe, truncation=True, max_length=max_length)
+
+
+def load_language_backend(backend='pytorch', model_path=None, max_length=None, threads=None):
+    """Load the language identifier of a backend, model_path is a local copy of the model and max_length cuts the texts at that many word pieces.
+
+    pytorch runs the fp32 model as it is published, onnx runs an exported onnx model, which model_path must give, and
+    quantized quantizes the linear layers of the fp32 model to int8 when it is loaded. max_length None keeps the
+    texts whole with pytorch and cuts them at default_max_length with the other backends.
+    """
+    if backend not in language_backends:
+        raise ValueError('unknown language identification backend: %s' % backend)
+    if backend == 'onnx':
+        if model_path is None:
+            raise ValueError('the onnx backend needs the path of an exported model')
+        return OnnxLanguageIdentifier(model_path, max_length or default_max_length, threads)
+    if threads:
+        import torch
+        torch.set_num_threads(threads)
+    if backend == 'pytorch':
+        return load_pipeline(model_path or language_model, max_length)
+    import torch
+    from transformers import AutoModelForSequenceClassification
+    model = AutoModelForSequenceClassification.from_pretrained(model_path or language_model)
+    model.eval()
+    model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return load_pipeline(model, max_length or default_max_length)
+
+
+def export_onnx_model(output_folder, model_path=None, quantize=False, opset=14):
+    """Export the fp32 model to model.onnx in output_folder with its config and tokenizer, quantize also writes model.int8.onnx with int8 weights, the paths of the models are returned."""
+    import torch
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+    model = AutoModelForSequenceClassification.from_pretrained(model_path or language_model)
+    model.eval()
+    tokenizer = AutoTokenizer.from_pretrained(language_tokenizer)
+    os.makedirs(output_folder, exist_ok=True)
+    model.config.save_pretrained(output_folder)
+    tokenizer.save_pretrained(output_folder)
+    sample = tokenizer(['भारत एक विशाल देश है।'], return_tensors='pt')
+    # the inputs are given in the order of the arguments of the forward of a bert model
+    input_names = [name for name in ['input_ids', 'attention_mask', 'token_type_ids'] if name in sample]
+    dynamic_axes = {name: {0: 'batch', 1: 'sequence'} for name in input_names}
+    dynamic_axes['logits'] = {0: 'batch'}
+    model_files = [os.path.join(output_folder, onnx_model_name)]
+    with torch.no_grad():
+        torch.onnx.export(model, tuple(sample[name] for name in input_names), model_files[0], input_names=input_names, output_names=['logits'], dynamic_axes=dynamic_axes, opset_version=opset)
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        model_files.append(os.path.join(output_folder, quantized_onnx_model_name))
+        quantize_dynamic(model_files[0], model_files[1], weight_type=QuantType.QInt8)
+    return model_files
+
+
+def read_check_texts(corpus_paths, max_texts=1000, document_lines=check_document_lines):
+    """Read the texts of the check, the first 300 characters of every document_lines lines of the corpora as the beginning of a file is read for the model, each corpus gives at most its share of max_texts so every language is checked."""
+    texts = []
+    for corpus_index, corpus_path in enumerate(corpus_paths):
+        # the texts left over by the division go to the first corpora
+        corpus_max_texts = max_texts // len(corpus_paths) + (1 if corpus_index < max_texts % len(corpus_paths) else 0)
+        corpus_texts = 0
+        with open(corpus_path, 'r', encoding='utf-8') as file_read:
+            lines = iter_lines_from_file(file_read)
+            while corpus_texts < corpus_max_texts:
+                document = list(islice(lines, document_lines))
+                if not document:
+                    break
+                texts.append(read_language_prefix(document)[0][: 300])
+                corpus_texts += 1
+    return texts
+
+
+def time_language_identifier(language_identifier, texts, batch_size=32):
+    """Identify texts in batches and return their languages with the seconds taken, a first batch warms the identifier up and is not timed."""
+    language_identifier(texts[: batch_size], batch_size=batch_size)
+    lang_names = []
+    start = time.perf_counter()
+    for batch_start in range(0, len(texts), batch_size):
+        predictions = language_identifier(texts[batch_start: batch_start + batch_size], batch_size=batch_size)
+        lang_names.extend(find_label_language(prediction['label']) for prediction in predictions)
+    return lang_names, time.perf_counter() - start
+
+
+def check_language_backend(texts, backend, model_path=None, max_length=None, batch_size=32, threads=None):
+    """Identify texts with the fp32 pytorch model and with a backend and report how often their languages and language types agree and how much faster the backend is."""
+    reference_names, reference_seconds = time_language_identifier(load_language_backend('pytorch', None, None, threads), texts, batch_size)
+    lang_names, seconds = time_language_identifier(load_language_backend(backend, model_path, max_length, threads), texts, batch_size)
+    from transformers import AutoTokenizer
+    tokenizer = AutoTokenizer.from_pretrained(language_tokenizer)
+    max_length = max_length or (None if backend == 'pytorch' else default_max_length)
+    truncated_texts = 0 if max_length is None else sum(1 for input_ids in tokenizer(texts)['input_ids'] if len(input_ids) > max_length)
+    disagreements = Counter((reference_name, lang_name) for reference_name, lang_name in zip(reference_names, lang_names) if reference_name != lang_name)
+    return {
+        'backend': backend,
+        'model_path': model_path,
+        'max_length': max_length,
+        'texts': len(texts),
+        'truncated_texts': truncated_texts,
+        'agreement': round(sum(1 for reference_name, lang_name in zip(reference_names, lang_names) if reference_name == lang_name) / max(len(texts), 1), 4),
+        'lang_type_agreement': round(sum(1 for reference_name, lang_name in zip(reference_names, lang_names) if find_language_type(reference_name) == find_language_type(lang_name)) / max(len(texts), 1), 4),
+        'fp32_seconds': round(reference_seconds, 6),
+        'seconds': round(seconds, 6),
+        'speedup': round(reference_seconds / max(seconds, 1e-9), 2),
+        'texts_per_sec': round(len(texts) / max(seconds, 1e-9), 1),
+        'disagreements': ['%s -> %s: %d' % (reference_name, lang_name, count) for (reference_name, lang_name), count in disagreements.most_common(10)],
+    }
+
+
+def main():
+    """Pass arguments and call functions here."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--export', dest='export', help="enter the folder to export the fp32 model to as model.onnx with its config and tokenizer", default=None)
+    parser.add_argument(
+        '--quantize', dest='quantize', help="also write model.int8.onnx with the weights quantized to int8 when exporting", action='store_true')
+    parser.add_argument(
+        '--check', dest='check', help="compare the languages identified by a backend with the languages of the fp32 model on the corpora and time both", action='store_true')
+    parser.add_argument(
+        '--backend', dest='backend', help="enter the backend to check", choices=language_backends, default='onnx')
+    parser.add_argument(
+        '--model-path', dest='model_path', help="enter the local path of the model of the backend, the .onnx file or its folder for onnx, or of the fp32 model to export", default=None)
+    parser.add_argument(
+        '--max-length', dest='max_length', help="enter the number of word pieces a text is cut at, by default %d for onnx and quantized" % default_max_length, type=int, default=None)
+    parser.add_argument(
+        '--corpus', dest='corpus', help="enter a corpus file of the check, can be repeated", action='append', default=[])
+    parser.add_argument(
+        '--max-texts', dest='max_texts', help="enter the number of texts of the check, shared equally by the corpora, one text is read for every %d lines" % check_document_lines, type=int, default=1000)
+    parser.add_argument(
+        '--batch-size', dest='batch_size', help="enter the number of texts identified in one model call", type=int, default=32)
+    parser.add_argument(
+        '--threads', dest='threads', help="enter the number of threads of the model on cpu", type=int, default=None)
+    parser.add_argument(
+        '--output', dest='out', help="enter the path of the json file for the results of the check", default=None)
+    args = parser.parse_args()
+    if not args.export and not args.check:
+        parser.error('enter --export or --check')
+    if args.export:
+        for model_file in export_onnx_model(args.export, args.model_path, args.quantize):
+            print('exported %s' % model_file, file=sys.stderr)
+    if args.check:
+        if not args.corpus:
+            parser.error('the check needs at least one --corpus')
+        texts = read_check_texts(args.corpus, args.max_texts)
+        result = check_language_backend(texts, args.backend, args.model_path, args.max_length, args.batch_size, args.threads)
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+        if args.out:
+            with open(args.out, 'w', encoding='utf-8') as file_write:
+                json.dump(result, file_write, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,375 @@
+"""Identify the language type of texts with the script of the text or with a pre-trained model."""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+from itertools import chain
+from .files import iter_lines_from_file
+from .patterns import non_punctuation
+from .profiling import stage, text_size, texts_size
+from .tokenizer import proper_bullet_creation
+
+
+# The below model automatically identifies the language of the input text with ISO 639-1 codes and classifies it into one of the 25 Indian languages. The model is trained on the ILID dataset and is based on the MURIL architecture. The model can be used to identify the language of the input text and then the appropriate tokenization can be applied based on the identified language.
+# The model is loaded on first use by load_language_identifier so that importing this module or running the tokenizer with --help stays cheap.
+language_model = "pruthwik/ilid-muril-model"
+language_tokenizer = "google/muril-base-cased"
+pipe = None
+pipe_torch_threads = None
+# The model can also run as an exported onnx model or quantized to int8, see language_backends, the fp32 pytorch pipeline is the default.
+language_backends = ['pytorch', 'onnx', 'quantized']
+language_backend = 'pytorch'
+language_model_path = None
+language_max_length = None
+# The identified languages are cached on disk in sqlite, keyed by a hash of the text that is given to the model, so unchanged files skip the model on later runs.
+language_cache = None
+default_language_cache_path = os.path.join(os.path.expanduser('~'), '.cache', 'tokenizer_for_indian_languages', 'language_cache.sqlite')
+language_cache_size = 1000000
+language_cache_entries = 0
+# The below mapping gives the unicode ranges of the scripts which decide the language type on their own, Devanagari is used by languages of type 0 and by Marathi which is of type 2, so it is decided by the model.
+script_ranges = {
+    'Bengali': ([(0x0980, 0x09FF)], 0),
+    'Gurmukhi': ([(0x0A00, 0x0A7F)], 0),
+    'Oriya': ([(0x0B00, 0x0B7F)], 0),
+    'Meetei_Mayek': ([(0xAAE0, 0xAAFF), (0xABC0, 0xABFF)], 0),
+    'Ol_Chiki': ([(0x1C50, 0x1C7F)], 0),
+    'Arabic': ([(0x0600, 0x06FF), (0x0750, 0x077F), (0x08A0, 0x08FF), (0xFB50, 0xFDFF), (0xFE70, 0xFEFF)], 1),
+    'Gujarati': ([(0x0A80, 0x0AFF)], 2),
+    'Tamil': ([(0x0B80, 0x0BFF)], 2),
+    'Telugu': ([(0x0C00, 0x0C7F)], 2),
+    'Kannada': ([(0x0C80, 0x0CFF)], 2),
+    'Malayalam': ([(0x0D00, 0x0D7F)], 2),
+    'Latin': ([(0x0041, 0x005A), (0x0061, 0x007A), (0x00C0, 0x024F)], 2),
+    'Devanagari': ([(0x0900, 0x0963), (0x0966, 0x097F), (0xA8E0, 0xA8FF)], None),
+}
+# every letter of a script is translated into one private use character so that a whole text is counted with str.translate and Counter
+script_markers = {chr(0xE000 + index): script for index, script in enumerate(script_ranges)}
+script_table = {code_point: chr(0xE000 + index) for index, (ranges, _) in enumerate(script_ranges.values()) for start, end in ranges for code_point in range(start, end + 1)}
+# a script decides the language type when it has at least these many letters and this share of the letters
+script_min_letters = 20
+script_min_share = 0.9
+use_script_language_type = True
+# a line identified on its own needs at least these many letters, a shorter line or a line of punctuation only takes the language type of the line before it
+segment_min_letters = 8
+# the lines of a file identified line by line are identified in windows of this many lines
+segment_window_lines = 10000
+# the below counts show how often the language type was decided by the script and how often by the model
+language_type_counts = Counter()
+# The below mapping is used to convert the predicted language index from the model into the corresponding language code, which can then be used to determine the appropriate tokenization rules for that language.
+index_to_lang = {0: 'asm', 1: 'ben', 2: 'brx', 3: 'doi', 4: 'eng', 5: 'gom', 6: 'guj', 7: 'hin', 8: 'kan', 9: 'kas', 10: 'mai', 11: 'mal', 12: 'mar', 13: 'mni_Beng', 14: 'mni_Mtei', 15: 'npi', 16: 'ory', 17: 'pan', 18: 'san', 19: 'sat', 20: 'snd_Arab', 21: 'snd_Deva', 22: 'tam', 23: 'tel', 24: 'urd'}
+# the model and the cache are shared by all threads, this lock lets one thread use them at a time
+language_lock = threading.RLock()
+
+
+def configure_language_identifier(torch_threads=None, cache_path=None, cache_size=1000000, use_script=True, backend='pytorch', model_path=None, max_length=None):
+    """Set up the language identifier, the model itself is only loaded on first use with the backend and the local model path given."""
+    global pipe_torch_threads, use_script_language_type, language_backend, language_model_path, language_max_length
+    if backend not in language_backends:
+        raise ValueError('unknown language identification backend: %s' % backend)
+    pipe_torch_threads = torch_threads
+    use_script_language_type = use_script
+    language_backend = backend
+    language_model_path = model_path
+    language_max_length = max_length
+    if cache_path:
+        open_language_cache(cache_path, cache_size)
+
+
+def load_language_identifier():
+    """Load the language identification model once and return it."""
+    with language_lock:
+        global pipe
+        if pipe is None:
+            with stage('load_language_model'):
+                from .language_backends import load_language_backend
+                pipe = load_language_backend(language_backend, language_model_path, language_max_length, pipe_torch_threads)
+        return pipe
+
+
+def find_language_model_name():
+    """Name the model with its backend, the languages identified by different backends are cached and tracked apart."""
+    if language_backend == 'pytorch' and language_model_path is None and language_max_length is None:
+        return language_model
+    return '%s:%s:%s:%s' % (language_model, language_backend, language_model_path or '', language_max_length or '')
+
+
+def open_language_cache(cache_path, cache_size=1000000):
+    """Open the on disk language cache, it keeps at most cache_size entries."""
+    with language_lock:
+        global language_cache, language_cache_size, language_cache_entries
+        cache_folder = os.path.dirname(cache_path)
+        if cache_folder and not os.path.isdir(cache_folder):
+            os.makedirs(cache_folder)
+        language_cache = sqlite3.connect(cache_path, check_same_thread=False)
+        language_cache.execute('CREATE TABLE IF NOT EXISTS languages (text_hash TEXT PRIMARY KEY, lang_name TEXT NOT NULL, last_used REAL NOT NULL)')
+        language_cache.execute('CREATE INDEX IF NOT EXISTS languages_last_used ON languages (last_used)')
+        language_cache_size = cache_size
+        language_cache_entries = language_cache.execute('SELECT COUNT(*) FROM languages').fetchone()[0]
+        evict_from_language_cache()
+
+
+def close_language_cache():
+    """Close the on disk language cache."""
+    with language_lock:
+        global language_cache
+        if language_cache is not None:
+            language_cache.close()
+            language_cache = None
+
+
+def evict_from_language_cache():
+    """Remove the least recently used entries when the cache holds more than its size."""
+    global language_cache_entries
+    if language_cache_entries > language_cache_size:
+        with language_cache:
+            language_cache.execute('DELETE FROM languages WHERE text_hash IN (SELECT text_hash FROM languages ORDER BY last_used LIMIT ?)', (language_cache_entries - language_cache_size,))
+        language_cache_entries = language_cache.execute('SELECT COUNT(*) FROM languages').fetchone()[0]
+
+
+def hash_language_text(text):
+    """Hash the part of a text that the model looks at, together with the model name."""
+    return hashlib.sha1((find_language_model_name() + '\n' + text[: 300]).encode('utf-8')).hexdigest()
+
+
+def find_languages_in_cache(text_hashes):
+    """Look up cached languages of text hashes and mark them as recently used."""
+    cached_languages = {}
+    # sqlite limits the number of parameters of a query
+    for batch_start in range(0, len(text_hashes), 500):
+        batch = text_hashes[batch_start: batch_start + 500]
+        query = 'SELECT text_hash, lang_name FROM languages WHERE text_hash IN (%s)' % ','.join('?' * len(batch))
+        cached_languages.update(language_cache.execute(query, batch).fetchall())
+    with language_cache:
+        language_cache.executemany('UPDATE languages SET last_used = ? WHERE text_hash = ?', [(time.time(), text_hash) for text_hash in cached_languages])
+    return cached_languages
+
+
+def store_languages_in_cache(hashed_languages):
+    """Store the languages of text hashes in the cache."""
+    global language_cache_entries
+    with language_cache:
+        for text_hash, lang_name in hashed_languages.items():
+            language_cache_entries += language_cache.execute('INSERT OR IGNORE INTO languages VALUES (?, ?, ?)', (text_hash, lang_name, time.time())).rowcount
+    evict_from_language_cache()
+
+
+def find_language(text):
+    """Identify the language of the input text using the pre-trained model."""
+    return find_languages([text])[0]
+
+
+def find_languages(texts, batch_size=32):
+    """Identify the languages of several input texts, batch_size texts go through the model in one call."""
+    with language_lock:
+        cached_languages = {}
+        if language_cache is not None:
+            with stage('language_cache', texts_size, texts):
+                text_hashes = [hash_language_text(text) for text in texts]
+                cached_languages = find_languages_in_cache(text_hashes)
+            # texts with the same hash go through the model only once, each text is hashed once
+            uncached_hashed_texts = {text_hash: text for text, text_hash in zip(texts, text_hashes) if text_hash not in cached_languages}
+            uncached_texts = list(uncached_hashed_texts.values())
+        else:
+            uncached_texts = texts
+        lang_names = []
+        for batch_start in range(0, len(uncached_texts), batch_size):
+            batch = [text[: 300] for text in uncached_texts[batch_start: batch_start + batch_size]]
+            language_identifier = load_language_identifier()
+            with stage('language_model', texts_size, batch):
+                predictions = language_identifier(batch, batch_size=batch_size)
+            for prediction in predictions:
+                lang_names.append(find_label_language(prediction['label']))
+        if language_cache is None:
+            return lang_names
+        identified_languages = dict(zip(uncached_hashed_texts, lang_names))
+        with stage('language_cache'):
+            store_languages_in_cache(identified_languages)
+        cached_languages.update(identified_languages)
+        return [cached_languages[text_hash] for text_hash in text_hashes]
+
+
+def find_label_language(label):
+    """Map a label predicted by the model to its language."""
+    return index_to_lang[int(label.split("_")[-1])]
+
+
+def read_language_prefix(lines):
+    """Read the lines needed for the first 300 characters of text that are used for identifying the language."""
+    prefix_lines = []
+    prefix_text_lines = []
+    prefix_length = 0
+    with stage('language_prefix'):
+        for line in lines:
+            prefix_lines.append(line)
+            prefix_text_lines.append(proper_bullet_creation(line))
+            prefix_length += len(prefix_text_lines[-1]) + 1
+            if prefix_length > 300:
+                break
+    return '\n'.join(prefix_text_lines), prefix_lines
+
+
+def find_language_type(lang_name):
+    """Map a language identified by the model to its language type."""
+    if lang_name in ['hin', 'ory', 'mni_Beng', 'mni_Mtei', 'asm', 'ben', 'pan', 'snd_Deva', 'sat', 'san', 'doi', 'brx', 'gom', 'mai', 'npi']:
+        lang_type = 0
+    elif lang_name in ['urd', 'kas', 'snd_Arab']:
+        lang_type = 1
+    elif lang_name in ['eng', 'guj', 'mar', 'mal', 'kan', 'tel', 'tam']:
+        lang_type = 2
+    return lang_type
+
+
+def count_script_letters(text):
+    """Count the letters of each script in the first 300 characters of a text."""
+    script_counts = Counter(text[: 300].translate(script_table))
+    return {script_markers[marker]: count for marker, count in script_counts.items() if marker in script_markers}
+
+
+def decide_script_language_type(letter_counts, min_letters=script_min_letters):
+    """Decide the language type from the letters of each script, None when there are fewer than min_letters letters or the script does not decide it."""
+    total_letters = sum(letter_counts.values())
+    if total_letters < min_letters:
+        return None
+    script = max(letter_counts, key=letter_counts.get)
+    if letter_counts[script] < script_min_share * total_letters:
+        return None
+    return script_ranges[script][1]
+
+
+def find_script_language_type(text):
+    """Decide the language type from the script of the text, None when the script does not decide it."""
+    with stage('script_language_type', text_size, text[: 300]):
+        letter_counts = count_script_letters(text)
+    return decide_script_language_type(letter_counts)
+
+
+def identify_languages(texts, batch_size=32):
+    """Identify the language types of texts with the languages found by the model, the language is None when the script decided the type."""
+    languages = [(find_script_language_type(text) if use_script_language_type else None, None) for text in texts]
+    undecided = [index for index, (lang_type, _) in enumerate(languages) if lang_type is None]
+    with language_lock:
+        language_type_counts['script'] += len(texts) - len(undecided)
+        language_type_counts['model'] += len(undecided)
+    lang_names = find_languages([texts[index] for index in undecided], batch_size)
+    for index, lang_name in zip(undecided, lang_names):
+        languages[index] = (find_language_type(lang_name), lang_name)
+    return languages
+
+
+def identify_language_types(texts, batch_size=32):
+    """Identify the language types of texts, the model is only used when the script does not decide the type."""
+    return [lang_type for lang_type, _ in identify_languages(texts, batch_size)]
+
+
+def identify_language_type(lines):
+    """Identify the language type from the beginning of the lines, the lines are returned unconsumed."""
+    prefix_text, prefix_lines = read_language_prefix(lines)
+    return identify_language_types([prefix_text])[0], chain(prefix_lines, lines)
+
+
+def identify_languages_of_files(input_files, batch_size=32):
+    """Identify the language types and languages of several files with batched model calls."""
+    prefix_texts = []
+    for input_file in input_files:
+        with open(input_file, 'r', encoding='utf-8') as file_read:
+            prefix_texts.append(read_language_prefix(iter_lines_from_file(file_read))[0])
+    return identify_languages(prefix_texts, batch_size)
+
+
+def identify_language_types_of_files(input_files, batch_size=32):
+    """Identify the language types of several files with batched model calls."""
+    return [lang_type for lang_type, _ in identify_languages_of_files(input_files, batch_size)]
+
+
+def iter_languages_of_files(input_files, batch_size=32):
+    """Yield the language type and language of files one at a time, the languages of batch_size files are identified together."""
+    for batch_start in range(0, len(input_files), batch_size):
+        yield from identify_languages_of_files(input_files[batch_start: batch_start + batch_size], batch_size)
+
+
+def iter_language_types_of_files(input_files, batch_size=32):
+    """Yield the language types of files one at a time, the languages of batch_size files are identified together."""
+    for lang_type, _ in iter_languages_of_files(input_files, batch_size):
+        yield lang_type
+
+
+def join_model_text(segments):
+    """Join segments with newlines into the text given to the model, only the first 300 characters are looked at."""
+    text_lines = []
+    text_length = 0
+    for segment in segments:
+        text_lines.append(segment)
+        text_length += len(segment) + 1
+        if text_length > 300:
+            break
+    return '\n'.join(text_lines)
+
+
+def identify_segment_language_types(segments, batch_size=32, previous_lang_type=None):
+    """Identify the language type of every segment of a text, such as the lines of a file.
+
+    A segment with at least segment_min_letters letters is decided by its script when the script decides the
+    language type. The runs of such segments whose script does not decide it, Devanagari for one, are identified
+    by the model from the joined text of each run, the runs of all the segments go through the model in batches
+    and a text is identified only once. The shorter segments and the segments of punctuation only take the type of
+    the segment before them, previous_lang_type is the type of the segment before the first one, and those at the
+    start take the type of the first identified segment after them. Segments which are all short are identified
+    together by the model.
+    """
+    lang_types = [None] * len(segments)
+    runs = []
+    run_open = False
+    with stage('segment_language_type', texts_size, segments):
+        for index, segment in enumerate(segments):
+            letter_counts = count_script_letters(segment)
+            if sum(letter_counts.values()) < segment_min_letters or non_punctuation.search(segment) is None:
+                continue
+            if use_script_language_type:
+                lang_types[index] = decide_script_language_type(letter_counts, segment_min_letters)
+            if lang_types[index] is not None:
+                run_open = False
+            elif run_open:
+                runs[-1].append(index)
+            else:
+                runs.append([index])
+                run_open = True
+    script_segments = sum(1 for lang_type in lang_types if lang_type is not None)
+    if not runs and script_segments == 0 and previous_lang_type is None and segments:
+        runs.append(list(range(len(segments))))
+    model_texts = [join_model_text([segments[index] for index in run]) for run in runs]
+    unique_texts = list(dict.fromkeys(model_texts))
+    text_languages = dict(zip(unique_texts, find_languages(unique_texts, batch_size) if unique_texts else []))
+    for run, text in zip(runs, model_texts):
+        for index in run:
+            lang_types[index] = find_language_type(text_languages[text])
+    model_segments = sum(len(run) for run in runs)
+    # the segments which were not identified follow the segment before them
+    if previous_lang_type is None:
+        previous_lang_type = next((lang_type for lang_type in lang_types if lang_type is not None), None)
+    for index, lang_type in enumerate(lang_types):
+        if lang_type is None:
+            lang_types[index] = previous_lang_type
+        else:
+            previous_lang_type = lang_type
+    with language_lock:
+        language_type_counts['segment_script'] += script_segments
+        language_type_counts['segment_model'] += model_segments
+        language_type_counts['segment_neighbour'] += len(segments) - script_segments - model_segments
+    return lang_types
+
+
+def iter_typed_lines(lines, batch_size=32, window_lines=segment_window_lines):
+    """Yield every line with its language type as (lang_type, line), the lines are identified in windows of window_lines lines which follow the type of the window before them."""
+    previous_lang_type = None
+    window = []
+    for line in lines:
+        window.append(line)
+        if len(window) >= window_lines:
+            lang_types = identify_segment_language_types(window, batch_size, previous_lang_type)
+            yield from zip(lang_types, window)
+            previous_lang_type = lang_types[-1]
+            window = []
+    if window:
+        yield from zip(identify_segment_language_types(window, batch_size, previous_lang_type), window)
@@ -0,0 +1,146 @@
+"""Keep a manifest of the tokenized files of a folder so that a rerun only tokenizes the files which changed."""
+import hashlib
+import json
+import os
+import time
+from . import files, patterns
+from . import tokenizer as tokenizer_module
+
+
+# the manifest of a folder is kept in the output folder under this name
+manifest_name = '.tokenizer_manifest.json'
+# every shard of a folder keeps a manifest of its own files under this name
+shard_manifest_name = '.tokenizer_manifest.%d-of-%d.json'
+# a manifest written in another layout is ignored and every file is tokenized again
+manifest_format = 1
+# an input modified this close to the time it was recorded can change again without changing its mtime, its content is hashed on the next run
+racy_mtime_ns = 2 * 10 ** 9
+
+
+def find_tokenizer_version(modules=(patterns, tokenizer_module, files)):
+    """Hash the code of the modules the output depends on, a change of the patterns or of the tokenizer makes every output out of date."""
+    digest = hashlib.sha256()
+    for module in modules:
+        with open(module.__file__, 'rb') as file_read:
+            digest.update(file_read.read())
+    return digest.hexdigest()[:16]
+
+
+def find_settings(tokenizer, output_format='raw', lang_type=0, offsets=False, line_languages=False):
+    """Collect the settings an output depends on, lang_type None stands for language types identified by the model, line_languages for language types identified line by line."""
+    modules = (patterns, tokenizer_module, files)
+    if lang_type is None:
+        from . import language_identification
+        modules += (language_identification,)
+        lang_type = 'auto:' + language_identification.find_language_model_name()
+    settings = {'version': find_tokenizer_version(modules), 'tokenizer': list(tokenizer.options()), 'format': output_format, 'lang_type': lang_type}
+    # the settings of outputs without offsets are the same as before offsets could be written
+    if offsets:
+        settings['offsets'] = True
+    if line_languages:
+        settings['lid_level'] = 'line'
+    return settings
+
+
+def hash_file(file_path):
+    """Hash the content of a file."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as file_read:
+        for block in iter(lambda: file_read.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def read_manifest(manifest_path):
+    """Read the entries of a manifest keyed by output path relative to the folder of the manifest, a missing or unreadable manifest has no entries."""
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as file_read:
+            manifest = json.load(file_read)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(manifest, dict) or manifest.get('format') != manifest_format:
+        return {}
+    return manifest.get('files', {})
+
+
+def write_manifest(manifest_path, entries):
+    """Write the entries of a manifest, the old manifest is replaced only after the new one is complete."""
+    temporary_path = manifest_path + '.tmp'
+    with open(temporary_path, 'w', encoding='utf-8') as file_write:
+        json.dump({'format': manifest_format, 'files': entries}, file_write, ensure_ascii=False, indent=1, sort_keys=True)
+    os.replace(temporary_path, manifest_path)
+
+
+def find_input_entry(input_file, input_name, settings, content_hash=None):
+    """Record the size, mtime and content hash of an input file before it is tokenized."""
+    recorded_ns = time.time_ns()
+    file_stat = os.stat(input_file)
+    mtime_ns = file_stat.st_mtime_ns
+    if recorded_ns - mtime_ns < racy_mtime_ns:
+        mtime_ns = None
+    return {'input': input_name, 'size': file_stat.st_size, 'mtime_ns': mtime_ns, 'hash': content_hash or hash_file(input_file), 'settings': settings}
+
+
+def is_up_to_date(entry, input_file, input_name, output_file, settings):
+    """Check that the output of an input file was written from the same content with the same settings, the content is hashed only when its mtime changed."""
+    if entry is None or entry.get('input') != input_name or entry.get('settings') != settings or not os.path.isfile(output_file):
+        return False
+    file_stat = os.stat(input_file)
+    if file_stat.st_size != entry.get('size'):
+        return False
+    if file_stat.st_mtime_ns == entry.get('mtime_ns'):
+        return True
+    content_hash = hash_file(input_file)
+    if content_hash != entry.get('hash'):
+        return False
+    # the content did not change, the new mtime saves hashing it on the next run
+    entry.update(find_input_entry(input_file, input_name, settings, content_hash))
+    return True
+
+
+def plan_incremental_run(file_paths, input_root, manifest_path, settings, remove_outputs=True):
+    """Find the files which need to be tokenized again.
+
+    The entries of the up to date files, the entries to record for the files which are tokenized and the paths of
+    the outputs whose inputs were removed are returned with them. An output written from several inputs with the
+    same name only keeps the last of them, so only the last one is tokenized. Without remove_outputs the entries
+    of the other outputs in the manifest are kept as they are.
+    """
+    manifest_folder = os.path.dirname(os.path.abspath(manifest_path))
+    old_entries = read_manifest(manifest_path)
+    output_inputs = {}
+    for input_file_path, output_file_path in file_paths:
+        output_inputs[os.path.relpath(output_file_path, manifest_folder)] = (input_file_path, output_file_path)
+    changed_file_paths = []
+    entries = {}
+    changed_entries = {}
+    for output_name, (input_file_path, output_file_path) in output_inputs.items():
+        input_name = os.path.relpath(input_file_path, input_root)
+        entry = old_entries.get(output_name)
+        if is_up_to_date(entry, input_file_path, input_name, output_file_path, settings):
+            entries[output_name] = entry
+        else:
+            changed_file_paths.append((input_file_path, output_file_path))
+            changed_entries[output_name] = find_input_entry(input_file_path, input_name, settings)
+    removed_outputs = []
+    for output_name, entry in old_entries.items():
+        if output_name in output_inputs:
+            continue
+        output_file_path = os.path.normpath(os.path.join(manifest_folder, output_name))
+        if not remove_outputs:
+            entries[output_name] = entry
+        # only outputs inside the folder of the manifest are ever removed
+        elif os.path.commonpath([manifest_folder, output_file_path]) == manifest_folder:
+            removed_outputs.append(output_file_path)
+    return changed_file_paths, entries, changed_entries, removed_outputs
+
+
+def remove_outputs(output_files, output_folder):
+    """Remove the outputs of removed inputs and the folders of the output tree which become empty."""
+    for output_file in output_files:
+        if os.path.isfile(output_file):
+            os.remove(output_file)
+        folder = os.path.dirname(output_file)
+        while folder != output_folder and os.path.commonpath([output_folder, folder]) == output_folder and os.path.isdir(folder) and not os.listdir(folder):
+            os.rmdir(folder)
+            folder = os.path.dirname(folder)
@@ -0,0 +1,104 @@
+"""Regular expressions shared by all the tokenizers."""
+import re
+from string import punctuation
+
+
+# the below code defines different kinds of regular expressions, the url patterns are added by build_token_specification
+token_specification_head = [
+    ('datemonth',
+     r'^(0?[1-9]|1[012])[-\/\.](0?[1-9]|[12][0-9]|3[01])[-\/\.](1|2)\d\d\d$'),
+    ('monthdate',
+     r'^(0?[1-9]|[12][0-9]|3[01])[-\/\.](0?[1-9]|1[012])[-\/\.](1|2)\d\d\d$'),
+    ('yearmonth',
+     r'^((1|2)\d\d\d)[-\/\.](0?[1-9]|1[012])[-\/\.](0?[1-9]|[12][0-9]|3[01])'),
+    ('EMAIL1', r'([\w\.])+@(\w)+\.(com|org|co\.in)$'),
+]
+url_patterns = [
+    ('url', r'(https?\:\/\/www\.|https?\:\\\\www\.)(?:[-a-z0-9]+\.)*([-a-z0-9]+.*)'),
+    ('url1', r'(www\.)([-a-z0-9]+\.)*([-a-z0-9]+.*)(\/[-a-z0-9]+)*'),
+]
+# the raw tokenizers with sentence tokenization have always used these url patterns written with / delimiters
+delimited_url_patterns = [
+    ('url1', r'(www\.)([-a-z0-9]+\.)*([-a-z0-9]+.*)(\/[-a-z0-9]+)*/i'),
+    ('url', r'/((?:https?\:\/\/|www\.)(?:[-a-z0-9]+\.)*[-a-z0-9]+.*)/i'),
+]
+token_specification_tail = [
+    ('BRACKET', r'[\(\)\[\]\{\}]'),       # Brackets
+    ('urdu_year', r'^(ء)(\d{4,4})'),
+    ('bullets', r'(\d+\.)$'), # Bullets
+    ('NUMBER', r'^(\d+)([,\.٫٬]\d+)*(\S)*'),  # Integer or decimal number
+    ('ASSIGN', r'[~:]'),          # Assignment operator
+    ('END', r'[;!_]'),           # Statement terminator
+    ('EQUAL', r'='),   # Equals
+    ('OP', r'[+*\/\-]'),    # Arithmetic operators
+    ('QUOTES', r'[\"\'‘’“”]'),          # quotes
+    ('Fullstop', r'(\.+)$'),
+    ('ellips', r'\.(\.)+'),
+    ('HYPHEN', r'[-+\|+]'),
+    ('Slashes', r'[\\\/]'),
+    ('COMMA12', r'[,%]'),
+    ('hin_stop', r'।'),
+    ('urdu_stop', r'۔'),
+    ('urdu_comma', r'،'),
+    ('urdu_semicolon', r'؛'),
+    ('urdu_question_mark', r'؟'),
+    ('urdu_percent', r'٪'),
+    ('quotes_question', r'[”\?]'),
+    ('hashtag', r'#'),
+    ('join', r'–')
+]
+# the token patterns of each group can only match in a line where the guard of the group matches, a line without a match of a guard is scanned without the patterns of its group
+pattern_guards = [
+    ('@', ['EMAIL1']),
+    (r'www\.|://', ['url', 'url1']),
+    (r'\d[-\/\.]', ['datemonth', 'monthdate', 'yearmonth']),
+    (r'\d', ['bullets', 'NUMBER']),
+    ('[ء۔،؛؟٪]', ['urdu_year', 'urdu_stop', 'urdu_comma', 'urdu_semicolon', 'urdu_question_mark', 'urdu_percent']),
+    ('।', ['hin_stop']),
+]
+# the characters a match of each token pattern can start with written for a regex character class, a word without any of them can not hold a match
+# the url pattern starts with h and the url pattern written with / delimiters with /
+token_start_characters = {
+    'datemonth': r'\d', 'monthdate': r'\d', 'yearmonth': r'\d', 'EMAIL1': r'\w\.', 'url': r'h\/', 'url1': 'w',
+    'BRACKET': r'\(\)\[\]\{\}', 'urdu_year': 'ء', 'bullets': r'\d', 'NUMBER': r'\d', 'ASSIGN': '~:', 'END': ';!_',
+    'EQUAL': '=', 'OP': r'+*\/\-', 'QUOTES': '"\'‘’“”', 'Fullstop': r'\.', 'ellips': r'\.', 'HYPHEN': r'\-+|',
+    'Slashes': r'\\\/', 'COMMA12': ',%', 'hin_stop': '।', 'urdu_stop': '۔', 'urdu_comma': '،', 'urdu_semicolon': '؛',
+    'urdu_question_mark': '؟', 'urdu_percent': '٪', 'quotes_question': '”?', 'hashtag': '#', 'join': '–',
+}
+punctuations = punctuation + '\"\'‘’“”'
+# a sentence with any other character than these can not be punctuation only
+non_punctuation = re.compile('[^\\s' + re.escape(punctuations) + ']')
+bullet_pattern = '(\\d+\\.\\s?)'
+# the end markers of sentences for each language type, any other language type uses the markers of type 2
+sentence_end_markers = {
+    0: ['?', '।', '!', '|'],
+    1: ['؟', '!', '|', '۔'],
+    2: ['?', '.', '!', '|'],
+}
+
+
+def build_token_specification(delimited_urls=False):
+    """Build the list of token names and patterns with the chosen url patterns."""
+    if delimited_urls:
+        return token_specification_head + delimited_url_patterns + token_specification_tail
+    return token_specification_head + url_patterns + token_specification_tail
+
+
+def convert_word_pattern_into_line_pattern(pattern):
+    """Anchor a word level pattern at whitespace so that it can be scanned over a whole line."""
+    pattern = re.sub(r'(?<!\\)\.\*', r'\\S*', pattern)
+    if pattern.startswith('^'):
+        pattern = r'(?<!\S)' + pattern[1:]
+    if pattern.endswith('$'):
+        pattern = pattern[: -1] + r'(?!\S)'
+    return pattern
+
+
+def build_token_regex(token_specification):
+    """Convert a token specification into a python regex which matches one token in a word."""
+    return '|'.join('(?P<%s>%s)' % pair for pair in token_specification)
+
+
+def build_line_token_regex(token_specification):
+    """Convert a token specification into a single regex that scans a whole line in one pass instead of one word at a time."""
+    return '|'.join('(?P<%s>%s)' % (name, convert_word_pattern_into_line_pattern(pattern)) for name, pattern in token_specification)
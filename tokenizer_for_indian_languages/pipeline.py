@@ -0,0 +1,173 @@
+"""Tokenize files in an asyncio pipeline whose reading, tokenization and writing run at the same time, for inputs and outputs on slow storage like network filesystems."""
+import asyncio
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import repeat
+from .files import SentenceFileWriter, iter_line_chunks, iter_profiled_lines
+from .profiling import Profile, run_profiled, stage, use_profile
+
+
+# the number of chunks which can wait between two stages, a stage waits for the next one when its queue is full
+default_queue_depth = 8
+
+
+def run_with_profile(profile, function, *args):
+    """Run a call recording its stages in a profile, profile None records nothing."""
+    with use_profile(profile):
+        return function(*args)
+
+
+class FilePipeline:
+    """Tokenize files through a reader, a tokenizer and a writer stage joined by bounded queues.
+
+    The reader prefetches the chunks of the files in order in a thread of its own, the chunks are tokenized in the
+    worker processes or with one worker in a thread, and the writer writes the sentences of the chunks in order in
+    a thread of its own. The queues hold at most queue_depth chunks each, so the memory used stays bounded and a
+    slow stage holds the stages before it back, the queue of the tokenized chunks holds at least two chunks for
+    every worker so the workers are kept busy with a small queue depth. The chunks of the next files are read and
+    tokenized while the sentences of a file are written. The file tasks are taken one at a time in the read thread,
+    so they can be a generator whose languages are identified as the files are reached, like the languages the
+    scripts identify a batch of files at a time.
+    With a profile the stages of the threads are recorded in profiles of their own which are merged into it at the
+    end, the stats of the worker processes are merged as their chunks are done.
+    """
+
+    def __init__(self, tokenizer, output_format='raw', workers=1, chunk_size=10000, queue_depth=default_queue_depth, profile=None):
+        """Keep the settings of the pipeline, the executors are started by run."""
+        if queue_depth < 1:
+            raise ValueError('the queue depth must be at least 1')
+        self.tokenizer = tokenizer
+        self.output_format = output_format
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.queue_depth = queue_depth
+        self.profile = profile
+        self.thread_profiles = {}
+        if profile is not None:
+            self.thread_profiles = {name: Profile() for name in ['read', 'tokenize', 'write']}
+
+    def run(self, file_tasks):
+        """Tokenize files given as (input file, output file, lang type, extra outputs) in order."""
+        if self.workers > 1:
+            tokenize_executor = ProcessPoolExecutor(max_workers=self.workers)
+        else:
+            tokenize_executor = ThreadPoolExecutor(max_workers=1)
+        with ThreadPoolExecutor(max_workers=1) as read_thread, ThreadPoolExecutor(max_workers=1) as write_thread, tokenize_executor:
+            self.executors = {'read': read_thread, 'tokenize': tokenize_executor, 'write': write_thread}
+            with stage('pipeline_wait'):
+                asyncio.run(self.run_stages(file_tasks))
+        for thread_profile in self.thread_profiles.values():
+            stats = thread_profile.as_dict()
+            # the time a thread waits for its next call is not a stage of the run
+            stats['stages'].pop('other', None)
+            self.profile.merge(stats)
+
+    def run_in_stage(self, name, function, *args):
+        """Run a call in the executor of a stage with the profile of the stage, a future of its result is returned."""
+        return asyncio.get_running_loop().run_in_executor(self.executors[name], run_with_profile, self.thread_profiles.get(name), function, *args)
+
+    async def run_stages(self, file_tasks):
+        """Run the three stages until every file is written, an error in one stage stops the others."""
+        read_queue = asyncio.Queue(self.queue_depth)
+        # the chunks in the write queue are the chunks being tokenized, there are enough of them for every worker
+        write_queue = asyncio.Queue(max(self.queue_depth, 2 * self.workers))
+        stages = [
+            asyncio.ensure_future(self.read_files(file_tasks, read_queue)),
+            asyncio.ensure_future(self.tokenize_chunks(read_queue, write_queue)),
+            asyncio.ensure_future(self.write_files(write_queue)),
+        ]
+        try:
+            await asyncio.gather(*stages)
+        finally:
+            for pipeline_stage in stages:
+                pipeline_stage.cancel()
+
+    async def read_files(self, file_tasks, read_queue):
+        """Read the chunks of the files into the read queue.
+
+        A chunk None ends the chunks of a file and a file task None ends the files, it comes with the error which
+        stopped the reading when there is one, so the files read before the error are still written.
+        """
+        file_tasks = iter(file_tasks)
+        try:
+            while True:
+                file_task = await self.run_in_stage('read', next, file_tasks, None)
+                if file_task is None:
+                    break
+                await self.read_file(file_task, read_queue)
+        except Exception as error:
+            await read_queue.put((None, error))
+        else:
+            await read_queue.put((None, None))
+
+    async def read_file(self, file_task, read_queue):
+        """Read the chunks of a file into the read queue."""
+        file_read, chunks = await self.run_in_stage('read', self.open_chunks, file_task)
+        try:
+            while True:
+                chunk = await self.run_in_stage('read', next, chunks, None)
+                if chunk is None:
+                    break
+                await read_queue.put((file_task, chunk))
+        except BaseException:
+            # the file is closed in the read thread after a read which may still be running
+            self.executors['read'].submit(file_read.close)
+            raise
+        await self.run_in_stage('read', file_read.close)
+        await read_queue.put((file_task, None))
+
+    def open_chunks(self, file_task):
+        """Open an input file and return it with an iterator of the chunks of its lines, this runs in the read thread so the reading is recorded in its profile."""
+        file_read = open(file_task[0], 'r', encoding='utf-8')
+        return file_read, iter_line_chunks(self.tokenizer, iter_profiled_lines(file_read), file_task[2], self.chunk_size)
+
+    async def tokenize_chunks(self, read_queue, write_queue):
+        """Start the tokenization of the chunks of the read queue and put their futures into the write queue in order, the end of the files is passed on with its error."""
+        while True:
+            file_task, chunk = await read_queue.get()
+            if file_task is None:
+                await write_queue.put((None, chunk))
+                return
+            task = None
+            if chunk is not None:
+                task = asyncio.ensure_future(self.tokenize_chunk(chunk, file_task[2]))
+            await write_queue.put((file_task, task))
+
+    async def tokenize_chunk(self, chunk, lang_type):
+        """Tokenize a chunk into the token lists of its sentences."""
+        if self.workers > 1 and self.profile is not None:
+            sentences, stats = await asyncio.get_running_loop().run_in_executor(self.executors['tokenize'], run_profiled, self.tokenizer.tokenize_lines, chunk, lang_type)
+            self.profile.merge(stats)
+            return sentences
+        return await self.run_in_stage('tokenize', self.tokenizer.tokenize_lines, chunk, lang_type)
+
+    async def write_files(self, write_queue):
+        """Write the sentences of the tokenized chunks into the outputs of their files, the outputs of a file are replaced when its last chunk is written."""
+        writer = None
+        try:
+            while True:
+                file_task, task = await write_queue.get()
+                if file_task is None:
+                    # task is the error which stopped the reading when there is one
+                    if task is not None:
+                        raise task
+                    return
+                if writer is None:
+                    writer = await self.run_in_stage('write', SentenceFileWriter, [(file_task[1], self.output_format)] + list(file_task[3]))
+                if task is None:
+                    await self.run_in_stage('write', writer.close)
+                    writer = None
+                else:
+                    await self.run_in_stage('write', writer.write, await task)
+        except BaseException:
+            # the temporary files are removed in the write thread after a write which may still be running
+            if writer is not None:
+                self.executors['write'].submit(run_with_profile, self.thread_profiles.get('write'), writer.discard)
+            raise
+
+
+def tokenize_files_in_pipeline(tokenizer, file_paths, lang_types, output_format='raw', workers=1, chunk_size=10000, queue_depth=default_queue_depth, extra_outputs=None, profile=None):
+    """Tokenize pairs of input and output files through a FilePipeline, extra_outputs gives a list of (output file, output format) for every pair, the pairs, lang types and extra outputs can be iterators which are read as the files are reached."""
+    if extra_outputs is None:
+        extra_outputs = repeat(())
+    file_tasks = ((input_file_path, output_file_path, lang_type, file_extra_outputs) for (input_file_path, output_file_path), lang_type, file_extra_outputs in zip(file_paths, lang_types, extra_outputs))
+    FilePipeline(tokenizer, output_format, workers, chunk_size, queue_depth, profile).run(file_tasks)
@@ -0,0 +1,368 @@
+"""Record the wall time, calls and bytes of the stages of a run and the token patterns which fired, for the --stats option."""
+import json
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from .tokenizer import Tokenizer, compile_guarded_line_regex, find_absent_guards, find_word_cache, tokenize_matches, word_cache_stats
+
+
+# the profile of each thread, profiling is off in a thread without a profile
+profile_state = threading.local()
+# the counts of the lookups of the word caches recorded in a profile
+word_cache_kinds = ['hits', 'misses', 'evictions']
+
+
+def active_profile():
+    """Return the profile of the current thread, None when profiling is off."""
+    return getattr(profile_state, 'profile', None)
+
+
+def text_size(text):
+    """Count the bytes of a text in utf-8."""
+    return len(text.encode('utf-8'))
+
+
+def texts_size(texts):
+    """Count the bytes of texts in utf-8."""
+    return sum(text_size(text) for text in texts)
+
+
+def tokens_size(tokens):
+    """Count the bytes of the tokens of a sentence in utf-8 joined with spaces."""
+    return text_size(' '.join(tokens))
+
+
+class Profile:
+    """The wall time, calls and bytes of each stage and the counts of the token patterns which fired.
+
+    Exactly one stage of a profile is running at any time, entering a stage pauses the stage it is entered from,
+    so the time of a stage never includes the time of the stages called from it.
+    The time spent measuring bytes and counting patterns is recorded in the profiling stage.
+    The words of the lines are counted as plain words, which need no splitting and are not scanned by the token
+    patterns, and scanned words. The lookups of the word caches are recorded per process by record_word_cache, the
+    words found in a cache are not scanned but the patterns which fired in them are kept in the cache and counted,
+    so the pattern counts are the same with the cache on or off.
+    """
+
+    def __init__(self):
+        """Start the profile in the other stage."""
+        self.stages = {}
+        self.pattern_counts = Counter()
+        self.word_counts = Counter()
+        self.word_cache_counts = Counter()
+        self.worker_tasks = 0
+        self.start = time.perf_counter()
+        self.current_stage = 'other'
+        self.stage_start = self.start
+
+    def stage_stats(self, stage):
+        """Return the seconds, calls and bytes of a stage."""
+        stage_stats = self.stages.get(stage)
+        if stage_stats is None:
+            stage_stats = self.stages[stage] = [0.0, 0, 0]
+        return stage_stats
+
+    def switch(self, stage):
+        """Add the time since the last switch to the running stage and run stage instead, the stage which was running is returned."""
+        now = time.perf_counter()
+        self.stage_stats(self.current_stage)[0] += now - self.stage_start
+        previous_stage = self.current_stage
+        self.current_stage = stage
+        self.stage_start = now
+        return previous_stage
+
+    def leave(self, stage, previous_stage, size=None, item=None):
+        """Return from a stage to the stage it was entered from and count the call, the bytes of the item are measured by size."""
+        item_size = 0
+        if size is not None:
+            self.switch('profiling')
+            item_size = size(item)
+        self.switch(previous_stage)
+        stage_stats = self.stage_stats(stage)
+        stage_stats[1] += 1
+        stage_stats[2] += item_size
+
+    @contextmanager
+    def stage(self, stage, size=None, item=None):
+        """Run a block as a call of a stage."""
+        previous_stage = self.switch(stage)
+        try:
+            yield
+        finally:
+            self.leave(stage, previous_stage, size, item)
+
+    def iter_stage(self, stage, items, size=None):
+        """Yield the items of an iterable, the time taken to produce each item is recorded as a call of a stage."""
+        items = iter(items)
+        while True:
+            previous_stage = self.switch(stage)
+            try:
+                item = next(items)
+            except StopIteration:
+                self.switch(previous_stage)
+                return
+            self.leave(stage, previous_stage, size, item)
+            yield item
+
+    def merge(self, stats):
+        """Add the stages and patterns of stats given by as_dict, the stats of the worker processes are merged this way."""
+        for stage, stage_stats in stats['stages'].items():
+            merged_stats = self.stage_stats(stage)
+            merged_stats[0] += stage_stats['seconds']
+            merged_stats[1] += stage_stats['calls']
+            merged_stats[2] += stage_stats['bytes']
+        self.pattern_counts.update(stats['patterns'])
+        self.word_counts.update({kind: stats['words'][kind] for kind in ['plain', 'scanned']})
+        self.word_cache_counts.update({kind: stats['word_cache'][kind] for kind in word_cache_kinds})
+        self.worker_tasks += stats['worker_tasks']
+
+    def as_dict(self):
+        """Return the stats recorded so far, the stages are sorted by time."""
+        self.switch(self.current_stage)
+        return self.stats_dict(time.perf_counter() - self.start)
+
+    def stats_dict(self, seconds):
+        """Return the stats recorded until the last switch for a run of seconds."""
+        stages = sorted(self.stages.items(), key=lambda stage_stats: -stage_stats[1][0])
+        return {
+            'seconds': round(seconds, 6),
+            'stages': {stage: {'seconds': round(seconds, 6), 'calls': calls, 'bytes': size} for stage, (seconds, calls, size) in stages},
+            'patterns': dict(self.pattern_counts.most_common()),
+            'words': {'plain': self.word_counts['plain'], 'scanned': self.word_counts['scanned'], 'plain_rate': round(self.word_counts['plain'] / max(sum(self.word_counts.values()), 1), 4)},
+            'word_cache': dict({kind: self.word_cache_counts[kind] for kind in word_cache_kinds}, hit_rate=round(self.word_cache_counts['hits'] / max(self.word_cache_counts['hits'] + self.word_cache_counts['misses'], 1), 4)),
+            'worker_tasks': self.worker_tasks,
+        }
+
+
+def stage(name, size=None, item=None):
+    """Run a block as a call of a stage of the profile of the current thread, nothing is recorded when profiling is off."""
+    profile = active_profile()
+    if profile is None:
+        return nullcontext()
+    return profile.stage(name, size, item)
+
+
+@contextmanager
+def use_profile(profile):
+    """Record the stages run by the current thread in a profile inside a block."""
+    previous_profile = active_profile()
+    profile_state.profile = profile
+    try:
+        yield profile
+    finally:
+        profile_state.profile = previous_profile
+
+
+def write_stats(profile, output_file='-'):
+    """Write the stats of a profile as json to a file, - writes them to stderr."""
+    stats = json.dumps(profile.as_dict(), ensure_ascii=False, indent=2)
+    if output_file == '-':
+        print(stats, file=sys.stderr)
+    else:
+        with open(output_file, 'w', encoding='utf-8') as file_write:
+            file_write.write(stats + '\n')
+
+
+def record_word_cache(profile, start_stats):
+    """Add the lookups of the word caches of this process since start_stats were taken by word_cache_stats to a profile."""
+    stats = word_cache_stats()
+    profile.word_cache_counts.update({kind: stats[kind] - start_stats[kind] for kind in word_cache_kinds})
+
+
+def run_profiled(function, *args):
+    """Run a task in a worker process with a profile of its own, the stats of the task are returned with its result."""
+    profile = Profile()
+    profile.worker_tasks = 1
+    # a worker process runs one task at a time, so the lookups of its word caches during the task are the lookups of the task
+    start_stats = word_cache_stats()
+    with use_profile(profile):
+        result = function(*args)
+    record_word_cache(profile, start_stats)
+    return result, profile.as_dict()
+
+
+class ProfiledTask:
+    """A task submitted to the workers whose stats are merged into the profile when its result is taken."""
+
+    def __init__(self, task, profile):
+        """Wrap the future of a task."""
+        self.task = task
+        self.profile = profile
+        self.stats = None
+
+    def result(self):
+        """Wait for the result of the task, the time spent waiting is recorded in the worker_wait stage."""
+        with self.profile.stage('worker_wait'):
+            result, stats = self.task.result()
+        if self.stats is None:
+            self.stats = stats
+            self.profile.merge(stats)
+        return result
+
+
+class ProfilingExecutor:
+    """An executor whose tasks run with a profile in the worker processes, their stats are merged into the profile of the run."""
+
+    def __init__(self, executor, profile):
+        """Wrap an executor."""
+        self.executor = executor
+        self.profile = profile
+
+    def submit(self, function, *args):
+        """Submit a task to the workers."""
+        return ProfiledTask(self.executor.submit(run_profiled, function, *args), self.profile)
+
+    def shutdown(self, wait=True):
+        """Shut the workers down."""
+        self.executor.shutdown(wait)
+
+
+class ProfilingFile:
+    """An open file whose writes are recorded in the write stage, size gives the bytes of what is written."""
+
+    def __init__(self, file_write, profile, size=text_size):
+        """Wrap an open file."""
+        self.file_write = file_write
+        self.profile = profile
+        self.size = size
+
+    def write(self, text):
+        """Write a text to the file."""
+        previous_stage = self.profile.switch('write')
+        self.file_write.write(text)
+        self.profile.leave('write', previous_stage, self.size, text)
+
+    def close(self):
+        """Close the file."""
+        with self.profile.stage('write'):
+            self.file_write.close()
+
+
+def tokenize_pattern_word(delimited_urls, word):
+    """Tokenize a word which can hold a match of the token patterns into a tuple of tokens and a tuple of the names of the patterns which fired, for the word caches of the profiling tokenizers."""
+    line_regex = compile_guarded_line_regex(delimited_urls, find_absent_guards(word))[0]
+    matches = list(line_regex.finditer(word))
+    return tuple(tokenize_matches(word, matches)), tuple(match_out.lastgroup for match_out in matches)
+
+
+class PatternCountingCache:
+    """A word cache of tokenize_pattern_word which counts the patterns of every word looked up in the profile of the current thread, the found words and the missing ones alike."""
+
+    def __init__(self, word_cache):
+        """Wrap a word cache."""
+        self.word_cache = word_cache
+
+    def __call__(self, word):
+        """Return the tokens of a word."""
+        tokens, pattern_names = self.word_cache(word)
+        profile = active_profile()
+        if profile is not None:
+            profile.pattern_counts.update(pattern_names)
+        return tokens
+
+
+class ProfilingTokenizer(Tokenizer):
+    """A tokenizer which records its stages and the token patterns which fired in the profile of the current thread.
+
+    The output is the same as the output of a Tokenizer with the same options, without a profile nothing is recorded.
+    """
+
+    def __init__(self, *args, **kwargs):
+        """Create the tokenizer and a plain one with the same options for the checks of chunk starts."""
+        super().__init__(*args, **kwargs)
+        self.plain_tokenizer = Tokenizer(*self.options())
+
+    def load_word_cache(self):
+        """Return a word cache of the tokenizer which counts the patterns of the words looked up in it, it is not shared with the plain tokenizers."""
+        return PatternCountingCache(find_word_cache(self.delimited_urls, self.word_cache_size, tokenize_pattern_word))
+
+    def iter_match_words(self, line):
+        """Yield the words of a line which can hold a match of the token patterns counting them as scanned words."""
+        profile = active_profile()
+        if profile is None:
+            yield from super().iter_match_words(line)
+            return
+        word_counts = profile.word_counts
+        for match_word in super().iter_match_words(line):
+            word_counts['scanned'] += 1
+            yield match_word
+
+    def iter_line_matches(self, line):
+        """Yield the matches of the token patterns in a line counting the pattern which fired for each match."""
+        profile = active_profile()
+        if profile is None:
+            yield from super().iter_line_matches(line)
+            return
+        pattern_counts = profile.pattern_counts
+        for match_out in super().iter_line_matches(line):
+            pattern_counts[match_out.lastgroup] += 1
+            yield match_out
+
+    def leave_tokenize(self, profile, previous_stage, line, scanned_words):
+        """Return from the tokenize stage of a line counting its words which were not scanned as plain words, scanned_words is the count of scanned words before the line."""
+        profile.switch('profiling')
+        profile.word_counts['plain'] += len(line.split()) - (profile.word_counts['scanned'] - scanned_words)
+        profile.leave('tokenize', previous_stage, text_size, line)
+
+    def tokenize_line(self, line):
+        """Tokenize a line in the tokenize stage."""
+        profile = active_profile()
+        if profile is None:
+            return super().tokenize_line(line)
+        scanned_words = profile.word_counts['scanned']
+        previous_stage = profile.switch('tokenize')
+        tokens = super().tokenize_line(line)
+        self.leave_tokenize(profile, previous_stage, line, scanned_words)
+        return tokens
+
+    def create_bullets(self, line):
+        """Join the bullets of a line in the proper_bullet_creation stage."""
+        profile = active_profile()
+        if profile is None:
+            return super().create_bullets(line)
+        previous_stage = profile.switch('proper_bullet_creation')
+        line = super().create_bullets(line)
+        profile.leave('proper_bullet_creation', previous_stage, text_size, line)
+        return line
+
+    def split_raw_sentences(self, line):
+        """Split a line into untokenized sentences in the sentence_split stage."""
+        profile = active_profile()
+        if profile is None:
+            return super().split_raw_sentences(line)
+        previous_stage = profile.switch('sentence_split')
+        raw_sentences = super().split_raw_sentences(line)
+        profile.leave('sentence_split', previous_stage, text_size, line)
+        return raw_sentences
+
+    def iter_raw_sentence_tokens(self, raw_sentences, lang_type=0):
+        """Yield the token lists of sentences, the sentence splitting and punctuation lookahead are recorded in the sentences stage."""
+        profile = active_profile()
+        if profile is None:
+            return super().iter_raw_sentence_tokens(raw_sentences, lang_type)
+        return profile.iter_stage('sentences', super().iter_raw_sentence_tokens(raw_sentences, lang_type), tokens_size)
+
+    def tokenize_line_spans(self, line, offset=0):
+        """Tokenize a line into token offsets in the tokenize stage."""
+        profile = active_profile()
+        if profile is None:
+            return super().tokenize_line_spans(line, offset)
+        scanned_words = profile.word_counts['scanned']
+        previous_stage = profile.switch('tokenize')
+        spans = super().tokenize_line_spans(line, offset)
+        self.leave_tokenize(profile, previous_stage, line, scanned_words)
+        return spans
+
+    def iter_sentence_spans(self, lines, lang_type=0, first_line_index=0):
+        """Yield the SentenceSpans of sentences, the bullets, sentence splitting and punctuation lookahead are recorded in the sentences stage."""
+        profile = active_profile()
+        if profile is None:
+            return super().iter_sentence_spans(lines, lang_type, first_line_index)
+        return profile.iter_stage('sentences', super().iter_sentence_spans(lines, lang_type, first_line_index), lambda sentence: tokens_size(sentence.tokens()))
+
+    def is_chunk_start(self, line, lang_type=0):
+        """Check a chunk start in the chunk_start stage, its tokenization is not counted in the other stages."""
+        with stage('chunk_start', text_size, line):
+            return self.plain_tokenizer.is_chunk_start(line, lang_type)
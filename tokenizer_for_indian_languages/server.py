@@ -0,0 +1,329 @@
+"""Tokenization server which loads the tokenizers and the language identification model once and serves requests over localhost http or a unix socket."""
+# how to run the code
+# python3 -m tokenizer_for_indian_languages.server --port 8000
+# python3 -m tokenizer_for_indian_languages.server --socket /tmp/tokenizer.sock
+# a request is a POST to /tokenize with a json body
+# {"text": "...", "lang": "hi" or "auto", "format": "raw" or "ssf", "sentence_tokenize": true}
+# the response is {"lang_type": 0, "output": "..."} where output is the same as the content of an output file of the scripts
+# with --stats a GET of /stats returns the time, calls and bytes of the stages of all requests so far
+import argparse
+import io
+import json
+import os
+import queue
+import signal
+import socket
+import socketserver
+import stat
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from . import language_identification
+from .files import iter_lines_from_file, write_sentence_tokens
+from .language_identification import close_language_cache, configure_language_identifier, default_language_cache_path, find_script_language_type, identify_language_types, language_backends, load_language_identifier, read_language_prefix
+from .profiling import Profile, ProfilingTokenizer, active_profile, record_word_cache, stage, text_size, use_profile, write_stats
+from .tokenizer import Tokenizer, find_lang_type, word_cache_stats
+
+
+# the tokenizers of the scripts for each output format and sentence tokenization
+tokenizers = {
+    ('raw', True): Tokenizer(bullets=True, delimited_urls=True),
+    ('raw', False): Tokenizer(sentence_tokenize=False, split_lines=False),
+    ('ssf', True): Tokenizer(),
+    ('ssf', False): Tokenizer(sentence_tokenize=False, split_lines=False, merge_punctuation=False),
+}
+# the tokenizers used for requests which are profiled
+profiling_tokenizers = {key: ProfilingTokenizer(*tokenizer.options()) for key, tokenizer in tokenizers.items()}
+
+
+def use_word_cache(word_cache_size):
+    """Replace the tokenizers with tokenizers which keep the tokens of word_cache_size words in the word cache shared by the threads."""
+    for key, tokenizer in list(tokenizers.items()):
+        tokenizers[key] = Tokenizer(*tokenizer.options(), word_cache_size=word_cache_size)
+        profiling_tokenizers[key] = ProfilingTokenizer(*tokenizer.options(), word_cache_size=word_cache_size)
+
+
+class LanguageTypeBatcher:
+    """Collect the texts of concurrent requests and identify their language types with one model call per batch."""
+
+    def __init__(self, batch_size=32, batch_wait=0.005, profile=None):
+        """Start the thread which runs the batches, a batch waits at most batch_wait seconds for more texts, the batches are recorded in profile when it is given."""
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.profile = profile
+        self.profile_lock = threading.Lock()
+        self.pending_texts = queue.Queue()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def identify(self, text):
+        """Identify the language type of a text together with the texts of the other requests."""
+        future = Future()
+        self.pending_texts.put((text, future))
+        return future.result()
+
+    def stats(self):
+        """Return the stats of the batches run so far, the time the thread waits for texts is left out."""
+        with self.profile_lock:
+            stats = self.profile.as_dict()
+        stats['stages'].pop('other', None)
+        return stats
+
+    def run(self):
+        """Identify the language types of the pending texts batch by batch."""
+        with use_profile(self.profile):
+            self.run_batches()
+
+    def run_batches(self):
+        """Run the batches of the pending texts forever."""
+        while True:
+            batch = [self.pending_texts.get()]
+            deadline = time.monotonic() + self.batch_wait
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                try:
+                    batch.append(self.pending_texts.get(timeout=max(timeout, 0)))
+                except queue.Empty:
+                    break
+            try:
+                with self.profile_lock:
+                    lang_types = identify_language_types([text for text, _ in batch], self.batch_size)
+            except Exception as error:
+                for _, future in batch:
+                    future.set_exception(error)
+            else:
+                for (_, future), lang_type in zip(batch, lang_types):
+                    future.set_result(lang_type)
+
+
+def tokenize_request(request, batcher=None):
+    """Tokenize the text of a request, a ValueError is raised for a request that can not be served."""
+    if not isinstance(request, dict) or not isinstance(request.get('text'), str):
+        raise ValueError('the request needs a text')
+    output_format = request.get('format', 'raw')
+    if output_format not in ['raw', 'ssf']:
+        raise ValueError('unknown format: %s' % output_format)
+    lang = request.get('lang', 'hi')
+    with stage('read', text_size, request['text']):
+        lines = list(iter_lines_from_file(io.StringIO(request['text'], newline=None)))
+    if lang == 'auto':
+        if batcher is None:
+            raise ValueError('language identification is not enabled in this server')
+        prefix_text = read_language_prefix(lines)[0]
+        lang_type = None
+        if language_identification.use_script_language_type:
+            lang_type = find_script_language_type(prefix_text)
+        # only the texts whose script does not decide the language type wait for a batch of the model
+        if lang_type is None:
+            with stage('language_batch_wait'):
+                lang_type = batcher.identify(prefix_text)
+    else:
+        lang_type = find_lang_type(lang)
+    tokenizer = (tokenizers if active_profile() is None else profiling_tokenizers)[output_format, bool(request.get('sentence_tokenize', True))]
+    output = io.StringIO()
+    with stage(output_format + '_format'):
+        write_sentence_tokens(output, tokenizer.iter_sentence_tokens(lines, lang_type), output_format)
+    return {'lang_type': lang_type, 'output': output.getvalue()}
+
+
+class TokenizationRequestHandler(BaseHTTPRequestHandler):
+    """Serve tokenization requests, connections are kept alive between requests."""
+
+    protocol_version = 'HTTP/1.1'
+    # the headers and the body of a response are sent together when the response is flushed
+    wbufsize = 64 * 1024
+
+    def setup(self):
+        """Send small responses without waiting for the acknowledgement of the previous packet on tcp connections."""
+        super().setup()
+        if self.client_address:
+            self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, True)
+
+    def do_GET(self):
+        """Send the stats of the requests so far."""
+        if self.path != '/stats' or self.server.stats is None:
+            self.send_json(404, {'error': 'unknown path: %s' % self.path})
+            return
+        self.send_json(200, self.server.stats.as_dict())
+
+    def do_POST(self):
+        """Tokenize the json request in the body."""
+        if self.path != '/tokenize':
+            self.send_json(404, {'error': 'unknown path: %s' % self.path})
+            return
+        try:
+            content_length = int(self.headers.get('Content-Length', 0))
+        except ValueError:
+            content_length = -1
+        if content_length < 0:
+            # the body of the request can not be told apart from the next request, so the connection is closed
+            self.close_connection = True
+            self.send_json(400, {'error': 'invalid Content-Length: %s' % self.headers.get('Content-Length')})
+            return
+        body = self.rfile.read(content_length)
+        try:
+            if self.server.stats is None:
+                response = tokenize_request(json.loads(body), self.server.batcher)
+            else:
+                request_profile = Profile()
+                try:
+                    with use_profile(request_profile):
+                        response = tokenize_request(json.loads(body), self.server.batcher)
+                finally:
+                    self.server.stats.add(request_profile.as_dict())
+        except ValueError as error:
+            self.send_json(400, {'error': str(error)})
+        except Exception as error:
+            self.send_json(500, {'error': str(error)})
+        else:
+            self.send_json(200, response)
+
+    def send_json(self, status, data):
+        """Send a json response."""
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def address_string(self):
+        """Name the client, a unix socket client has no address."""
+        return self.client_address[0] if self.client_address else 'unix socket'
+
+    def log_message(self, format, *args):
+        """Log requests only in verbose mode."""
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class LocalHTTPServer(ThreadingHTTPServer):
+    """Serve http on localhost with a thread per connection."""
+
+    # the default backlog of 5 connections refuses bursts of concurrent clients
+    request_queue_size = 128
+
+
+class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Serve http over a unix socket with a thread per connection."""
+
+    daemon_threads = True
+    request_queue_size = 128
+
+
+class ServerStats:
+    """The stats of the requests of a server and of its language identification batches, the seconds are the uptime of the server.
+
+    The lookups of the word cache are counted for the whole server, the requests running at the same time share the cache.
+    """
+
+    def __init__(self, batcher=None):
+        """Start collecting the stats of the requests."""
+        self.batcher = batcher
+        # the stats of the requests are merged into this profile, its own clock is never switched
+        self.requests = Profile()
+        self.lock = threading.Lock()
+        self.word_cache_start = word_cache_stats()
+
+    def add(self, stats):
+        """Add the stats of a request."""
+        with self.lock:
+            self.requests.merge(stats)
+
+    def as_dict(self):
+        """Return the stats of the requests so far together with the stats of the batches."""
+        profile = Profile()
+        with self.lock:
+            profile.merge(self.requests.stats_dict(0))
+        if self.batcher is not None and self.batcher.profile is not None:
+            profile.merge(self.batcher.stats())
+        record_word_cache(profile, self.word_cache_start)
+        return profile.stats_dict(time.perf_counter() - self.requests.start)
+
+
+def create_server(port=8000, host='127.0.0.1', socket_path=None, batcher=None, verbose=False, stats=None):
+    """Create a server on localhost or on a unix socket when socket_path is given, the requests are profiled when stats is given."""
+    if socket_path:
+        # a socket left behind by a server that was stopped is replaced
+        if os.path.exists(socket_path) and stat.S_ISSOCK(os.stat(socket_path).st_mode):
+            os.remove(socket_path)
+        server = ThreadingUnixHTTPServer(socket_path, TokenizationRequestHandler)
+    else:
+        server = LocalHTTPServer((host, port), TokenizationRequestHandler)
+    server.batcher = batcher
+    server.verbose = verbose
+    server.stats = stats
+    return server
+
+
+def stop_serving(signal_number, frame):
+    """Stop serve_forever on SIGTERM the way ctrl c does, so the server is cleaned up by the same finally block."""
+    raise KeyboardInterrupt
+
+
+def main():
+    """Pass arguments and call functions here."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--host', dest='host', help="enter the host name to listen on", default='127.0.0.1')
+    parser.add_argument(
+        '--port', dest='port', help="enter the port to listen on", type=int, default=8000)
+    parser.add_argument(
+        '--socket', dest='socket', help="enter the path of a unix socket to listen on instead of the port", default=None)
+    parser.add_argument(
+        '--no-lid', dest='no_lid', help="do not load the language identification model, requests with lang auto are refused", action='store_true')
+    parser.add_argument(
+        '--batch-size', dest='batch_size', help="enter the maximum number of requests whose languages are identified in one model call", type=int, default=32)
+    parser.add_argument(
+        '--batch-wait', dest='batch_wait', help="enter the milliseconds a batch waits for more requests", type=float, default=5)
+    parser.add_argument(
+        '--torch-threads', dest='torch_threads', help="enter the number of threads used by torch or onnxruntime for the model on cpu", type=int, default=None)
+    parser.add_argument(
+        '--lid-backend', dest='lid_backend', help="run the model with the fp32 pytorch pipeline, an exported onnx model or the model quantized to int8 when it is loaded", choices=language_backends, default='pytorch')
+    parser.add_argument(
+        '--lid-model', dest='lid_model', help="enter the local path of the model of the backend, the exported .onnx file or its folder for onnx", default=None)
+    parser.add_argument(
+        '--lid-max-length', dest='lid_max_length', help="enter the number of word pieces the texts are cut at, by default 128 for onnx and quantized and no limit for pytorch", type=int, default=None)
+    parser.add_argument(
+        '--lid-cache', dest='lid_cache', help="enter the path of the language identification cache", default=default_language_cache_path)
+    parser.add_argument(
+        '--lid-cache-size', dest='lid_cache_size', help="enter the maximum number of entries in the language identification cache", type=int, default=1000000)
+    parser.add_argument(
+        '--no-lid-cache', dest='no_lid_cache', help="do not use the language identification cache", action='store_true')
+    parser.add_argument(
+        '--no-script-lid', dest='no_script_lid', help="always use the model instead of deciding the language type from the script when it is unambiguous", action='store_true')
+    parser.add_argument(
+        '--word-cache', dest='word_cache', help="enter the number of words which need splitting whose tokens are kept in an lru cache shared by the requests, 0 turns the cache off", type=int, default=0)
+    parser.add_argument(
+        '--verbose', dest='verbose', help="log every request", action='store_true')
+    parser.add_argument(
+        '--stats', '--profile', dest='stats', help="record the time, calls and bytes of every stage and the token patterns which fired, served at /stats and written when the server stops to the json file entered or - for stderr", nargs='?', const='-', default=None)
+    args = parser.parse_args()
+    if args.word_cache > 0:
+        use_word_cache(args.word_cache)
+    batcher = None
+    if not args.no_lid:
+        configure_language_identifier(args.torch_threads, None if args.no_lid_cache else args.lid_cache, args.lid_cache_size, not args.no_script_lid, args.lid_backend, args.lid_model, args.lid_max_length)
+        load_language_identifier()
+        batcher = LanguageTypeBatcher(args.batch_size, args.batch_wait / 1000, None if args.stats is None else Profile())
+    stats = None if args.stats is None else ServerStats(batcher)
+    server = create_server(args.port, args.host, args.socket, batcher, args.verbose, stats)
+    print('serving on %s' % (args.socket or '%s:%d' % (args.host, args.port)), file=sys.stderr)
+    signal.signal(signal.SIGTERM, stop_serving)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if args.socket and os.path.exists(args.socket):
+            os.remove(args.socket)
+        close_language_cache()
+        if stats is not None:
+            write_stats(stats, args.stats)
+
+
+if __name__ == '__main__':
+    main()
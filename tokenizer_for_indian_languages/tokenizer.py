@@ -0,0 +1,595 @@
+"""Tokenize lines of text and split them into sentences."""
+import io
+import re
+import threading
+from array import array
+from collections import Counter
+from functools import lru_cache, partial
+from itertools import groupby
+from operator import itemgetter
+from .patterns import bullet_pattern, build_line_token_regex, build_token_regex, build_token_specification, non_punctuation, pattern_guards, punctuations, sentence_end_markers, token_start_characters
+
+
+# a line of language type 0 is split into sentences after every purna biram
+raw_sentence_regex = re.compile('.*?।|.*?\n', re.U)
+# the guards of the token patterns with the bit of each guard in the set of guards which do not match a line
+compiled_pattern_guards = tuple((1 << index, re.compile(guard, re.U)) for index, (guard, _) in enumerate(pattern_guards))
+# the tokens between the matches of the token patterns are split at whitespace like str.split does
+non_space_regex = re.compile(r'\S+', re.U)
+# the word caches of this process keyed by pattern set and size, a worker process keeps them across its tasks
+word_caches = {}
+word_caches_lock = threading.Lock()
+
+
+# the mapping of languages and ISO code to the language types
+# lang = 0 for languages ['hi', 'or', 'mn', 'as', 'bn', 'pa'], purna biram as sentence end marker
+# lang = 1 for Urdu and Kashmiri '۔' sentence end marker
+# lang = 2 for languages ['en', 'gu', 'mr', 'ml', 'kn', 'te', 'ta'] '.' sentence end marker
+lang_codes = {
+    0: ['hi', 'or', 'mn', 'as', 'bn', 'pa'],
+    1: ['ur', 'ks'],
+    2: ['en', 'gu', 'mr', 'ml', 'kn', 'te', 'ta'],
+}
+
+
+def find_lang_type(lang_code):
+    """Map a 2 lettered ISO 639-1 language code to its language type."""
+    for lang_type, codes in lang_codes.items():
+        if lang_code in codes:
+            return lang_type
+    raise ValueError('unknown language code: %s' % lang_code)
+
+
+def proper_bullet_creation(text, pattern=bullet_pattern):
+    """Create proper bullet points after removing spaces between them."""
+    text = re.sub('\\s{2,}', ' ', text)
+    updated_text = ''
+    bullet_patterns = re.finditer(pattern, text)
+    bullet_patterns = list(bullet_patterns)
+    if not bullet_patterns:
+        updated_text = text
+    else:
+        prev_end = -100000
+        for bullet_pattern in bullet_patterns:
+            start, end = bullet_pattern.start(), bullet_pattern.end()
+            if start == prev_end:
+                updated_text = updated_text.strip()
+                updated_text += bullet_pattern.group(1)
+            else:
+                updated_text += text[prev_end: start]
+                updated_text += bullet_pattern.group(1)
+            prev_end = end
+        if end != len(text):
+            updated_text += text[end:]
+    return updated_text
+
+
+def align_normalized_line(line, normalized_line):
+    """Map every position of a line normalized by proper_bullet_creation to its position in the line, the normalization only removes whitespace or replaces it with a space."""
+    alignment = array('I')
+    position = 0
+    for char in normalized_line:
+        if char.isspace():
+            while not line[position].isspace():
+                position += 1
+        else:
+            while line[position] != char:
+                position += 1
+        alignment.append(position)
+        position += 1
+    return alignment
+
+
+class SentenceSpans:
+    """The tokens of a sentence kept as offsets into its lines, the strings of the tokens are only made when they are asked for.
+
+    A sentence is made of one segment for each line it has tokens of, usually one. A segment is the line given as its
+    index, its text as it was tokenized and the alignment of that text with the line when proper_bullet_creation changed it,
+    and an array('I') of the start and end offsets of the tokens in the text, which numpy can read with numpy.frombuffer.
+    """
+
+    __slots__ = ['segments']
+
+    def __init__(self, segments):
+        """Keep the segments of the sentence."""
+        self.segments = segments
+
+    def __len__(self):
+        """Count the tokens of the sentence."""
+        return sum(len(spans) for _, spans in self.segments) // 2
+
+    def tokens(self):
+        """Make the strings of the tokens, they are the tokens of iter_sentence_tokens without the empty ones."""
+        return [text[spans[index]: spans[index + 1]] for (_, text, _), spans in self.segments for index in range(0, len(spans), 2)]
+
+    def offsets(self):
+        """Return the line index, start and end offset of every token in the lines given to the tokenizer in an array('I')."""
+        offsets = array('I')
+        for (line_index, _, alignment), spans in self.segments:
+            for index in range(0, len(spans), 2):
+                start, end = spans[index], spans[index + 1]
+                if alignment is not None:
+                    start, end = alignment[start], alignment[end - 1] + 1
+                offsets.extend((line_index, start, end))
+        return offsets
+
+
+class TokenBatch:
+    """The tokens of the sentences of a batch of texts as a ragged array of texts of sentences of tokens.
+
+    tokens is the flat list of the tokens of all the sentences in order without the empty ones, the tokens of
+    sentence i are tokens[sentence_offsets[i]: sentence_offsets[i + 1]] and the sentences of text j are sentences
+    document_offsets[j] to document_offsets[j + 1]. The offsets are array('i') of int32 like the offsets of arrow
+    list arrays, numpy.frombuffer(offsets, dtype=numpy.int32) reads them without a copy.
+    """
+
+    __slots__ = ['tokens', 'sentence_offsets', 'document_offsets']
+
+    def __init__(self, tokens, sentence_offsets, document_offsets):
+        """Keep the flat tokens and the offsets of the sentences and texts."""
+        self.tokens = tokens
+        self.sentence_offsets = sentence_offsets
+        self.document_offsets = document_offsets
+
+    def __len__(self):
+        """Count the texts of the batch."""
+        return len(self.document_offsets) - 1
+
+    def sentences(self, index):
+        """Make the token lists of the sentences of a text, they are the sentences tokenize_text gives split into their tokens."""
+        offsets = self.sentence_offsets
+        return [self.tokens[offsets[sentence_index]: offsets[sentence_index + 1]] for sentence_index in range(self.document_offsets[index], self.document_offsets[index + 1])]
+
+    def to_arrow(self):
+        """Return the batch as a pyarrow array of the list of sentences of every text, a sentence is a list of its tokens, pyarrow is imported when it is called."""
+        import pyarrow
+        tokens = pyarrow.array(self.tokens, pyarrow.string())
+        # the offsets are handed to arrow as they are, without a copy
+        sentence_offsets = pyarrow.Array.from_buffers(pyarrow.int32(), len(self.sentence_offsets), [None, pyarrow.py_buffer(self.sentence_offsets)])
+        document_offsets = pyarrow.Array.from_buffers(pyarrow.int32(), len(self.document_offsets), [None, pyarrow.py_buffer(self.document_offsets)])
+        return pyarrow.ListArray.from_arrays(document_offsets, pyarrow.ListArray.from_arrays(sentence_offsets, tokens))
+
+
+@lru_cache(maxsize=None)
+def compile_token_patterns(delimited_urls=False):
+    """Compile the word and line regexes of a pattern set, every tokenizer with the same pattern set shares them."""
+    token_specification = build_token_specification(delimited_urls)
+    get_token = re.compile(build_token_regex(token_specification), re.U)
+    get_line_tokens = re.compile(build_line_token_regex(token_specification), re.U)
+    return token_specification, get_token, get_line_tokens
+
+
+@lru_cache(maxsize=None)
+def compile_guarded_line_regex(delimited_urls=False, absent_guards=0):
+    """Compile the line regex of a pattern set without the patterns whose guards are in the bits of absent_guards and the regex of the words which can hold a match of it, each variant is compiled once per process.
+
+    The patterns left out can not match a line without a match of their guards and the other patterns keep their
+    order, so the matches are the same as the matches of the line regex with every pattern. No match spans
+    whitespace, so the matches in a line are the matches in its words which have a character a match can start with.
+    """
+    token_specification = build_token_specification(delimited_urls)
+    if absent_guards == 0:
+        line_regex = compile_token_patterns(delimited_urls)[2]
+    else:
+        absent_names = {name for index, (_, names) in enumerate(pattern_guards) if absent_guards >> index & 1 for name in names}
+        token_specification = [pair for pair in token_specification if pair[0] not in absent_names]
+        line_regex = re.compile(build_line_token_regex(token_specification), re.U)
+    start_characters = ''.join(token_start_characters[name] for name, _ in token_specification)
+    # the first start character of a word is found with a lazy scan from the start of the word
+    match_word_regex = re.compile(r'(?<!\S)\S*?[' + start_characters + r']\S*', re.U)
+    return line_regex, match_word_regex
+
+
+def tokenize_matches(line, matches):
+    """Make the tokens of a line from the matches of the token patterns in it, the text around the matches is split at whitespace."""
+    tkns = []
+    line_len = len(line)
+    prev_end = 0
+    for match_out in matches:
+        start, end = match_out.span()
+        gap_tokens = line[prev_end: start].split()
+        prefix = ''
+        if gap_tokens and not line[start - 1].isspace():
+            prefix = gap_tokens.pop()
+        tkns.extend(gap_tokens)
+        if (start == 0 or line[start - 1].isspace()) and (end == line_len or line[end].isspace()):
+            if match_out.lastgroup == 'urdu_year':
+                tkns.append(line[start: end - 4])
+                tkns.append(line[end - 4: end])
+            else:
+                tkns.append(line[start: end])
+        elif match_out.lastgroup in ["NUMBER", "bullets"]:
+            tkns.append(prefix + line[start: end])
+        else:
+            aa = prefix + line[start: (end - 1)]
+            if aa != '':
+                tkns.append(aa)
+            tkns.append(match_out.group(0))
+        prev_end = end
+    tkns.extend(line[prev_end:].split())
+    return tkns
+
+
+def find_absent_guards(text):
+    """Return the bits of the guards of the token patterns which do not match a text."""
+    absent_guards = 0
+    for guard_bit, guard in compiled_pattern_guards:
+        if guard.search(text) is None:
+            absent_guards |= guard_bit
+    return absent_guards
+
+
+def tokenize_match_word(delimited_urls, word):
+    """Tokenize a word which can hold a match of the token patterns of a pattern set into a tuple of tokens."""
+    line_regex = compile_guarded_line_regex(delimited_urls, find_absent_guards(word))[0]
+    return tuple(tokenize_matches(word, line_regex.finditer(word)))
+
+
+def find_word_cache(delimited_urls=False, word_cache_size=100000, tokenize_word=tokenize_match_word):
+    """Return the lru cache of tokenize_word on the words of a pattern set holding at most word_cache_size words, it is created once per process and shared by the tokenizers with the same pattern set, size and tokenize_word."""
+    key = (delimited_urls, word_cache_size, tokenize_word)
+    word_cache = word_caches.get(key)
+    if word_cache is None:
+        with word_caches_lock:
+            word_cache = word_caches.get(key)
+            if word_cache is None:
+                word_cache = word_caches[key] = lru_cache(maxsize=word_cache_size)(partial(tokenize_word, delimited_urls))
+    return word_cache
+
+
+def word_cache_stats():
+    """Add up the hits, misses and evictions of the word caches of this process and count the words they hold."""
+    stats = Counter()
+    for word_cache in list(word_caches.values()):
+        cache_info = word_cache.cache_info()
+        stats['hits'] += cache_info.hits
+        stats['misses'] += cache_info.misses
+        # a word is only ever removed from a cache to make room for another one
+        stats['evictions'] += cache_info.misses - cache_info.currsize
+        stats['words'] += cache_info.currsize
+    return stats
+
+
+class Tokenizer:
+    """Tokenize lines and split them into sentences.
+
+    A tokenizer only holds its options and compiled regexes which never change after it is created,
+    so one tokenizer can be shared by threads and reused for any number of calls.
+    sentence_tokenize splits the tokens of a sentence at the sentence end markers of the language type,
+    split_lines splits lines of language type 0 after every purna biram before they are tokenized,
+    merge_punctuation appends a sentence made of punctuation only to the sentence before it,
+    bullets joins bullet numbers to the text after them and
+    delimited_urls uses the url patterns written with / delimiters of the raw tokenizers with sentence tokenization.
+    word_cache_size keeps the tokens of that many of the most recently used words which need splitting in an lru cache,
+    the cache is shared by the tokenizers of a process with the same pattern set and size and is safe to use from
+    threads, 0 turns it off. The cache never changes the output, so it is not one of the options.
+    """
+
+    def __init__(self, sentence_tokenize=True, split_lines=True, merge_punctuation=True, bullets=False, delimited_urls=False, word_cache_size=0):
+        """Compile the pattern set of the tokenizer, the same pattern set is compiled only once per process."""
+        self.sentence_tokenize = sentence_tokenize
+        self.split_lines = split_lines
+        self.merge_punctuation = merge_punctuation
+        self.bullets = bullets
+        self.delimited_urls = delimited_urls
+        self.token_specification, self.get_token, self.get_line_tokens = compile_token_patterns(delimited_urls)
+        self.word_cache_size = word_cache_size
+        self.word_cache = self.load_word_cache() if word_cache_size > 0 else None
+
+    def options(self):
+        """Return the options of the tokenizer in the order of the arguments of Tokenizer."""
+        return (self.sentence_tokenize, self.split_lines, self.merge_punctuation, self.bullets, self.delimited_urls)
+
+    def load_word_cache(self):
+        """Return the word cache of the tokenizer, it is called with the tokens of a word which needs splitting."""
+        return find_word_cache(self.delimited_urls, self.word_cache_size)
+
+    def __reduce__(self):
+        """Pickle only the options and the size of the word cache, the regexes and the cache are made again in the process that unpickles the tokenizer."""
+        return (type(self), self.options() + (self.word_cache_size,))
+
+    def tokenize_words(self, list_s):
+        """Tokenize a list of tokens."""
+        tkns = []
+        for wrds in list_s:
+            wrds_len = len(wrds)
+            initial_pos = 0
+            end_pos = 0
+            while initial_pos <= (wrds_len - 1):
+                mo = self.get_token.match(wrds, initial_pos)
+                if mo is not None and len(mo.group(0)) == wrds_len:
+                    if mo.lastgroup == 'urdu_year':
+                        tkns.append(wrds[: -4])
+                        tkns.append(wrds[-4:])
+                    else:
+                        tkns.append(wrds)
+                    initial_pos = wrds_len
+                else:
+                    match_out = self.get_token.search(wrds, initial_pos)
+                    if match_out is not None:
+                        end_pos = match_out.end()
+                        if match_out.lastgroup in ["NUMBER", "bullets"]:
+                            aa = wrds[initial_pos:(end_pos)]
+                        else:
+                            aa = wrds[initial_pos:(end_pos - 1)]
+                        if aa != '':
+                            tkns.append(aa)
+                        if match_out.lastgroup not in ["NUMBER", "bullets"]:
+                            tkns.append(match_out.group(0))
+                        initial_pos = end_pos
+                    else:
+                        tkns.append(wrds[initial_pos:])
+                        initial_pos = wrds_len
+        return tkns
+
+    def iter_match_words(self, line):
+        """Yield the start and end of every word of a line which can hold a match of the token patterns with the regex which scans it, the other words need no splitting."""
+        line_regex, match_word_regex = compile_guarded_line_regex(self.delimited_urls, find_absent_guards(line))
+        for match_word in match_word_regex.finditer(line):
+            yield line_regex, match_word.start(), match_word.end()
+
+    def iter_line_matches(self, line):
+        """Yield the matches of the token patterns in a line, only the words which can hold a match are scanned and only with the patterns which can match in the line."""
+        for line_regex, start, end in self.iter_match_words(line):
+            # the lookarounds of the patterns only check for whitespace, which is what a word is bounded by
+            yield from line_regex.finditer(line, start, end)
+
+    def tokenize_line(self, line):
+        """Tokenize a line in a single scan, the output is the same as tokenize_words on the words of the line."""
+        if self.word_cache is None:
+            return tokenize_matches(line, self.iter_line_matches(line))
+        # the tokens of a word never depend on the other words of its line
+        tkns = []
+        prev_end = 0
+        for _, start, end in self.iter_match_words(line):
+            tkns.extend(line[prev_end: start].split())
+            tkns.extend(self.word_cache(line[start: end]))
+            prev_end = end
+        tkns.extend(line[prev_end:].split())
+        return tkns
+
+    def tokenize_line_spans(self, line, offset=0):
+        """Tokenize a line into an array('I') of the start and end offsets of its tokens plus offset, the tokens are the same as tokenize_line gives."""
+        spans = array('I')
+        add = spans.append
+        line_len = len(line)
+        prev_end = 0
+        for match_out in self.iter_line_matches(line):
+            start, end = match_out.span()
+            # the last token of the gap before a match is its prefix when it touches the match
+            last_gap_span = None
+            for gap_match in non_space_regex.finditer(line, prev_end, start):
+                if last_gap_span is not None:
+                    add(last_gap_span[0] + offset)
+                    add(last_gap_span[1] + offset)
+                last_gap_span = gap_match.span()
+            prefix_start = start
+            if last_gap_span is not None:
+                if not line[start - 1].isspace():
+                    prefix_start = last_gap_span[0]
+                else:
+                    add(last_gap_span[0] + offset)
+                    add(last_gap_span[1] + offset)
+            if (start == 0 or line[start - 1].isspace()) and (end == line_len or line[end].isspace()):
+                if match_out.lastgroup == 'urdu_year':
+                    add(start + offset)
+                    add(end - 4 + offset)
+                    add(end - 4 + offset)
+                    add(end + offset)
+                else:
+                    add(start + offset)
+                    add(end + offset)
+            elif match_out.lastgroup in ["NUMBER", "bullets"]:
+                add(prefix_start + offset)
+                add(end + offset)
+            else:
+                prefix_end = max(end - 1, start)
+                if prefix_start < prefix_end:
+                    add(prefix_start + offset)
+                    add(prefix_end + offset)
+                add(start + offset)
+                add(end + offset)
+            prev_end = end
+        for gap_match in non_space_regex.finditer(line, prev_end):
+            add(gap_match.start() + offset)
+            add(gap_match.end() + offset)
+        return spans
+
+    def is_punctuation_only(self, sentence):
+        """Check that a sentence is made of punctuation tokens only, an empty sentence is punctuation only."""
+        if non_punctuation.search(sentence) is not None:
+            return False
+        punct_flag = True
+        for token in self.tokenize_line(sentence):
+            punct_flag &= token in punctuations
+        return punct_flag
+
+    def create_bullets(self, line):
+        """Join the bullets of a line with proper_bullet_creation, iter_raw_sentences calls it for every line so a subclass can wrap it."""
+        return proper_bullet_creation(line)
+
+    def split_raw_sentences(self, line):
+        """Split a line into untokenized sentences at the dandas and the end of the line, iter_raw_sentences calls it for every line so a subclass can wrap it."""
+        return raw_sentence_regex.findall(line + '\n')
+
+    def iter_raw_sentences(self, lines, lang_type=0):
+        """Split lines into untokenized sentences, a sentence never crosses a line."""
+        for line in lines:
+            if self.bullets:
+                line = self.create_bullets(line)
+            if self.split_lines and lang_type == 0:
+                yield from self.split_raw_sentences(line)
+            else:
+                yield line
+
+    def iter_raw_sentence_tokens(self, raw_sentences, lang_type=0):
+        """Yield the token list of each sentence of untokenized sentences keeping only one sentence of lookahead in memory."""
+        end_markers = sentence_end_markers.get(lang_type, sentence_end_markers[2])
+        sentences = iter(raw_sentences)
+        sentence = next(sentences, None)
+        list_tokens = None
+        while sentence is not None:
+            next_sentence = next(sentences, None)
+            next_tokens = None
+            sentence = sentence.strip()
+            if sentence != '':
+                proper_sentences = list()
+                if list_tokens is None:
+                    list_tokens = self.tokenize_line(sentence)
+                end_sentence_markers = [index + 1 for index, token in enumerate(list_tokens) if token in end_markers] if self.sentence_tokenize else []
+                if len(end_sentence_markers) > 0:
+                    if end_sentence_markers[-1] != len(list_tokens):
+                        end_sentence_markers += [len(list_tokens)]
+                    end_sentence_markers_with_sentence_end_positions = [0] + end_sentence_markers
+                    sentence_boundaries = list(zip(end_sentence_markers_with_sentence_end_positions, end_sentence_markers_with_sentence_end_positions[1:]))
+                    for start, end in sentence_boundaries:
+                        individual_sentence = list_tokens[start: end]
+                        proper_sentences.append(individual_sentence)
+                else:
+                    proper_sentences.append(list_tokens)
+                # the next sentence is tokenized here only when it can be punctuation only, its tokens are reused in the next iteration
+                if self.merge_punctuation and next_sentence is not None and non_punctuation.search(next_sentence) is None:
+                    next_tokens = self.tokenize_line(next_sentence)
+                    punct_flag = True
+                    for token in next_tokens:
+                        punct_flag &= token in punctuations
+                    if punct_flag:
+                        # an empty token keeps the trailing space that merging an empty sentence leaves in the joined sentence
+                        proper_sentences[-1] = proper_sentences[-1] + (next_tokens or [''])
+                        next_sentence = ''
+                yield from proper_sentences
+            sentence = next_sentence
+            list_tokens = next_tokens
+
+    def iter_raw_sentence_offsets(self, lines, lang_type=0, first_line_index=0):
+        """Split lines into untokenized sentences like iter_raw_sentences, each sentence is given with its line and its offset in the text of the line.
+
+        A line is given as its index counted from first_line_index, its text as it is tokenized and the alignment of that
+        text with the line when proper_bullet_creation changed it.
+        """
+        for line_index, line in enumerate(lines, first_line_index):
+            text = line
+            alignment = None
+            if self.bullets:
+                text = proper_bullet_creation(line)
+                if text != line:
+                    alignment = align_normalized_line(line, text)
+            line_info = (line_index, text, alignment)
+            if self.split_lines and lang_type == 0:
+                for match_out in raw_sentence_regex.finditer(text + '\n'):
+                    yield line_info, match_out.group(0), match_out.start()
+            else:
+                yield line_info, text, 0
+
+    def iter_sentence_spans(self, lines, lang_type=0, first_line_index=0):
+        """Yield the sentences of stripped non empty lines as SentenceSpans, the sentences are the same as iter_sentence_tokens gives."""
+        end_markers = sentence_end_markers.get(lang_type, sentence_end_markers[2])
+        sentences = self.iter_raw_sentence_offsets(lines, lang_type, first_line_index)
+        sentence = next(sentences, None)
+        spans = None
+        while sentence is not None:
+            next_sentence = next(sentences, None)
+            next_spans = None
+            line_info, text, text_start = sentence
+            stripped_text = text.strip()
+            if stripped_text != '':
+                if spans is None:
+                    spans = self.tokenize_line_spans(stripped_text, text_start + len(text) - len(text.lstrip()))
+                line_text = line_info[1]
+                # every end marker is a single character
+                end_sentence_markers = [index + 2 for index in range(0, len(spans), 2) if spans[index + 1] - spans[index] == 1 and line_text[spans[index]] in end_markers] if self.sentence_tokenize else []
+                if len(end_sentence_markers) > 0:
+                    if end_sentence_markers[-1] != len(spans):
+                        end_sentence_markers += [len(spans)]
+                    sentence_boundaries = zip([0] + end_sentence_markers, end_sentence_markers)
+                    proper_sentences = [[(line_info, spans[start: end])] for start, end in sentence_boundaries]
+                else:
+                    proper_sentences = [[(line_info, spans)]]
+                # the next sentence is tokenized here only when it can be punctuation only, its spans are reused in the next iteration
+                if self.merge_punctuation and next_sentence is not None and non_punctuation.search(next_sentence[1]) is None:
+                    next_line_info, next_text, next_text_start = next_sentence
+                    next_spans = self.tokenize_line_spans(next_text, next_text_start)
+                    punct_flag = True
+                    for index in range(0, len(next_spans), 2):
+                        punct_flag &= next_line_info[1][next_spans[index]: next_spans[index + 1]] in punctuations
+                    if punct_flag:
+                        if next_spans:
+                            proper_sentences[-1].append((next_line_info, next_spans))
+                        next_sentence = (next_line_info, '', next_text_start)
+                for segments in proper_sentences:
+                    yield SentenceSpans(segments)
+            sentence = next_sentence
+            spans = next_spans
+
+    def iter_sentence_tokens(self, lines, lang_type=0):
+        """Yield the token list of each sentence of stripped non empty lines."""
+        return self.iter_raw_sentence_tokens(self.iter_raw_sentences(lines, lang_type), lang_type)
+
+    def iter_mixed_sentence_tokens(self, typed_lines):
+        """Yield the token list of each sentence of stripped non empty lines given with the language type of each line as (lang_type, line).
+
+        The runs of lines of the same language type are tokenized with the sentence end markers of their type. A line
+        starting with a sentence of punctuation only must have the type of the line before it to be merged into its
+        last sentence, which the line level language identification makes sure of.
+        """
+        for lang_type, run in groupby(typed_lines, key=itemgetter(0)):
+            yield from self.iter_sentence_tokens((line for _, line in run), lang_type)
+
+    def iter_sentences(self, lines, lang_type=0):
+        """Yield the tokenized sentences of stripped non empty lines."""
+        for tokens in self.iter_sentence_tokens(lines, lang_type):
+            yield ' '.join(tokens)
+
+    def tokenize_lines(self, lines, lang_type=0):
+        """Tokenize a chunk of lines into the token lists of its sentences, this runs in the worker processes."""
+        return list(self.iter_sentence_tokens(lines, lang_type))
+
+    def tokenize_mixed_lines(self, typed_lines):
+        """Tokenize a chunk of lines given with the language type of each line into the token lists of its sentences, this runs in the worker processes."""
+        return list(self.iter_mixed_sentence_tokens(typed_lines))
+
+    def tokenize_lines_spans(self, lines, lang_type=0, first_line_index=0):
+        """Tokenize a chunk of lines into the SentenceSpans of its sentences, this runs in the worker processes."""
+        return list(self.iter_sentence_spans(lines, lang_type, first_line_index))
+
+    def tokenize_text(self, text, lang_type=0):
+        """Tokenize a text into a list of tokenized sentences, the same as tokenizing a file with this text."""
+        lines = (line.strip() for line in io.StringIO(text, newline=None))
+        return list(self.iter_sentences((line for line in lines if line), lang_type))
+
+    def tokenize_batch(self, texts, lang_type=0):
+        """Tokenize a batch of texts in one call into a TokenBatch, each text is tokenized like a file with this text.
+
+        texts is a list of strings, a numpy array of strings or a pyarrow string array, a missing text is an empty one.
+        A text without line breaks, like a tweet or a headline, is taken as a single line as it is.
+        """
+        if hasattr(texts, 'to_pylist'):
+            texts = texts.to_pylist()
+        elif hasattr(texts, 'tolist'):
+            texts = texts.tolist()
+        tokens = []
+        sentence_offsets = array('i', [0])
+        document_offsets = array('i', [0])
+        add_tokens = tokens.extend
+        add_sentence = sentence_offsets.append
+        iter_sentence_tokens = self.iter_sentence_tokens
+        for text in texts:
+            if text:
+                if '\n' in text or '\r' in text:
+                    lines = [line for line in (line.strip() for line in io.StringIO(text, newline=None)) if line]
+                else:
+                    text = text.strip()
+                    lines = [text] if text else []
+                for sentence in iter_sentence_tokens(lines, lang_type):
+                    if '' in sentence:
+                        sentence = [token for token in sentence if token]
+                    add_tokens(sentence)
+                    add_sentence(len(tokens))
+            document_offsets.append(len(sentence_offsets) - 1)
+        return TokenBatch(tokens, sentence_offsets, document_offsets)
+
+    def is_chunk_start(self, line, lang_type=0):
+        """Check that the first sentence of a line can not be merged into the sentence before it."""
+        if not self.merge_punctuation:
+            return True
+        return not self.is_punctuation_only(next(self.iter_raw_sentences([line], lang_type)))